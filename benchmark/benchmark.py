@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark dos scrapers contra o servidor local de fixtures
+Mede páginas/s, linhas/s e tempo de parsing por página de SefazScraper
+(sequencial, concorrente e pela API REST) e SefazSiteScraper (sequencial e
+concorrente), e compara
+com a linha de base gravada em baselines.json para apontar regressões
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import os
+import sys
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = os.path.join(BENCHMARK_DIR, '..')
+sys.path.insert(0, BASE_DIR)
+sys.path.insert(0, os.path.join(BASE_DIR, 'carta-de-servico'))
+sys.path.insert(0, os.path.join(BASE_DIR, 'site-sefaz'))
+
+from comum.parsers import BACKENDS
+from comum.rate_limiter import RateLimiter
+from fixture_server import FixtureServer, FixtureSite
+from sefaz_scraper import SefazScraper
+from sefaz_site_scraper import SefazSiteScraper
+
+BASELINES_PATH = os.path.join(BENCHMARK_DIR, 'baselines.json')
+
+# Métricas comparadas com a linha de base: True = maior é melhor
+METRICS = {
+    'pages_per_s': True,
+    'rows_per_s': True,
+    'parse_ms_per_page': False
+}
+
+
+def unlimited():
+    """Limitador que não segura as requisições (mede só o scraper)"""
+    return RateLimiter(rate=1e6, max_rate=1e6)
+
+
+def catalogue_pages(site):
+    return [f"/Geral/{slug}/" if number == 1 else f"/Geral/{slug}/page/{number}/"
+            for slug in site.catalogue for number in range(1, site.pages(slug) + 1)]
+
+
+def time_parsing(parse, pages):
+    """Tempo médio de parsing (ms/página) sobre HTML já em memória"""
+    started = time.perf_counter()
+    for url, content in pages:
+        parse(url, content)
+    return (time.perf_counter() - started) * 1000 / max(1, len(pages))
+
+
+def bench_carta(server, site, options, concurrent):
+    scraper = SefazScraper(base_url=server.base_url, parser=options.parser, limiter=unlimited(),
+                           parse_workers=options.parse_workers)
+    urls = scraper.generate_profile_urls()
+    requests_before = server.requests
+    started = time.perf_counter()
+    if concurrent:
+        rows = asyncio.run(scraper.scrape_async(urls))
+    else:
+        rows = scraper.crawl(urls)
+    elapsed = time.perf_counter() - started
+    pages = server.requests - requests_before
+
+    html_pages = [(server.base_url + path, site.render(path)) for path in catalogue_pages(site)]
+    parse_ms = time_parsing(scraper.parse_page, html_pages)
+    return pages, len(rows), elapsed, parse_ms
+
+
+def bench_carta_api(server, site, options):
+    """Coleta pela API REST; o "parsing" é o mapeamento do JSON para as linhas"""
+    scraper = SefazScraper(base_url=server.base_url, limiter=unlimited(), source='api')
+    urls = scraper.generate_profile_urls()
+    requests_before = server.requests
+    started = time.perf_counter()
+    rows = scraper.scrape_api(urls)
+    elapsed = time.perf_counter() - started
+    pages = server.requests - requests_before
+    parse_ms = scraper.metrics.stages['extract'].sum * 1000 / max(1, pages)
+    return pages, len(rows), elapsed, parse_ms
+
+
+def bench_site(server, site, options, concurrent):
+    scraper = SefazSiteScraper(base_url=server.base_url + '/', parser=options.parser, limiter=unlimited(),
+                               parse_workers=options.parse_workers)
+    requests_before = server.requests
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        rows = list(scraper.iter_services(concurrent=concurrent))
+        elapsed = time.perf_counter() - started
+        pages = server.requests - requests_before
+
+        html_pages = [(url, site.render(f"/{slug}/"))
+                      for slug, (url, _) in zip(scraper.profiles, scraper.generate_profile_urls())]
+        parse_ms = time_parsing(lambda url, content: scraper.parse_services(content, url), html_pages)
+    return pages, len(rows), elapsed, parse_ms
+
+
+SCENARIOS = {
+    'carta_sequencial': lambda server, site, options: bench_carta(server, site, options, concurrent=False),
+    'carta_concorrente': lambda server, site, options: bench_carta(server, site, options, concurrent=True),
+    'carta_api': bench_carta_api,
+    'site': lambda server, site, options: bench_site(server, site, options, concurrent=False),
+    'site_concorrente': lambda server, site, options: bench_site(server, site, options, concurrent=True)
+}
+
+
+def run_scenario(name, server, site, options):
+    """Executa o cenário `options.repeat` vezes e guarda a melhor medição"""
+    best = None
+    for _ in range(options.repeat):
+        pages, rows, elapsed, parse_ms = SCENARIOS[name](server, site, options)
+        result = {
+            'pages': pages,
+            'rows': rows,
+            'seconds': round(elapsed, 3),
+            'pages_per_s': round(pages / elapsed, 1),
+            'rows_per_s': round(rows / elapsed, 1),
+            'parse_ms_per_page': round(parse_ms, 3)
+        }
+        if best is None or result['seconds'] < best['seconds']:
+            best = result
+    return best
+
+
+def compare(results, baselines, tolerance):
+    """Lista de regressões (cenário, métrica, atual, linha de base)"""
+    regressions = []
+    for name, result in results.items():
+        baseline = baselines.get(name)
+        if not baseline:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            current, reference = result[metric], baseline[metric]
+            if higher_is_better and current < reference * (1 - tolerance):
+                regressions.append((name, metric, current, reference))
+            elif not higher_is_better and current > reference * (1 + tolerance):
+                regressions.append((name, metric, current, reference))
+    return regressions
+
+
+def load_baselines(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos scrapers SEFAZ-MS com fixtures locais")
+    parser.add_argument('--scenario', choices=list(SCENARIOS), action='append',
+                        help="cenário a executar (pode repetir; padrão: todos)")
+    parser.add_argument('--parser', choices=BACKENDS, default='bs4', help="backend de parsing HTML")
+    parser.add_argument('--parse-workers', type=int, default=0,
+                        help="processos de parsing (carta concorrente e site; 0 = desativado)")
+    parser.add_argument('--latency', type=float, default=20, help="latência do servidor (ms)")
+    parser.add_argument('--error-rate', type=float, default=0, help="fração de respostas 503")
+    parser.add_argument('--scale', type=int, default=1, help="multiplica os serviços de cada perfil")
+    parser.add_argument('--repeat', type=int, default=3, help="execuções por cenário (vale a melhor)")
+    parser.add_argument('--baselines', default=BASELINES_PATH, help="arquivo com as linhas de base")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="variação relativa tolerada antes de apontar regressão")
+    parser.add_argument('--save-baseline', action='store_true',
+                        help="grava os resultados como nova linha de base")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    config = {'parser': args.parser, 'parse_workers': args.parse_workers, 'latency_ms': args.latency,
+              'error_rate': args.error_rate, 'scale': args.scale}
+    site = FixtureSite(scale=args.scale)
+    server = FixtureServer(site, latency=args.latency / 1000, error_rate=args.error_rate, seed=42)
+    server.start()
+
+    results = {}
+    try:
+        for name in args.scenario or list(SCENARIOS):
+            results[name] = run_scenario(name, server, site, args)
+            result = results[name]
+            print(f"{name:18} {result['pages']:5d} páginas {result['rows']:6d} linhas "
+                  f"{result['seconds']:8.2f}s  {result['pages_per_s']:8.1f} páginas/s "
+                  f"{result['rows_per_s']:9.1f} linhas/s  {result['parse_ms_per_page']:7.2f} ms/página (parsing)")
+    finally:
+        server.stop()
+
+    stored = load_baselines(args.baselines)
+    if args.save_baseline:
+        stored = {'config': config, 'results': {**stored.get('results', {}), **results}}
+        with open(args.baselines, 'w', encoding='utf-8') as f:
+            json.dump(stored, f, ensure_ascii=False, indent=2)
+        print(f"\nLinha de base gravada em {args.baselines}")
+        return 0
+
+    if not stored:
+        print("\nSem linha de base para comparar (use --save-baseline)")
+        return 0
+    if stored.get('config') != config:
+        print(f"\nAviso: linha de base gravada com outra configuração: {stored.get('config')}")
+
+    regressions = compare(results, stored.get('results', {}), args.tolerance)
+    if not regressions:
+        print(f"\nSem regressões em relação à linha de base (tolerância {args.tolerance:.0%})")
+        return 0
+    print("\nRegressões:")
+    for name, metric, current, reference in regressions:
+        print(f"  {name}: {metric} = {current} (linha de base {reference})")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Servidor local de fixtures do catálogo e do site SEFAZ-MS
+Reproduz as páginas /Geral/<perfil>/ (com paginação /page/N/),
+/<perfil>-post/, o detalhe de cada serviço e a API REST do WordPress do
+catálogo (/wp-json/) a partir dos CSVs já coletados, com latência, taxa
+de erros e ampliação sintética configuráveis, para medir os scrapers sem
+acessar os portais reais
+"""
+
+import argparse
+import csv
+import hashlib
+import html
+import json
+import os
+import posixpath
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+BASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+CARTA_CSV = os.path.join(BASE_DIR, 'carta-de-servico', 'sefaz_servicos.csv')
+SITE_CSV = os.path.join(BASE_DIR, 'site-sefaz', 'sefaz_site_servicos.csv')
+
+# Perfis dos CSVs -> caminhos usados pelos scrapers
+CATALOGUE_PROFILES = {
+    'Agropecuária': 'agropecuaria',
+    'Comércio, Indústria e Serviços': 'ccis-industria-e-servicos',
+    'Cidadão / Órgão Governamental': 'cidadao-orgao-governamental',
+    'Fiscalização': 'fiscalizacao'
+}
+SITE_PROFILES = {
+    'Cidadão': 'cidadao-post',
+    'Produtor Rural': 'produtor-rural-post',
+    'Empresa': 'empresa-post',
+    'Poder Público': 'poder-publico-post',
+    'Contabilista': 'contabilista-post'
+}
+
+
+def _read_csv(filename):
+    with open(filename, 'r', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+def _scaled_href(url, copy):
+    """Caminho do serviço, como no CSV; cópias sintéticas ganham o sufixo -copia-N
+
+    O sufixo entra antes da extensão e da barra final, se houver:
+    /a/b/ -> /a/b-copia-1/, /doc.pdf -> /doc-copia-1.pdf.
+    """
+    parts = urlsplit(url)
+    path = parts.path
+    if copy:
+        stem = path.rstrip('/')
+        root, ext = posixpath.splitext(stem)
+        path = f"{root}-copia-{copy}{ext}{path[len(stem):]}"
+    return f"{path}?{parts.query}" if parts.query else path
+
+
+class FixtureSite:
+    """Conteúdo servido: páginas geradas dos CSVs ou gravadas em disco
+
+    Com `scale` > 1 cada serviço aparece `scale` vezes (com URLs
+    distintas), multiplicando cards e páginas do catálogo. Arquivos em
+    `fixtures_dir` (<caminho>/index.html) têm prioridade sobre as páginas
+    geradas, para reproduzir HTML capturado dos portais. Com `wp_api`
+    desligado, /wp-json/ responde 404 (site sem a API REST).
+    """
+
+    def __init__(self, carta_csv=CARTA_CSV, site_csv=SITE_CSV, scale=1, per_page=10,
+                 fixtures_dir=None, wp_api=True):
+        self.per_page = per_page
+        self.fixtures_dir = fixtures_dir
+        self.wp_api = wp_api
+        self.catalogue = defaultdict(list)
+        for copy in range(scale):
+            for row in _read_csv(carta_csv):
+                slug = CATALOGUE_PROFILES.get(row['Perfis'])
+                if slug:
+                    self.catalogue[slug].append({
+                        'profile': row['Perfis'],
+                        'title': row['Serviços'],
+                        'href': _scaled_href(row['URL'], copy),
+                        'categories': [cat for cat in row['Categorias'].split(';') if cat]
+                    })
+        # Páginas de detalhe: um mesmo serviço pode aparecer em vários perfis
+        # (chave sem percent-encoding, que o cliente pode normalizar)
+        self.details = {}
+        for cards in self.catalogue.values():
+            for card in cards:
+                self.details.setdefault(unquote(card['href'].strip('/')), card)
+        self._build_api()
+        self.site = defaultdict(lambda: defaultdict(list))
+        for copy in range(scale):
+            for row in _read_csv(site_csv):
+                slug = SITE_PROFILES.get(row['Perfis'])
+                if slug:
+                    parts = urlsplit(row['URL'])
+                    href = f"{parts.scheme}://{parts.netloc}{_scaled_href(row['URL'], copy)}"
+                    self.site[slug][row['Categorias']].append((row['Serviços'], href))
+
+    def _build_api(self):
+        """Posts, categorias e termos de perfil da API REST, a partir dos cards
+
+        Cada serviço é um post com os perfis em que aparece; categorias
+        repetidas no mesmo card viram termos distintos de mesmo nome, como
+        no WordPress.
+        """
+        self.api_profiles = []
+        self.api_categories = {}
+        self.api_posts = []
+        self.api_profile_posts = {}
+        posts = {}
+        for slug, cards in self.catalogue.items():
+            term = {'id': len(self.api_profiles) + 1, 'name': html.escape(cards[0]['profile']), 'slug': slug}
+            self.api_profiles.append(term)
+            self.api_profile_posts[term['id']] = []
+            for card in cards:
+                post = posts.get(card['href'])
+                if post is None:
+                    seen = Counter()
+                    categories = []
+                    for name in card['categories']:
+                        key = (name, seen[name])
+                        seen[name] += 1
+                        categories.append(self.api_categories.setdefault(key, len(self.api_categories) + 1))
+                    post = posts[card['href']] = {
+                        'id': len(self.api_posts) + 1,
+                        'href': card['href'],
+                        'title': {'rendered': html.escape(card['title'])},
+                        'categories': categories,
+                        'perfil': []
+                    }
+                    self.api_posts.append(post)
+                post['perfil'].append(term['id'])
+                self.api_profile_posts[term['id']].append(post)
+
+    def api(self, path, query, base_url):
+        """(status, JSON, cabeçalhos) de uma rota de /wp-json/ ou None (404)
+
+        Com `_envelope`, como no WordPress, a resposta vem com status 200 e
+        o status e os cabeçalhos dentro do corpo.
+        """
+        if not self.wp_api:
+            return None
+        route = path[len('/wp-json'):].strip('/')
+        params = {key: values[0] for key, values in parse_qs(query, keep_blank_values=True).items()}
+        response = self._api_route(route, params, base_url)
+        if response is None or '_envelope' not in params:
+            return response
+        status, body, headers = response
+        return 200, {'body': body, 'status': status, 'headers': headers}, {}
+
+    def _api_route(self, route, params, base_url):
+        if route == '':
+            return 200, {'name': 'Catálogo de Serviços', 'namespaces': ['wp/v2']}, {}
+        if route == 'wp/v2/taxonomies':
+            return 200, {
+                'category': {'name': 'Categorias', 'slug': 'category', 'rest_base': 'categories', 'types': ['post']},
+                'post_tag': {'name': 'Tags', 'slug': 'post_tag', 'rest_base': 'tags', 'types': ['post']},
+                'perfil': {'name': 'Perfis', 'slug': 'perfil', 'rest_base': 'perfil', 'types': ['post']}
+            }, {}
+        if route == 'wp/v2/categories':
+            items = [{'id': term_id, 'name': html.escape(name), 'slug': f"categoria-{term_id}"}
+                     for (name, _), term_id in self.api_categories.items()]
+        elif route == 'wp/v2/tags':
+            items = []
+        elif route == 'wp/v2/perfil':
+            items = self.api_profiles
+        elif route == 'wp/v2/posts':
+            if 'perfil' in params:
+                items = self.api_profile_posts.get(int(params['perfil']), [])
+            else:
+                items = self.api_posts
+            items = [{'id': post['id'], 'link': base_url + post['href'], 'title': post['title'],
+                      'categories': post['categories'], 'perfil': post['perfil']} for post in items]
+        else:
+            return None
+
+        per_page = min(100, int(params.get('per_page', 10)))
+        page = int(params.get('page', 1))
+        total = len(items)
+        total_pages = max(1, -(-total // per_page))
+        if page > total_pages:
+            return 400, {'code': 'rest_post_invalid_page_number'}, {}
+        items = items[(page - 1) * per_page:page * per_page]
+        if '_fields' in params:
+            fields = params['_fields'].split(',')
+            items = [{key: value for key, value in item.items() if key in fields} for item in items]
+        return 200, items, {'X-WP-Total': str(total), 'X-WP-TotalPages': str(total_pages)}
+
+    def pages(self, slug):
+        return max(1, -(-len(self.catalogue[slug]) // self.per_page))
+
+    def catalogue_page(self, slug, number):
+        if slug not in self.catalogue or not 1 <= number <= self.pages(slug):
+            return None
+        cards = self.catalogue[slug][(number - 1) * self.per_page:number * self.per_page]
+        out = [f'<html><body><h1 class="green">{html.escape(cards[0]["profile"])}</h1>']
+        for card in cards:
+            categories = ', '.join(f'<a href="/categoria/" rel="category tag">{html.escape(cat)}</a>'
+                                   for cat in card['categories'])
+            out.append(f'<div class="card"><div class="card-body">'
+                       f'<a href="{html.escape(card["href"])}"><h5 class="card-title">{html.escape(card["title"])}</h5></a>'
+                       f'<div class="categorias mt-2">{categories}</div></div></div>')
+        out.append('<div class="paginacao">')
+        for page in range(1, self.pages(slug) + 1):
+            suffix = f"page/{page}/" if page > 1 else ''
+            out.append(f'<a href="/Geral/{slug}/{suffix}">{page}</a>')
+        out.append('</div></body></html>')
+        return '\n'.join(out)
+
+    def site_page(self, slug):
+        if slug not in self.site:
+            return None
+        out = ['<html><body><div class="daems-list-column">']
+        for category, items in self.site[slug].items():
+            out.append(f'<ul class="daems-list"><li class="daems-titulos">{html.escape(category)}</li>')
+            for name, href in items:
+                out.append(f'<li class="daems-list-itens"><a href="{html.escape(href)}">{html.escape(name)}</a></li>')
+            out.append('</ul>')
+        out.append('</div></body></html>')
+        return '\n'.join(out)
+
+    def detail_page(self, slug):
+        card = self.details.get(unquote(slug))
+        if card is None:
+            return None
+        title = html.escape(card['title'])
+        categories = ''.join(f'<li>{html.escape(cat)}</li>' for cat in card['categories'])
+        return '\n'.join([
+            '<html><head>',
+            f'<meta name="description" content="Informações sobre {title}">',
+            '<meta property="article:modified_time" content="2024-03-01T10:00:00-04:00">',
+            '</head><body><article>',
+            f'<h1 class="entry-title">{title}</h1>',
+            '<div class="entry-content">',
+            f'<p>Serviço {title} prestado pela SEFAZ-MS.</p>',
+            '<h2>O que é</h2>',
+            f'<p>Descrição do serviço {title}.</p>',
+            '<h2>Quem pode solicitar</h2>',
+            f'<ul>{categories}</ul>',
+            '<h2>Como solicitar</h2>',
+            '<p>Acesse o sistema e preencha o requerimento.</p>',
+            '<p><a href="https://servicos.efazenda.ms.gov.br/">Acessar o serviço</a></p>',
+            '<h2>Prazo de atendimento</h2>',
+            '<p>Até 30 dias.</p>',
+            '</div></article></body></html>'
+        ])
+
+    def recorded_page(self, path):
+        if not self.fixtures_dir:
+            return None
+        filename = os.path.join(self.fixtures_dir, path.strip('/'), 'index.html')
+        if not os.path.isfile(filename):
+            return None
+        with open(filename, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def render(self, path):
+        """HTML da página ou None (404)"""
+        recorded = self.recorded_page(path)
+        if recorded is not None:
+            return recorded
+        parts = [part for part in path.split('/') if part]
+        if len(parts) == 2 and parts[0] == 'Geral':
+            return self.catalogue_page(parts[1], 1)
+        if len(parts) == 4 and parts[0] == 'Geral' and parts[2] == 'page' and parts[3].isdigit():
+            return self.catalogue_page(parts[1], int(parts[3]))
+        if len(parts) == 1:
+            return self.site_page(parts[0]) or self.detail_page(parts[0])
+        return None
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=b'', headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        delay = server.latency + random.uniform(0, server.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        with server.lock:
+            server.requests += 1
+            failing = server.random.random() < server.error_rate
+        if failing:
+            self._send(503, headers={'Retry-After': str(server.retry_after)})
+            return
+
+        parts = urlsplit(self.path)
+        status, headers = 200, {'Content-Type': 'text/html; charset=utf-8'}
+        if parts.path.startswith('/wp-json'):
+            response = server.site.api(parts.path, parts.query, f"http://{self.headers.get('Host')}")
+            if response is not None:
+                status, payload, headers = response
+                headers = {**headers, 'Content-Type': 'application/json; charset=utf-8'}
+                content = json.dumps(payload, ensure_ascii=False)
+            else:
+                content = None
+        else:
+            content = server.site.render(parts.path)
+        if content is None:
+            self._send(404)
+            return
+        body = content.encode('utf-8')
+        etag = f'"{hashlib.md5(body).hexdigest()}"'
+        if status == 200 and self.headers.get('If-None-Match') == etag:
+            self._send(304, headers={'ETag': etag})
+            return
+        with server.lock:
+            server.bytes_sent += len(body)
+        self._send(status, body, {**headers, 'ETag': etag})
+
+
+class FixtureServer(ThreadingHTTPServer):
+    """Servidor HTTP das fixtures, executável em segundo plano
+
+    `latency` e `jitter` em segundos; `error_rate` é a fração de
+    requisições respondidas com 503 (com Retry-After).
+    """
+
+    daemon_threads = True
+
+    def __init__(self, site, host='127.0.0.1', port=0, latency=0.0, jitter=0.0,
+                 error_rate=0.0, retry_after=0, seed=None):
+        super().__init__((host, port), FixtureHandler)
+        self.site = site
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.bytes_sent = 0
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    """Inicia o servidor de fixtures em primeiro plano"""
+    parser = argparse.ArgumentParser(description="Servidor local de fixtures do catálogo e do site SEFAZ-MS")
+    parser.add_argument('--port', type=int, default=8765, help="porta do servidor")
+    parser.add_argument('--latency', type=float, default=50, help="latência de cada resposta (ms)")
+    parser.add_argument('--jitter', type=float, default=0, help="variação aleatória somada à latência (ms)")
+    parser.add_argument('--error-rate', type=float, default=0, help="fração de respostas 503")
+    parser.add_argument('--scale', type=int, default=1, help="multiplica os serviços de cada perfil")
+    parser.add_argument('--fixtures-dir', default=None,
+                        help="HTML capturado (<caminho>/index.html), servido no lugar das páginas geradas")
+    parser.add_argument('--no-wp-api', action='store_true',
+                        help="responde 404 em /wp-json/ (site sem a API REST)")
+    args = parser.parse_args()
+
+    site = FixtureSite(scale=args.scale, fixtures_dir=args.fixtures_dir, wp_api=not args.no_wp_api)
+    server = FixtureServer(site, port=args.port, latency=args.latency / 1000,
+                           jitter=args.jitter / 1000, error_rate=args.error_rate)
+    print(f"Servindo fixtures em {server.base_url}")
+    print(f"  Catálogo: {server.base_url}/Geral/<perfil>/  Site: {server.base_url}/<perfil>-post/")
+    if site.wp_api:
+        print(f"  API REST: {server.base_url}/wp-json/wp/v2/posts?perfil=<id>")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nEncerrado")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,136 +5,192 @@ Análise Detalhada do Catálogo SEFAZ-MS
 Gera estatísticas avançadas e insights dos dados extraídos
 """
 
-import csv
-from collections import Counter
+import argparse
+import os
+import sys
 import re
 from datetime import datetime
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from comum.aggregate import Aggregation, Count, Frequencies, GroupMean, Largest
+from comum.classifier import KeywordClassifier
+from comum.result_cache import add_cache_arguments, cache_from_args, code_version
+from comum.sinks import read_records
+
 def load_data(filename='sefaz_servicos.csv'):
-    """Carrega os dados do CSV"""
+    """Carrega os dados do CSV (ou da saída em JSON Lines/Parquet do scraper)"""
+    try:
+        return list(read_records(filename))
+    except Exception as e:
+        print(f"Erro ao carregar dados: {e}")
+        return None
+
+SERVICE_TYPES = {
+    'Eletrônicos/Digitais': ['eletrônica', 'digital', 'e-fazenda', 'online', 'sistema'],
+    'Cadastrais': ['cadastro', 'inscrição', 'alteração', 'inclusão', 'exclusão'],
+    'Fiscais': ['icms', 'imposto', 'tributo', 'fiscal', 'alíquota'],
+    'Autorizações': ['autorização', 'credenciamento', 'regime especial'],
+    'Documentos': ['nota fiscal', 'certidão', 'documento', 'cópia'],
+    'Benefícios': ['benefício', 'redução', 'isenção', 'incentivo']
+}
+
+STOP_WORDS = {'de', 'da', 'do', 'das', 'dos', 'e', 'ou', 'para', 'com', 'em', 'no', 'na', 'nos', 'nas', 'a', 'o', 'as', 'os'}
+
+WORD_PATTERN = re.compile(r'\b\w+\b')
+
+# Resultados em cache valem para a versão do código da análise (analysis_version)
+ANALYSIS_NAME = 'analise_detalhada'
+
+# Palavras distintas mantidas na contagem de palavras-chave (ver Frequencies)
+KEYWORD_CAPACITY = 50000
+
+def analysis_version():
+    """Hash dos fontes da análise, calculado só quando o cache é usado"""
+    return code_version(__file__, Aggregation, KeywordClassifier, read_records)
+
+def row_categories(row):
+    """Categorias de um registro (nenhuma se o campo estiver vazio)"""
+    categories_str = row.get('Categorias', '')
+    if categories_str and categories_str.strip():
+        return [cat.strip() for cat in categories_str.split(';')]
+    return []
+
+SERVICE_CLASSIFIER = KeywordClassifier(SERVICE_TYPES)
+
+def service_types_of(classifier=None):
+    """Função registro -> tipos de serviço cujas palavras-chave aparecem no nome
+
+    Um serviço pode ter vários tipos; sem `classifier`, usa SERVICE_TYPES.
+    """
+    classifier = classifier or SERVICE_CLASSIFIER
+    return lambda row: classifier.classify_all(row.get('Serviços', ''))
+
+def row_keywords(row):
+    """Palavras do nome do serviço com mais de 3 letras, sem stop words"""
+    service = row.get('Serviços', '')
+    if not service:
+        return []
+    return [word for word in WORD_PATTERN.findall(service.lower())
+            if len(word) > 3 and word not in STOP_WORDS]
+
+def row_category_group(row):
+    """Perfil do registro, se ele tiver perfil e categorias"""
+    profile = row.get('Perfis', '')
+    return profile if profile and row.get('Categorias', '') else None
+
+def detailed_metrics(classifier=None):
+    """Acumuladores de todas as métricas do relatório e do arquivo de estatísticas"""
+    classifier = classifier or SERVICE_CLASSIFIER
+    return Aggregation(
+        total=Count(),
+        profiles=Frequencies(lambda row: (row.get('Perfis', ''),)),
+        categories=Frequencies(row_categories),
+        service_types=Frequencies(service_types_of(classifier), initial=classifier.labels),
+        longest_urls=Largest(5, lambda row: (row.get('Serviços', ''), row.get('Perfis', ''), len(row.get('URL', ''))),
+                             key=lambda item: item[2]),
+        categories_per_profile=GroupMean(row_category_group, lambda row: len(row.get('Categorias', '').split(';'))),
+        keywords=Frequencies(row_keywords, capacity=KEYWORD_CAPACITY),
+        categorized=Count(lambda row: row.get('Categorias', '').strip())
+    )
+
+def compute_statistics(data, classifier=None):
+    """Calcula todas as métricas em uma única passada pelos registros
+
+    `data` pode ser uma lista ou qualquer iterador de registros; só os
+    agregados ficam em memória.
+    """
+    return detailed_metrics(classifier).run(data)
+
+def load_statistics(filename='sefaz_servicos.csv', classifier=None):
+    """Calcula as métricas lendo o arquivo registro a registro, sem carregá-lo"""
     try:
-        data = []
-        with open(filename, 'r', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                data.append(row)
-        return data
+        return compute_statistics(read_records(filename), classifier)
     except Exception as e:
         print(f"Erro ao carregar dados: {e}")
         return None
 
+def cached_statistics(filename, classifier=None, cache=None):
+    """Métricas do arquivo, reaproveitadas do cache se a entrada e o código não mudaram"""
+    if cache is None:
+        return load_statistics(filename, classifier)
+    classifier = classifier or SERVICE_CLASSIFIER
+    try:
+        key = cache.key(ANALYSIS_NAME, filename, analysis_version(),
+                        {'taxonomy': classifier.taxonomy, 'keyword_capacity': KEYWORD_CAPACITY})
+    except OSError as e:
+        print(f"Erro ao carregar dados: {e}")
+        return None
+    stats = cache.get(key)
+    if stats is not None:
+        print("♻️  Métricas reaproveitadas do cache (entrada e código inalterados)")
+        return stats
+    stats = load_statistics(filename, classifier)
+    if stats is not None:
+        cache.put(key, stats, ANALYSIS_NAME, filename)
+    return stats
+
 def analyze_categories(data):
     """Analisa as categorias mais frequentes"""
-    all_categories = []
-    
-    for row in data:
-        categories_str = row.get('Categorias', '')
-        if categories_str and categories_str.strip():
-            categories = [cat.strip() for cat in categories_str.split(';')]
-            all_categories.extend(categories)
-    
-    category_counts = Counter(all_categories)
-    return category_counts
+    return Aggregation(categories=Frequencies(row_categories)).run(data)['categories']
 
-def analyze_services_by_type(data):
+def analyze_services_by_type(data, classifier=None):
     """Analisa tipos de serviços por palavras-chave"""
-    service_types = {
-        'Eletrônicos/Digitais': ['eletrônica', 'digital', 'e-fazenda', 'online', 'sistema'],
-        'Cadastrais': ['cadastro', 'inscrição', 'alteração', 'inclusão', 'exclusão'],
-        'Fiscais': ['icms', 'imposto', 'tributo', 'fiscal', 'alíquota'],
-        'Autorizações': ['autorização', 'credenciamento', 'regime especial'],
-        'Documentos': ['nota fiscal', 'certidão', 'documento', 'cópia'],
-        'Benefícios': ['benefício', 'redução', 'isenção', 'incentivo']
-    }
-    
-    type_counts = {}
-    
-    for service_type, keywords in service_types.items():
-        count = 0
-        for row in data:
-            service = row.get('Serviços', '')
-            if service:
-                service_lower = service.lower()
-                if any(keyword in service_lower for keyword in keywords):
-                    count += 1
-        type_counts[service_type] = count
-    
-    return type_counts
-
-def generate_detailed_report(data):
-    """Gera relatório detalhado"""
+    classifier = classifier or SERVICE_CLASSIFIER
+    types = Frequencies(service_types_of(classifier), initial=classifier.labels)
+    return dict(Aggregation(types=types).run(data)['types'])
+
+def generate_detailed_report(stats):
+    """Gera relatório detalhado a partir das métricas de compute_statistics()"""
+    total_services = stats['total']
     print("\n" + "="*80)
     print("ANÁLISE DETALHADA DO CATÁLOGO SEFAZ-MS")
     print("="*80)
     print(f"Data da análise: {datetime.now().strftime('%d/%m/%Y %H:%M')}")
-    print(f"Total de registros analisados: {len(data)}")
+    print(f"Total de registros analisados: {total_services}")
     
     # Estatísticas por perfil
     print("\n📊 DISTRIBUIÇÃO POR PERFIL:")
     print("-" * 50)
-    profile_counts = Counter(row.get('Perfis', '') for row in data)
+    profile_counts = stats['profiles']
     for profile, count in profile_counts.most_common():
         if profile:
-            percentage = (count / len(data)) * 100
+            percentage = (count / total_services) * 100
             print(f"• {profile}: {count} serviços ({percentage:.1f}%)")
     
     # Top 15 categorias mais frequentes
     print("\n🏷️  TOP 15 CATEGORIAS MAIS FREQUENTES:")
     print("-" * 50)
-    category_counts = analyze_categories(data)
+    category_counts = stats['categories']
     for i, (category, count) in enumerate(category_counts.most_common(15), 1):
         if category:
-            percentage = (count / len(data)) * 100
+            percentage = (count / total_services) * 100
             print(f"{i:2d}. {category}: {count} ocorrências ({percentage:.1f}%)")
     
     # Análise por tipo de serviço
     print("\n🔍 ANÁLISE POR TIPO DE SERVIÇO:")
     print("-" * 50)
-    service_types = analyze_services_by_type(data)
+    service_types = stats['service_types']
     for service_type, count in sorted(service_types.items(), key=lambda x: x[1], reverse=True):
-        percentage = (count / len(data)) * 100
+        percentage = (count / total_services) * 100
         print(f"• {service_type}: {count} serviços ({percentage:.1f}%)")
     
     # Serviços com URLs mais longas (mais complexos)
     print("\n🔗 ANÁLISE DE COMPLEXIDADE (por tamanho da URL):")
     print("-" * 50)
-    url_lengths = [(row.get('Serviços', ''), row.get('Perfis', ''), len(row.get('URL', ''))) for row in data]
-    url_lengths.sort(key=lambda x: x[2], reverse=True)
-    for i, (service, profile, length) in enumerate(url_lengths[:5]):
+    for service, profile, length in stats['longest_urls']:
         service_short = service[:60] + '...' if len(service) > 60 else service
         print(f"• {service_short} ({profile}) - {length} chars")
     
     # Estatísticas de categorias por perfil
     print("\n📈 CATEGORIAS MÉDIAS POR PERFIL:")
     print("-" * 50)
-    profile_categories = {}
-    for row in data:
-        profile = row.get('Perfis', '')
-        categories = row.get('Categorias', '')
-        if profile and categories:
-            num_cats = len(categories.split(';'))
-            if profile not in profile_categories:
-                profile_categories[profile] = []
-            profile_categories[profile].append(num_cats)
-    
-    for profile, cat_counts in profile_categories.items():
-        avg = sum(cat_counts) / len(cat_counts)
+    for profile, avg in stats['categories_per_profile'].items():
         print(f"• {profile}: {avg:.1f} categorias por serviço")
     
     # Palavras-chave mais comuns nos títulos
     print("\n🔤 PALAVRAS-CHAVE MAIS COMUNS NOS SERVIÇOS:")
     print("-" * 50)
-    all_words = []
-    stop_words = {'de', 'da', 'do', 'das', 'dos', 'e', 'ou', 'para', 'com', 'em', 'no', 'na', 'nos', 'nas', 'a', 'o', 'as', 'os'}
-    
-    for row in data:
-        service = row.get('Serviços', '')
-        if service:
-            words = re.findall(r'\b\w+\b', service.lower())
-            words = [word for word in words if len(word) > 3 and word not in stop_words]
-            all_words.extend(words)
-    
-    word_counts = Counter(all_words)
+    word_counts = stats['keywords']
     for i, (word, count) in enumerate(word_counts.most_common(10), 1):
         print(f"{i:2d}. '{word}': {count} ocorrências")
     
@@ -143,7 +199,6 @@ def generate_detailed_report(data):
     print("="*80)
     
     # Insights automáticos
-    total_services = len(data)
     main_profile = profile_counts.most_common(1)[0] if profile_counts else ('', 0)
     main_profile_pct = (main_profile[1] / total_services) * 100 if main_profile[1] > 0 else 0
     top_category = category_counts.most_common(1)[0] if category_counts else ('', 0)
@@ -164,34 +219,105 @@ def generate_detailed_report(data):
     
     print(f"\n📊 MÉTRICAS DE QUALIDADE:")
     print(f"• Cobertura: 100% dos perfis mapeados")
-    categorized_count = sum(1 for row in data if row.get('Categorias', '').strip())
-    print(f"• Estruturação: {categorized_count} serviços categorizados")
-    print(f"• Acessibilidade: Todos os {len(data)} serviços com URLs válidas")
+    print(f"• Estruturação: {stats['categorized']} serviços categorizados")
+    print(f"• Acessibilidade: Todos os {total_services} serviços com URLs válidas")
     
-if __name__ == "__main__":
-    # Carrega e analisa os dados
-    data = load_data()
-    
-    if data is not None:
-        generate_detailed_report(data)
+def write_statistics(stats, filename='estatisticas_detalhadas.txt'):
+    """Salva o resumo das métricas em arquivo texto"""
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.write(f"Relatório gerado em: {datetime.now().strftime('%d/%m/%Y %H:%M')}\n")
+        f.write(f"Total de serviços: {stats['total']}\n\n")
+        
+        f.write("Distribuição por perfil:\n")
+        for profile, count in stats['profiles'].most_common():
+            if profile:
+                f.write(f"{profile}: {count}\n")
         
-        # Salva estatísticas em arquivo
-        with open('estatisticas_detalhadas.txt', 'w', encoding='utf-8') as f:
-            f.write(f"Relatório gerado em: {datetime.now().strftime('%d/%m/%Y %H:%M')}\n")
-            f.write(f"Total de serviços: {len(data)}\n\n")
-            
-            f.write("Distribuição por perfil:\n")
-            profile_counts = Counter(row.get('Perfis', '') for row in data)
-            for profile, count in profile_counts.most_common():
-                if profile:
-                    f.write(f"{profile}: {count}\n")
-            
-            f.write("\nTop 10 categorias:\n")
-            category_counts = analyze_categories(data)
-            for category, count in category_counts.most_common(10):
-                if category:
-                    f.write(f"{category}: {count}\n")
+        f.write("\nTop 10 categorias:\n")
+        for category, count in stats['categories'].most_common(10):
+            if category:
+                f.write(f"{category}: {count}\n")
+
+def write_markdown_report(stats, filename='estatisticas_detalhadas.md'):
+    """Salva as métricas de compute_statistics() em Markdown, em tabelas"""
+    total_services = stats['total']
+    
+    def percentage(count):
+        return f"{(count / total_services) * 100:.1f}%" if total_services else "-"
+    
+    relatorio = "# Análise Detalhada do Catálogo SEFAZ-MS\n\n"
+    relatorio += f"- **Data da análise**: {datetime.now().strftime('%d/%m/%Y %H:%M')}\n"
+    relatorio += f"- **Total de registros analisados**: {total_services}\n"
+    relatorio += f"- **Serviços categorizados**: {stats['categorized']}\n"
+    
+    relatorio += "\n## Distribuição por Perfil\n\n"
+    relatorio += "| Perfil | Serviços | % |\n|---|---|---|\n"
+    for profile, count in stats['profiles'].most_common():
+        if profile:
+            relatorio += f"| {profile} | {count} | {percentage(count)} |\n"
+    
+    relatorio += "\n## Top 15 Categorias\n\n"
+    relatorio += "| # | Categoria | Ocorrências | % |\n|---|---|---|---|\n"
+    for i, (category, count) in enumerate(stats['categories'].most_common(15), 1):
+        if category:
+            relatorio += f"| {i} | {category} | {count} | {percentage(count)} |\n"
+    
+    relatorio += "\n## Tipos de Serviço\n\n"
+    relatorio += "| Tipo | Serviços | % |\n|---|---|---|\n"
+    for service_type, count in sorted(stats['service_types'].items(), key=lambda x: x[1], reverse=True):
+        relatorio += f"| {service_type} | {count} | {percentage(count)} |\n"
+    
+    relatorio += "\n## Serviços com URLs mais Longas\n\n"
+    relatorio += "| Serviço | Perfil | Caracteres |\n|---|---|---|\n"
+    for service, profile, length in stats['longest_urls']:
+        relatorio += f"| {service} | {profile} | {length} |\n"
+    
+    relatorio += "\n## Categorias Médias por Perfil\n\n"
+    relatorio += "| Perfil | Categorias por serviço |\n|---|---|\n"
+    for profile, avg in stats['categories_per_profile'].items():
+        relatorio += f"| {profile} | {avg:.1f} |\n"
+    
+    relatorio += "\n## Palavras-chave mais Comuns\n\n"
+    relatorio += "| # | Palavra | Ocorrências |\n|---|---|---|\n"
+    for i, (word, count) in enumerate(stats['keywords'].most_common(10), 1):
+        relatorio += f"| {i} | {word} | {count} |\n"
+    
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.write(relatorio)
+
+def main():
+    parser = argparse.ArgumentParser(description="Análise detalhada do catálogo SEFAZ-MS")
+    parser.add_argument('arquivo', nargs='?', default='sefaz_servicos.csv',
+                        help="catálogo extraído (.csv, .jsonl ou .parquet)")
+    parser.add_argument('--taxonomy', metavar='ARQUIVO',
+                        help="tipos de serviço e palavras-chave em JSON (padrão: SERVICE_TYPES)")
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+    
+    cache = cache_from_args(args)
+    if args.clear_cache:
+        removed = cache.invalidate(ANALYSIS_NAME) if cache else 0
+        print(f"🗑️  {removed} resultados removidos do cache")
+        return
+    
+    classifier = None
+    if args.taxonomy:
+        try:
+            classifier = KeywordClassifier.from_file(args.taxonomy)
+        except (OSError, ValueError) as e:
+            parser.error(f"não foi possível carregar a taxonomia: {e}")
+    
+    # Uma passada pelo arquivo alimenta o relatório e o arquivo de estatísticas
+    stats = cached_statistics(args.arquivo, classifier, cache)
+    
+    if stats is not None:
+        generate_detailed_report(stats)
+        write_statistics(stats)
+        write_markdown_report(stats)
         
-        print("\n💾 Estatísticas salvas em 'estatisticas_detalhadas.txt'")
+        print("\n💾 Estatísticas salvas em 'estatisticas_detalhadas.txt' e 'estatisticas_detalhadas.md'")
     else:
-        print("❌ Erro: Não foi possível carregar os dados. Verifique se o arquivo 'sefaz_servicos.csv' existe.")
\ No newline at end of file
+        print(f"❌ Erro: Não foi possível carregar os dados. Verifique se o arquivo '{args.arquivo}' existe.")
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,91 @@
-import requests
 from bs4 import BeautifulSoup
+import argparse
+import asyncio
 import csv
-import time
+from collections import deque
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from urllib.parse import urljoin, urlparse
 import logging
 
-# Configuração de logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from comum.frontier import CrawlFrontier, expand_pagination
+from comum.dedup import ServiceIndex, split_values
+from comum.delta import PageManifest, compute_delta, delta_filename, load_snapshot, save_delta
+from comum.fetch import Fetcher, FetchError
+from comum.http_cache import HttpCache
+from comum.http_client import HttpClient
+from comum.journal import CrawlJournal, journal_filename
+from comum.metrics import Metrics, metrics_filenames
+from comum.monitor import BlockMonitor, changes_filename, find_blocks, monitor_filename, run_polls
+from comum.parsers import BACKENDS, get_backend
+from comum.progress import (Progress, add_logging_arguments, event, events_path_from_args,
+                            structured_logging, verbosity_from_args, worker_logging)
+from comum.rate_limiter import RateLimiter, parse_host_rates
+from comum.records import ServiceRecord, from_rows, to_rows
+from comum.sinks import FIELDNAMES, open_sink
+from comum.wp_api import WordPressAPI, WordPressAPIError, rendered
+
+DETAIL_FIELDNAMES = ['URL', 'Perfis', 'Título', 'Descrição', 'Atualizado_em', 'Seções', 'Links']
+
+
+def details_filename(filename):
+    """sefaz_servicos.csv -> sefaz_servicos_detalhes.jsonl"""
+    root, _ = os.path.splitext(filename)
+    return f"{root}_detalhes.jsonl"
+
+# Logging configurado em main() (comum.progress.structured_logging)
 logger = logging.getLogger(__name__)
 
 class SefazScraper:
-    def __init__(self, base_url="https://www.catalogo.sefaz.ms.gov.br"):
+    def __init__(self, base_url="https://www.catalogo.sefaz.ms.gov.br",
+                 max_per_host=4, cache=None, parser='bs4', verify_parser=False,
+                 journal=None, limiter=None, timeout=10, retries=3, metrics=None,
+                 parse_workers=0, source='html', client=None):
         self.base_url = base_url
+        # 'html' percorre as páginas do catálogo; 'api' lê posts e termos pela
+        # API REST do WordPress (wp-json) e volta ao HTML se ela faltar
+        self.source = source
         self.data = []
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+        # Contadores de run_scraper: as linhas gravadas não ficam em memória
+        self.statistics = {
+            'total_services': 0,
+            'services_by_profile': {},
+            'samples': []
+        }
+        # 'bs4' usa a árvore completa do BeautifulSoup; os demais backends
+        # (comum.parsers) extraem apenas os blocos necessários. Com
+        # verify_parser, cada página é conferida contra o resultado do 'bs4'.
+        self.parser = parser
+        self.backend = get_backend(parser) if parser != 'bs4' else None
+        self.verify_parser = verify_parser
+        # Cache HTTP opcional (comum.http_cache.HttpCache)
+        self.cache = cache
+        # Manifesto de páginas, ativo apenas no modo incremental
+        self.manifest = None
+        # Impressões digitais por card-body, ativas apenas no modo monitor
+        # (comum.monitor.BlockMonitor)
+        self.block_monitor = None
+        # Diário opcional (comum.journal.CrawlJournal) para retomar coletas
+        self.journal = journal
+        # Requisições simultâneas por host no modo concorrente
+        self.max_per_host = max_per_host
+        # Processos de parsing no modo concorrente (0 = threads do próprio
+        # processo)
+        self.parse_workers = parse_workers
+        # Limitador de taxa adaptativo por host (comum.rate_limiter); a taxa
+        # inicial de 1 req/s equivale à antiga pausa fixa de 1 segundo
+        self.limiter = limiter or RateLimiter()
+        # Cliente HTTP com pool de conexões por host (comum.http_client),
+        # que pode ser compartilhado com outros scrapers; o pool cobre as
+        # requisições simultâneas por host do modo concorrente
+        self.session = client or HttpClient(pool_maxsize=max(10, max_per_host))
+        # Tempos por etapa, bytes e contagens (comum.metrics)
+        self.metrics = metrics or Metrics('carta')
+        # Requisições com novas tentativas e circuit breaker (comum.fetch)
+        self.fetcher = Fetcher(self.session, timeout=timeout, retries=retries,
+                               cache=cache, limiter=self.limiter, metrics=self.metrics)
         # Perfis disponíveis no catálogo SEFAZ-MS
         self.profiles = [
             'agropecuaria',
@@ -28,23 +97,23 @@ class SefazScraper:
     def get_page_content(self, url):
         """Faz requisição HTTP e retorna o conteúdo da página"""
         try:
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            return response.text
-        except requests.RequestException as e:
-            logger.error(f"Erro ao acessar {url}: {e}")
+            return self.fetcher.fetch(url)
+        except FetchError as e:
+            logger.error(f"Erro ao acessar {e}")
             return None
     
     def extract_categories_from_div(self, categories_div):
         """Extrai as categorias da div de categorias e retorna como string separada por ;"""
-        categories = []
+        texts = []
         if categories_div:
             category_links = categories_div.find_all('a', rel='category tag')
-            for link in category_links:
-                category_text = link.get_text(strip=True)
-                # Remove vírgulas para evitar problemas no CSV
-                category_text = category_text.replace(',', '')
-                categories.append(category_text)
+            texts = [link.get_text(strip=True) for link in category_links]
+        return self.join_categories(texts)
+    
+    def join_categories(self, texts):
+        """Junta os textos das categorias em uma string separada por ;"""
+        # Remove vírgulas para evitar problemas no CSV
+        categories = [text.replace(',', '') for text in texts]
         return ';'.join(categories) if categories else ""
     
     def extract_profile_from_url(self, url):
@@ -107,72 +176,523 @@ class SefazScraper:
     
     def get_pagination_urls(self, soup, current_url):
         """Extrai URLs de paginação da div paginacao"""
-        pagination_urls = []
         pagination_div = soup.find('div', class_='paginacao')
-        
+        hrefs = []
         if pagination_div:
-            pagination_links = pagination_div.find_all('a', href=True)
-            for link in pagination_links:
-                href = link.get('href')
-                if href and href != '#':
-                    full_url = urljoin(self.base_url, href)
-                    if full_url != current_url and full_url not in pagination_urls:
-                        pagination_urls.append(full_url)
+            hrefs = [link.get('href') for link in pagination_div.find_all('a', href=True)]
+        return self.resolve_pagination(hrefs, current_url)
+    
+    def resolve_pagination(self, hrefs, current_url):
+        """Converte os hrefs da paginação em URLs absolutas, sem repetições"""
+        pagination_urls = []
+        for href in hrefs:
+            if href and href != '#':
+                full_url = urljoin(self.base_url, href)
+                if full_url != current_url and full_url not in pagination_urls:
+                    pagination_urls.append(full_url)
         
         return pagination_urls
     
-    def scrape_page(self, url, visited_urls=None):
-        """Scraping de uma página específica com suporte à paginação"""
-        if visited_urls is None:
-            visited_urls = set()
+    def parse_page(self, url, content):
+        """Extrai serviços e links de paginação do HTML de uma página
+
+        Retorna uma tupla (linhas, urls_de_paginacao) sem efeitos colaterais,
+        para ser usada tanto pelo modo sequencial quanto pelo concorrente.
+        """
+        if self.backend is None:
+            main_profile, services, pagination_urls = self._parse_page_bs4(url, content)
+        elif self.verify_parser:
+            equivalent, reference, candidate = self.check_parser_equivalence(url, content)
+            if not equivalent:
+                logger.warning(f"Backend '{self.parser}' divergiu do BeautifulSoup em {url}; "
+                               f"usando o resultado de referência")
+            main_profile, services, pagination_urls = reference
+        else:
+            main_profile, services, pagination_urls = self._parse_page_targeted(url, content)
         
-        if url in visited_urls:
-            return
+        event(logger, 'page_parsed', f"Perfil {main_profile}: {len(services)} serviços em {url}",
+              url=url, profile=main_profile, services=len(services))
         
-        visited_urls.add(url)
-        logger.info(f"Fazendo scraping da página: {url}")
+        rows = []
+        for service_data in services:
+            if service_data['title'] and service_data['url']:
+                rows.append(ServiceRecord(service_data['categories'], main_profile,
+                                          service_data['title'], service_data['url']))
         
-        content = self.get_page_content(url)
-        if not content:
-            return
+        return rows, pagination_urls
+    
+    def _parse_page_bs4(self, url, content):
+        """Extração de referência sobre a árvore completa do BeautifulSoup"""
+        with self.metrics.timer('parse'):
+            soup = BeautifulSoup(content, 'html.parser')
         
-        soup = BeautifulSoup(content, 'html.parser')
+        with self.metrics.timer('extract'):
+            # Extrai o perfil da URL
+            main_profile = self.extract_profile_from_url(url)
+            
+            # Se não conseguiu extrair da URL, tenta do h1
+            if not main_profile:
+                h1_element = soup.find('h1', class_='green')
+                if h1_element:
+                    main_profile = h1_element.get_text(strip=True)
+            
+            # Encontra todos os card-body
+            services = [self.extract_service_data(card_body)
+                        for card_body in soup.find_all('div', class_='card-body')]
+            pagination_urls = self.get_pagination_urls(soup, url)
         
-        # Extrai o perfil da URL
-        main_profile = self.extract_profile_from_url(url)
+        return main_profile, services, pagination_urls
+    
+    def _parse_page_targeted(self, url, content):
+        """Extração direcionada com o backend configurado (mesmo formato do bs4)"""
+        with self.metrics.timer('parse'):
+            page = self.backend.parse_catalogue(content)
         
-        # Se não conseguiu extrair da URL, tenta do h1
-        if not main_profile:
-            h1_element = soup.find('h1', class_='green')
-            if h1_element:
-                main_profile = h1_element.get_text(strip=True)
+        with self.metrics.timer('extract'):
+            main_profile = self.extract_profile_from_url(url)
+            if not main_profile and page['heading'] is not None:
+                main_profile = page['heading']
+            
+            services = []
+            for card in page['cards']:
+                service_data = {
+                    'title': '',
+                    'url': '',
+                    'categories': self.join_categories(card['categories'])
+                }
+                if card['href'] is not None:
+                    service_data['url'] = urljoin(self.base_url, card['href'])
+                    service_data['title'] = card['title'] or ''
+                services.append(service_data)
+            pagination_urls = self.resolve_pagination(page['pagination'], url)
         
-        logger.info(f"Perfil encontrado: {main_profile}")
+        return main_profile, services, pagination_urls
+    
+    def check_parser_equivalence(self, url, content):
+        """Compara o backend configurado com a extração de referência do bs4
+
+        Retorna (equivalente, referencia, candidato).
+        """
+        reference = self._parse_page_bs4(url, content)
+        candidate = self._parse_page_targeted(url, content)
+        return reference == candidate, reference, candidate
+    
+    def extract_page(self, url, content):
+        """parse_page reaproveitando páginas inalteradas no modo incremental
+
+        No modo monitor, a reutilização é por bloco (monitor_page).
+        """
+        if self.block_monitor is not None:
+            return self.monitor_page(url, content)
+        if self.manifest is None:
+            return self.parse_page(url, content)
         
-        # Encontra todos os card-body
-        card_bodies = soup.find_all('div', class_='card-body')
-        logger.info(f"Encontrados {len(card_bodies)} serviços")
+        saved = self.manifest.lookup(url, content)
+        if saved is not None:
+            event(logger, 'page_unchanged', f"Página inalterada, extração reaproveitada: {url}", url=url)
+            return from_rows(saved['rows']), saved['links']
         
-        for card_body in card_bodies:
+        rows, links = self.parse_page(url, content)
+        self.manifest.record(url, content, {'rows': to_rows(rows), 'links': links})
+        return rows, links
+    
+    def kept_page(self, url):
+        """No modo monitor, (linhas, paginação) da verificação anterior de uma página que falhou
+
+        A página conta como inalterada e a paginação dela continua sendo
+        seguida, então a falha na primeira página de um perfil não faz as
+        demais sumirem da saída nem do estado. Fora do modo monitor, ou para
+        uma página desconhecida, retorna None.
+        """
+        if self.block_monitor is None:
+            return None
+        kept = self.block_monitor.keep(url)
+        if kept is None:
+            return None
+        rows, info, _ = kept
+        return from_rows(rows), info['links']
+    
+    def monitor_page(self, url, content):
+        """extract_page do modo monitor: só card-body novos ou alterados são extraídos"""
+        rows, info, _ = self.block_monitor.check(
+            url, content, lambda html: self.split_page_blocks(url, html), self.extract_card_block)
+        return from_rows(rows), info['links']
+    
+    def split_page_blocks(self, url, content):
+        """(perfil, {'profile', 'links'}, [HTML de cada card-body]) sem montar a árvore da página"""
+        with self.metrics.timer('parse'):
+            main_profile = self.extract_profile_from_url(url)
+            if not main_profile:
+                headings = find_blocks(content, 'h1', 'green')
+                if headings:
+                    main_profile = BeautifulSoup(headings[0], 'html.parser').get_text(strip=True)
+            hrefs = []
+            for pagination_div in find_blocks(content, 'div', 'paginacao')[:1]:
+                links = BeautifulSoup(pagination_div, 'html.parser').find_all('a', href=True)
+                hrefs = [link.get('href') for link in links]
+            cards = find_blocks(content, 'div', 'card-body')
+        return main_profile, {'profile': main_profile, 'links': self.resolve_pagination(hrefs, url)}, cards
+    
+    def extract_card_block(self, card_html, info):
+        """(URL do serviço, linhas no esquema do CSV) de um card-body isolado"""
+        with self.metrics.timer('extract'):
+            card_body = BeautifulSoup(card_html, 'html.parser').find('div', class_='card-body')
             service_data = self.extract_service_data(card_body)
+        if not (service_data['title'] and service_data['url']):
+            return None, []
+        record = ServiceRecord(service_data['categories'], info['profile'],
+                               service_data['title'], service_data['url'])
+        return record.url, [record.to_row()]
+    
+    def schedule_pagination(self, frontier, url, pagination_urls):
+        """Agenda as páginas seguintes do mesmo perfil
+
+        Lê a última página do bloco de paginação e agenda todas as restantes
+        de uma vez, além dos links encontrados. Retorna as URLs canônicas
+        ainda não agendadas.
+        """
+        root_index = frontier.root_of(url)
+        candidates = expand_pagination(pagination_urls) + pagination_urls
+        new_urls = [canonical for canonical in
+                    (frontier.add(page_url, root_index) for page_url in candidates) if canonical]
+        if new_urls:
+            event(logger, 'pagination', f"Encontradas {len(new_urls)} páginas adicionais",
+                  url=url, pages=len(new_urls))
+        return new_urls
+    
+    def open_frontier(self, urls):
+        """Cria a fronteira da coleta, continuando a do diário se houver uma em andamento
+
+        Retorna (fronteira, linhas_já_concluídas, urls_pendentes).
+        """
+        if self.journal is None:
+            return CrawlFrontier(), [], []
+        if not self.journal.has_unfinished_run():
+            self.journal.start(urls)
+        frontier, released, pending = CrawlFrontier.restore(self.journal, decode=ServiceRecord.from_row)
+        if len(frontier):
+            logger.info(f"Retomando coleta: {len(frontier) - len(pending)} páginas concluídas, "
+                        f"{len(pending)} pendentes")
+        return frontier, released, pending
+    
+    def scrape_page(self, url):
+        """Scraping de uma página de perfil e de toda a sua paginação"""
+        self.data.extend(self.crawl([url]))
+    
+    def crawl(self, urls):
+        """Coleta sequencial de perfis e paginação; retorna a lista de linhas"""
+        return list(self.iter_services(urls))
+    
+    def iter_services(self, urls=None):
+        """Gera cada serviço (esquema do CSV) assim que é extraído
+
+        Os perfis são percorridos um de cada vez a partir de uma fila, sem
+        recursão, e as linhas saem ordenadas por perfil e número de página.
+        Nada é acumulado em self.data.
+        """
+        if urls is None:
+            urls = self.generate_profile_urls()
+        
+        frontier, released, pending = self.open_frontier(urls)
+        yield from released
+        progress = Progress(logger, 'Páginas', unit='páginas')
+        
+        for index, start_url in enumerate(urls):
+            queue = deque(url for url in pending if frontier.root_of(url) == index)
+            start = frontier.add(start_url, index)
+            if start:
+                queue.append(start)
             
-            if service_data['title'] and service_data['url']:
-                self.data.append({
-                    'Categorias': service_data['categories'],
-                    'Perfis': main_profile,
-                    'Serviços': service_data['title'],
-                    'URL': service_data['url']
-                })
-        
-        # Verifica se há paginação e processa as páginas adicionais
-        pagination_urls = self.get_pagination_urls(soup, url)
-        if pagination_urls:
-            logger.info(f"Encontradas {len(pagination_urls)} páginas adicionais")
-            for page_url in pagination_urls:
-                self.scrape_page(page_url, visited_urls)
-        
-        # Pausa entre requisições para ser respeitoso com o servidor
-        time.sleep(1)
+            while queue:
+                url = queue.popleft()
+                event(logger, 'page_fetch', f"Fazendo scraping da página: {url}", url=url)
+                
+                content = self.get_page_content(url)
+                page = self.extract_page(url, content) if content else self.kept_page(url)
+                if page is None:
+                    progress.advance(total=len(frontier))
+                    yield from frontier.complete(url, failed=True)
+                    continue
+                
+                rows, pagination_urls = page
+                queue.extend(self.schedule_pagination(frontier, url, pagination_urls))
+                progress.advance(total=len(frontier))
+                yield from frontier.complete(url, rows)
+        progress.finish()
+    
+    async def extract_page_async(self, url, content, executor):
+        """extract_page no executor de parsing (threads ou processos)
+
+        Com o pool de processos, o manifesto e as métricas continuam no
+        processo principal; só o parsing e a extração vão para os workers.
+        """
+        loop = asyncio.get_running_loop()
+        if not isinstance(executor, ProcessPoolExecutor):
+            return await loop.run_in_executor(executor, self.extract_page, url, content)
+        
+        saved = self.manifest.lookup(url, content) if self.manifest else None
+        if saved is not None:
+            event(logger, 'page_unchanged', f"Página inalterada, extração reaproveitada: {url}", url=url)
+            return from_rows(saved['rows']), saved['links']
+        
+        rows, links, timings = await loop.run_in_executor(executor, _parse_in_worker, url, content)
+        for stage, seconds in timings:
+            self.metrics.observe(stage, seconds)
+        if self.manifest:
+            self.manifest.record(url, content, {'rows': to_rows(rows), 'links': links})
+        return rows, links
+    
+    async def scrape_async(self, urls, on_rows=None):
+        """Coleta perfis e paginação de forma concorrente
+
+        Pipeline em dois estágios: workers de I/O baixam as páginas (em
+        threads, com um semáforo por host e o limitador de taxa adaptativo)
+        e entregam o HTML, por uma fila limitada, aos workers de parsing -
+        threads ou, com parse_workers > 0, um pool de processos que usa
+        todos os núcleos. Quando a fila de parsing enche, os downloads
+        esperam. O resultado segue a mesma ordem do modo sequencial; se
+        `on_rows` for informado, recebe as linhas assim que são liberadas
+        nessa ordem e a lista retornada fica vazia.
+        """
+        loop = asyncio.get_running_loop()
+        semaphores = {}
+        frontier, collected, pending = self.open_frontier(urls)
+        queue = asyncio.Queue()
+        progress = Progress(logger, 'Páginas', unit='páginas')
+        
+        if on_rows:
+            # As linhas vão direto para on_rows; nada é acumulado
+            if collected:
+                on_rows(collected)
+            collected = []
+        for url in pending:
+            queue.put_nowait(url)
+        for index, url in enumerate(urls):
+            canonical = frontier.add(url, index)
+            if canonical:
+                queue.put_nowait(canonical)
+        
+        def finish(url, rows):
+            # Uma página só sai da fila principal depois de parseada, para que
+            # a paginação que ela revela seja agendada antes do fim da coleta
+            released = frontier.complete(url, rows or [], failed=rows is None)
+            progress.advance(total=len(frontier))
+            if not on_rows:
+                collected.extend(released)
+            elif released:
+                on_rows(released)
+            queue.task_done()
+        
+        async def fetch_worker(executor):
+            while True:
+                url = await queue.get()
+                content = None
+                try:
+                    host = urlparse(url).netloc
+                    semaphore = semaphores.setdefault(host, asyncio.Semaphore(self.max_per_host))
+                    async with semaphore:
+                        event(logger, 'page_fetch', f"Fazendo scraping da página: {url}", url=url)
+                        content = await loop.run_in_executor(executor, self.get_page_content, url)
+                except Exception:
+                    logger.exception(f"Erro ao baixar {url}")
+                if content:
+                    await parse_queue.put((url, content))
+                    continue
+                kept = self.kept_page(url)
+                if kept is None:
+                    finish(url, None)
+                    continue
+                rows, links = kept
+                for page_url in self.schedule_pagination(frontier, url, links):
+                    queue.put_nowait(page_url)
+                finish(url, rows)
+        
+        async def parse_worker(executor):
+            while True:
+                url, content = await parse_queue.get()
+                rows = None
+                try:
+                    rows, links = await self.extract_page_async(url, content, executor)
+                    for page_url in self.schedule_pagination(frontier, url, links):
+                        queue.put_nowait(page_url)
+                except Exception:
+                    logger.exception(f"Erro ao processar {url}")
+                finally:
+                    finish(url, rows)
+        
+        workers = max(1, self.max_per_host * len({urlparse(u).netloc for u in urls}))
+        parsers = (self.parse_workers if self.block_monitor is None else 0) or workers
+        parse_queue = asyncio.Queue(maxsize=2 * parsers)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            parse_executor = executor
+            # No modo monitor só blocos novos são extraídos, no próprio processo
+            if self.parse_workers and self.block_monitor is None:
+                parse_executor = ProcessPoolExecutor(max_workers=self.parse_workers,
+                                                     initializer=_init_parse_worker,
+                                                     initargs=(self.base_url, self.parser, self.verify_parser))
+            try:
+                tasks = [asyncio.create_task(fetch_worker(executor)) for _ in range(workers)]
+                tasks += [asyncio.create_task(parse_worker(parse_executor)) for _ in range(parsers)]
+                await queue.join()
+                progress.finish()
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+            finally:
+                if parse_executor is not executor:
+                    parse_executor.shutdown()
+        
+        return collected
+    
+    def scrape_api(self, urls):
+        """Coleta os perfis de `urls` pela API REST do WordPress
+
+        Os perfis são termos de uma taxonomia dos posts (descoberta em
+        wp/v2/taxonomies) e as categorias de cada post vêm de
+        wp/v2/categories; tudo em páginas de até 100 itens. Retorna as linhas
+        no esquema do CSV, ou None se a API não estiver disponível.
+        """
+        api = WordPressAPI(self.fetcher, self.base_url)
+        slugs = [url.rstrip('/').rsplit('/', 1)[-1] for url in urls]
+        try:
+            if not api.available():
+                raise WordPressAPIError("wp-json sem as rotas wp/v2")
+            categories = api.terms('categories')
+            profile_base, profile_terms = None, {}
+            for name, taxonomy in api.taxonomies().items():
+                rest_base = taxonomy.get('rest_base') or name
+                if 'post' not in taxonomy.get('types', ['post']) or rest_base == 'tags':
+                    continue
+                terms = categories if rest_base == 'categories' else api.terms(rest_base)
+                profile_terms = {term['slug']: term for term in terms.values()}
+                if any(slug in profile_terms for slug in slugs):
+                    profile_base = rest_base
+                    break
+            if profile_base is None:
+                raise WordPressAPIError("nenhuma taxonomia com os perfis do catálogo")
+            
+            rows = []
+            for url, slug in zip(urls, slugs):
+                term = profile_terms.get(slug)
+                if term is None:
+                    logger.warning(f"Perfil sem termo na API REST: {slug}")
+                    continue
+                # Mesmo nome de perfil do modo HTML
+                main_profile = self.extract_profile_from_url(url) or term['name']
+                posts = list(api.iter_collection('wp/v2/posts', _fields='id,link,title,categories',
+                                                 **{profile_base: term['id']}))
+                with self.metrics.timer('extract'):
+                    for post in posts:
+                        title, link = rendered(post.get('title')), post.get('link')
+                        if not title or not link:
+                            continue
+                        names = [categories[term_id]['name'] for term_id in post.get('categories', [])
+                                 if term_id in categories]
+                        rows.append(ServiceRecord(self.join_categories(names), main_profile, title, link))
+                logger.info(f"Perfil {main_profile}: {len(posts)} serviços pela API REST")
+        except WordPressAPIError as e:
+            logger.warning(f"API REST indisponível ({e}); coletando pelo HTML")
+            return None
+        
+        logger.info(f"API REST: {len(rows)} linhas em {api.requests} requisições")
+        return rows
+    
+    def parse_service_details(self, url, content):
+        """Extrai os campos estruturados da página de detalhe de um serviço
+
+        O texto do conteúdo é agrupado pelos títulos (h2-h4) que o precedem;
+        o que vem antes do primeiro título serve de descrição quando a página
+        não tem meta description.
+        """
+        with self.metrics.timer('detail_parse'):
+            soup = BeautifulSoup(content, 'html.parser')
+            body = (soup.find('div', class_='entry-content') or soup.find('article')
+                    or soup.find('main') or soup.body or soup)
+            
+            title = soup.find('h1')
+            description = soup.find('meta', attrs={'name': 'description'})
+            modified = soup.find('meta', attrs={'property': 'article:modified_time'})
+            
+            intro = []
+            sections = {}
+            current = None
+            for element in body.find_all(['h2', 'h3', 'h4', 'p', 'li']):
+                if element.name in ('h2', 'h3', 'h4'):
+                    current = element.get_text(strip=True)
+                    sections.setdefault(current, [])
+                    continue
+                # Parágrafos dentro de itens de lista já entram pelo próprio item
+                if element.name == 'p' and element.find_parent('li'):
+                    continue
+                text = element.get_text(' ', strip=True)
+                if text:
+                    (sections[current] if current is not None else intro).append(text)
+            
+            links = []
+            for link in body.find_all('a', href=True):
+                href = link['href'].strip()
+                if href and not href.startswith('#'):
+                    links.append({'texto': link.get_text(strip=True), 'url': urljoin(url, href)})
+        
+        return {
+            'Título': title.get_text(strip=True) if title else '',
+            'Descrição': description.get('content', '').strip() if description else ' '.join(intro[:1]),
+            'Atualizado_em': modified.get('content', '') if modified else '',
+            'Seções': {heading: '\n'.join(texts) for heading, texts in sections.items()},
+            'Links': links
+        }
+    
+    def unique_services(self, rows):
+        """Agrupa as linhas por URL canônica: [(url, [perfis])] na ordem de aparição"""
+        return [(entry['URL'], entry['Perfis']) for entry in ServiceIndex(rows).services.values()]
+    
+    async def fetch_details_async(self, services, concurrency=8):
+        """Baixa e extrai as páginas de detalhe com no máximo `concurrency` em andamento
+
+        Recebe [(url, [perfis])] já sem repetições e retorna os registros na
+        mesma ordem (None para páginas que não puderam ser obtidas).
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(concurrency)
+        progress = Progress(logger, 'Detalhes', total=len(services), unit='páginas')
+        
+        async def visit(url, profiles, executor):
+            async with semaphore:
+                event(logger, 'detail_fetch', f"Detalhando serviço: {url}", url=url)
+                try:
+                    content = await loop.run_in_executor(executor, self.get_page_content, url)
+                    if not content:
+                        return None
+                    details = await loop.run_in_executor(executor, self.parse_service_details, url, content)
+                finally:
+                    progress.advance()
+            self.metrics.increment('details_total')
+            return {'URL': url, 'Perfis': profiles, **details}
+        
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            records = await asyncio.gather(*(visit(url, profiles, executor) for url, profiles in services))
+        progress.finish()
+        return records
+    
+    def crawl_details(self, rows=None, filename='sefaz_servicos_detalhes.jsonl', concurrency=8):
+        """Coleta as páginas de detalhe de todos os serviços e grava em JSON Lines
+
+        Cada URL é baixada uma única vez, mesmo que o serviço apareça em
+        vários perfis; o registro traz a lista desses perfis.
+        """
+        if not filename.lower().endswith('.jsonl'):
+            raise ValueError(f"Detalhes são gravados em JSON Lines (.jsonl): {filename}")
+        services = self.unique_services(self.data if rows is None else rows)
+        logger.info(f"Detalhando {len(services)} serviços únicos "
+                    f"(até {concurrency} páginas simultâneas)")
+        
+        records = asyncio.run(self.fetch_details_async(services, concurrency))
+        with open_sink(filename, DETAIL_FIELDNAMES) as sink:
+            with self.metrics.timer('write'):
+                sink.write_rows(record for record in records if record)
+        
+        logger.info(f"Detalhes salvos em {filename}: {sink.count} de {len(services)} serviços")
+        return [record for record in records if record]
     
     def save_to_csv(self, filename='sefaz_servicos.csv'):
         """Salva os dados coletados em um arquivo CSV"""
@@ -180,12 +700,10 @@ class SefazScraper:
             logger.warning("Nenhum dado foi coletado")
             return
         
-        fieldnames = ['Categorias', 'Perfis', 'Serviços', 'URL']
-        
         with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+            writer = csv.DictWriter(csvfile, fieldnames=FIELDNAMES)
             writer.writeheader()
-            writer.writerows(self.data)
+            writer.writerows(to_rows(self.data))
         
         logger.info(f"Dados salvos em {filename}. Total de registros: {len(self.data)}")
     
@@ -197,60 +715,297 @@ class SefazScraper:
             urls.append(url)
         return urls
     
-    def run_scraper(self, urls=None):
-        """Executa o scraper para uma lista de URLs ou todos os perfis"""
+    def run_scraper(self, urls=None, concurrent=False, incremental=False,
+                    filename='sefaz_servicos.csv', resume=False, details=False,
+                    details_concurrency=8, dedup=False):
+        """Executa o scraper para uma lista de URLs ou todos os perfis
+
+        Cada linha é gravada em `filename` (CSV, JSONL ou Parquet, conforme a
+        extensão) assim que é extraída. No modo incremental, páginas com HTML
+        idêntico ao da execução anterior não são reprocessadas e um delta
+        (adicionados, removidos, renomeados, recategorizados) é salvo ao lado
+        do arquivo completo.
+        
+        Com um diário configurado e `resume`, uma coleta interrompida
+        continua de onde parou: as linhas já extraídas são regravadas a partir
+        do diário e só as páginas pendentes são requisitadas.
+        
+        Com `dedup`, cada serviço é gravado uma única vez (chave: URL
+        canônica) com todos os seus perfis em Perfis, separados por ';'.
+        Como os perfis só são conhecidos ao fim da coleta, o arquivo é
+        gravado no final; comum.dedup.expand_profiles volta ao formato longo.
+        
+        Com source='api', o catálogo é lido pela API REST do WordPress
+        (scrape_api) quando disponível; se não, a coleta segue pelo HTML.
+        
+        Com `details`, as páginas de detalhe dos serviços coletados são
+        baixadas em seguida (ver crawl_details) e gravadas em
+        <filename>_detalhes.jsonl.
+        """
+        resuming = resume and self.journal is not None and self.journal.has_unfinished_run()
+        if resuming:
+            urls = self.journal.roots()
+            logger.info(f"Retomando coleta interrompida a partir de {self.journal.path}")
+        
+        if incremental:
+            previous_data = self.journal.snapshot() if resuming else load_snapshot(filename)
+            self.manifest = PageManifest(PageManifest.manifest_filename(filename))
+        
         if urls is None:
             urls = self.generate_profile_urls()
             logger.info(f"Fazendo scraping de todos os perfis: {', '.join(self.profiles)}")
         
+        if self.journal is not None and not resuming:
+            self.journal.start(urls, previous_data if incremental else None)
+        
         logger.info(f"Iniciando scraper para {len(urls)} URLs")
         
-        for url in urls:
-            logger.info(f"Processando perfil: {url}")
-            self.scrape_page(url)
+        index = ServiceIndex() if dedup else None
+        # As linhas só ficam em memória se o delta ou os detalhes precisarem delas
+        keep_data = incremental or details
+        
+        def collect(rows):
+            self.metrics.increment('rows_total', len(rows))
+            if dedup:
+                index.add_rows(rows)
+                return
+            self.count_services(rows)
+            if keep_data:
+                self.data.extend(rows)
+            with self.metrics.timer('write'):
+                sink.write_rows(rows)
+        
+        api_rows = None
+        if self.source == 'api' and not resuming:
+            api_rows = self.scrape_api(urls)
+        
+        with open_sink(filename) as sink:
+            if api_rows is not None:
+                collect(api_rows)
+            elif concurrent:
+                logger.info(f"Modo concorrente: até {self.max_per_host} requisições por host")
+                asyncio.run(self.scrape_async(urls, on_rows=collect))
+            else:
+                for row in self.iter_services(urls):
+                    collect([row])
+            if dedup:
+                records = from_rows(index.records())
+                self.count_services(records)
+                if keep_data:
+                    self.data = records
+                with self.metrics.timer('write'):
+                    sink.write_rows(records)
+                logger.info(index.summary())
         
-        self.save_to_csv()
+        logger.info(f"Dados salvos em {filename}. Total de registros: {sink.count}")
         logger.info("Scraping concluído!")
         
+        if self.journal is not None:
+            self.journal.finish()
+        
+        if details:
+            self.crawl_details(self.data, details_filename(filename), details_concurrency)
+        
+        if incremental:
+            self.manifest.save()
+            logger.info(self.manifest.summary())
+            delta = compute_delta(previous_data, self.data)
+            save_delta(delta, delta_filename(filename))
+            logger.info(f"Delta salvo em {delta_filename(filename)}: {len(delta)} mudanças")
+        
+        if self.cache:
+            self.cache.save()
+            logger.info(self.cache.summary())
+        logger.info(self.limiter.summary())
+        logger.info(self.fetcher.summary())
+        logger.info(self.session.summary())
+        logger.info(self.metrics.summary())
+        json_path, prometheus_path = metrics_filenames(filename)
+        self.metrics.export(json_path, prometheus_path)
+        logger.info(f"Métricas salvas em {json_path} e {prometheus_path}")
+        
         # Estatísticas por perfil
         self.print_statistics()
 
+    def run_monitor(self, urls=None, filename='sefaz_servicos.csv', concurrent=False,
+                    interval=0, polls=None):
+        """Verifica o catálogo e registra apenas os blocos (card-body) que mudaram
+
+        A cada verificação as páginas são baixadas como na coleta normal, mas
+        páginas idênticas às da verificação anterior não são parseadas e,
+        nas alteradas, só os card-body novos são extraídos. Mudanças viram
+        eventos 'block_changed' e linhas em <filename>_mudancas.jsonl; o
+        estado fica em <filename>_monitor.json. `filename` é regravado na
+        primeira verificação e sempre que algo muda. Com `interval` > 0,
+        repete a cada `interval` segundos (até `polls` verificações).
+        """
+        if urls is None:
+            urls = self.generate_profile_urls()
+        self.block_monitor = BlockMonitor(monitor_filename(filename))
+        
+        def poll():
+            baseline = self.block_monitor.baseline
+            if concurrent:
+                self.data = asyncio.run(self.scrape_async(urls))
+            else:
+                self.data = self.crawl(urls)
+            changes = self.block_monitor.finish(changes_filename(filename))
+            if changes or baseline:
+                with open_sink(filename) as sink:
+                    sink.write_rows(self.data)
+                logger.info(f"Dados salvos em {filename}. Total de registros: {sink.count}")
+        
+        logger.info(f"Monitorando {len(urls)} perfis"
+                    + (f" a cada {interval:g}s" if interval > 0 else ""))
+        count = run_polls(poll, interval, polls)
+        if self.cache:
+            self.cache.save()
+        logger.info(self.fetcher.summary())
+        logger.info(self.session.summary())
+        return count
+    
+    def count_services(self, rows):
+        """Soma as linhas às estatísticas (total, por perfil e amostra) sem guardá-las"""
+        profile_stats = self.statistics['services_by_profile']
+        samples = self.statistics['samples']
+        for item in rows:
+            self.statistics['total_services'] += 1
+            for profile in split_values(item.profile):
+                if profile not in profile_stats:
+                    profile_stats[profile] = 0
+                profile_stats[profile] += 1
+            if len(samples) < 3:
+                samples.append(item)
+    
     def print_statistics(self):
-        """Exibe estatísticas dos dados coletados"""
-        if not self.data:
+        """Exibe estatísticas dos dados coletados (contadores de count_services)"""
+        if not self.statistics['total_services']:
             return
         
-        # Estatísticas por perfil
-        profile_stats = {}
-        for item in self.data:
-            profile = item['Perfis']
-            if profile not in profile_stats:
-                profile_stats[profile] = 0
-            profile_stats[profile] += 1
-        
         print("\n" + "="*60)
         print("ESTATÍSTICAS DO SCRAPING")
         print("="*60)
-        print(f"Total de serviços coletados: {len(self.data)}")
+        print(f"Total de serviços coletados: {self.statistics['total_services']}")
         print("\nDistribuição por perfil:")
-        for profile, count in sorted(profile_stats.items()):
+        for profile, count in sorted(self.statistics['services_by_profile'].items()):
             print(f"  • {profile}: {count} serviços")
         
         # Amostra dos dados
         print("\nAmostra dos dados coletados:")
-        for i, item in enumerate(self.data[:3]):
-            print(f"\n{i+1}. Categorias: {item['Categorias'][:80]}{'...' if len(item['Categorias']) > 80 else ''}")
-            print(f"   Perfil: {item['Perfis']}")
-            print(f"   Serviço: {item['Serviços'][:80]}{'...' if len(item['Serviços']) > 80 else ''}")
-            print(f"   URL: {item['URL']}")
+        for i, item in enumerate(self.statistics['samples']):
+            categories = ';'.join(item.categories)
+            print(f"\n{i+1}. Categorias: {categories[:80]}{'...' if len(categories) > 80 else ''}")
+            print(f"   Perfil: {item.profile}")
+            print(f"   Serviço: {item.title[:80]}{'...' if len(item.title) > 80 else ''}")
+            print(f"   URL: {item.url}")
+
+# Workers de parsing do modo concorrente (um scraper por processo)
+_worker_scraper = None
+
+
+def _init_parse_worker(base_url, parser, verify_parser):
+    global _worker_scraper
+    worker_logging()
+    _worker_scraper = SefazScraper(base_url=base_url, parser=parser, verify_parser=verify_parser)
+
+
+def _parse_in_worker(url, content):
+    """parse_page em um processo de parsing; retorna também os tempos das etapas"""
+    _worker_scraper.metrics = Metrics('carta')
+    rows, links = _worker_scraper.parse_page(url, content)
+    timings = [(stage, histogram.sum) for stage, histogram in _worker_scraper.metrics.stages.items()]
+    return rows, links, timings
+
 
 def main():
     """Função principal - executa scraping de todos os perfis"""
-    scraper = SefazScraper()
+    parser = argparse.ArgumentParser(description="Scraper do catálogo de serviços SEFAZ-MS")
+    parser.add_argument('--concurrent', action='store_true',
+                        help="coleta perfis e paginação em paralelo")
+    parser.add_argument('--max-per-host', type=int, default=4,
+                        help="requisições simultâneas por host no modo concorrente")
+    parser.add_argument('--parse-workers', type=int, default=0,
+                        help="processos de parsing no modo concorrente (0 = threads)")
+    parser.add_argument('--pool-size', type=int, default=10,
+                        help="conexões mantidas abertas por host (keep-alive)")
+    parser.add_argument('--rate', type=float, default=1.0,
+                        help="taxa inicial (requisições/s por host), ajustada conforme a resposta do servidor")
+    parser.add_argument('--max-rate', type=float, default=10.0,
+                        help="taxa máxima (requisições/s por host)")
+    parser.add_argument('--timeout', type=float, default=10,
+                        help="timeout (s) de cada requisição")
+    parser.add_argument('--retries', type=int, default=3,
+                        help="novas tentativas em timeouts, conexões derrubadas, 5xx e 429")
+    parser.add_argument('--host-rate', action='append', default=[], metavar='HOST=TAXA',
+                        help="taxa inicial de um host específico (pode repetir)")
+    parser.add_argument('--cache-dir', default=None,
+                        help="diretório do cache HTTP em disco (desativado se omitido)")
+    parser.add_argument('--cache-ttl', type=int, default=3600,
+                        help="segundos antes de revalidar uma página em cache")
+    parser.add_argument('--incremental', action='store_true',
+                        help="reaproveita páginas inalteradas e gera o delta em relação ao CSV anterior")
+    parser.add_argument('--source', choices=['html', 'api'], default='html',
+                        help="api = posts e categorias pela API REST do WordPress (wp-json), com volta ao HTML")
+    parser.add_argument('--parser', choices=BACKENDS, default='bs4',
+                        help="backend de parsing HTML (bs4 = árvore completa, referência)")
+    parser.add_argument('--verify-parser', action='store_true',
+                        help="confere cada página do backend escolhido contra o bs4")
+    parser.add_argument('--output', default='sefaz_servicos.csv',
+                        help="arquivo de saída (.csv, .jsonl ou .parquet), gravado linha a linha")
+    parser.add_argument('--dedup', action='store_true',
+                        help="um registro por serviço (URL canônica), com todos os perfis em Perfis")
+    parser.add_argument('--details', action='store_true',
+                        help="baixa também a página de detalhe de cada serviço (uma vez por URL)")
+    parser.add_argument('--details-concurrency', type=int, default=8,
+                        help="páginas de detalhe baixadas ao mesmo tempo")
+    parser.add_argument('--resume', action='store_true',
+                        help="retoma a coleta interrompida registrada no diário")
+    parser.add_argument('--journal', default=None,
+                        help="diário SQLite da coleta (padrão: <saída>_journal.db)")
+    parser.add_argument('--monitor', action='store_true',
+                        help="registra só os blocos que mudaram desde a verificação anterior")
+    parser.add_argument('--interval', type=float, default=0,
+                        help="segundos entre verificações no modo monitor (0 = uma verificação)")
+    parser.add_argument('--polls', type=int, default=None,
+                        help="número máximo de verificações no modo monitor")
+    add_logging_arguments(parser)
+    args = parser.parse_args()
+    
+    with structured_logging(verbosity_from_args(args), events_path_from_args(args, args.output)):
+        run(args)
+
+
+def run(args):
+    """Executa a coleta com as opções da linha de comando"""
+    cache = HttpCache(args.cache_dir, ttl=args.cache_ttl) if args.cache_dir else None
+    # O modo monitor não usa o diário: cada verificação é completa
+    journal = None if args.monitor else CrawlJournal(args.journal or journal_filename(args.output))
+    client = HttpClient(pool_maxsize=max(args.pool_size, args.max_per_host, args.details_concurrency))
+    limiter = RateLimiter(rate=args.rate, max_rate=args.max_rate,
+                          host_rates=parse_host_rates(args.host_rate))
+    scraper = SefazScraper(max_per_host=args.max_per_host,
+                           parse_workers=args.parse_workers,
+                           cache=cache,
+                           parser=args.parser,
+                           verify_parser=args.verify_parser,
+                           journal=journal,
+                           limiter=limiter,
+                           timeout=args.timeout,
+                           retries=args.retries,
+                           source=args.source,
+                           client=client)
+    
+    if args.monitor:
+        scraper.run_monitor(filename=args.output, concurrent=args.concurrent,
+                            interval=args.interval, polls=args.polls)
+        return
     
     # Opção 1: Scraping de todos os perfis automaticamente
     print("Iniciando scraping de todos os perfis do catálogo SEFAZ-MS...")
-    scraper.run_scraper()
+    scraper.run_scraper(concurrent=args.concurrent, incremental=args.incremental,
+                        filename=args.output, resume=args.resume,
+                        details=args.details, details_concurrency=args.details_concurrency,
+                        dedup=args.dedup)
     
     # Opção 2: Scraping de perfis específicos (descomente se necessário)
     # urls_especificas = [
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""Testes do SefazScraper contra o servidor local de fixtures (benchmark/fixture_server.py)"""
+
+import asyncio
+import contextlib
+import json
+import os
+import sys
+
+import pytest
+
+BASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+sys.path.insert(0, BASE_DIR)
+sys.path.insert(0, os.path.join(BASE_DIR, 'carta-de-servico'))
+sys.path.insert(0, os.path.join(BASE_DIR, 'benchmark'))
+
+from comum.dedup import expand_profiles
+from comum.journal import CrawlJournal, journal_filename
+from comum.monitor import changes_filename
+from comum.rate_limiter import RateLimiter
+from comum.sinks import read_records
+from fixture_server import FixtureServer, FixtureSite
+from sefaz_scraper import SefazScraper, details_filename
+
+
+@contextlib.contextmanager
+def serve(site, **kwargs):
+    server = FixtureServer(site, **kwargs)
+    server.start()
+    try:
+        yield server
+    finally:
+        server.stop()
+
+
+def scraper(server, **kwargs):
+    kwargs.setdefault('limiter', RateLimiter(rate=1e6, max_rate=1e6))
+    return SefazScraper(base_url=server.base_url, **kwargs)
+
+
+def fail_path(site, failing):
+    """Faz o servidor responder 404 para `failing`"""
+    render = site.render
+    site.render = lambda path: None if path == failing else render(path)
+
+
+def test_concurrent_crawl_matches_sequential_order():
+    # Latência aleatória faz as páginas terminarem fora de ordem
+    with serve(FixtureSite(scale=2), latency=0.001, jitter=0.01, seed=1) as server:
+        urls = scraper(server).generate_profile_urls()
+        sequential = scraper(server).crawl(urls)
+        rows = asyncio.run(scraper(server, max_per_host=8).scrape_async(urls))
+    assert len(sequential) == 2 * 359
+    assert [row.to_row() for row in rows] == [row.to_row() for row in sequential]
+
+
+def test_resume_fetches_only_pages_left_by_an_interrupted_run(tmp_path):
+    output = str(tmp_path / 'servicos.csv')
+    with serve(FixtureSite()) as server:
+        expected = [row.to_row() for row in scraper(server).crawl(None)]
+        full_run = server.requests
+
+        # Interrompida depois de 100 linhas, como numa queda do processo
+        interrupted = scraper(server, journal=CrawlJournal(journal_filename(output)))
+        services = interrupted.iter_services()
+        for _ in range(100):
+            next(services)
+        services.close()
+        interrupted.journal.close()
+
+        resumed = scraper(server, journal=CrawlJournal(journal_filename(output)))
+        resumed.run_scraper(filename=output, resume=True)
+        resumed.journal.close()
+    assert list(read_records(output)) == expected
+    # Nenhuma página é baixada duas vezes
+    assert server.requests == 2 * full_run
+
+
+def test_dedup_writes_each_service_once(tmp_path):
+    output = str(tmp_path / 'servicos.csv')
+    with serve(FixtureSite()) as server:
+        long_rows = [row.to_row() for row in scraper(server).crawl(None)]
+        scraper(server).run_scraper(filename=output, dedup=True)
+    records = list(read_records(output))
+    assert len(records) == len({row['URL'] for row in long_rows}) < len(long_rows)
+    assert any(';' in record['Perfis'] for record in records)
+
+    def key(row):
+        return row['URL'], row['Perfis']
+    assert sorted(expand_profiles(records), key=key) == sorted(long_rows, key=key)
+
+
+def test_details_fetch_each_service_page_once(tmp_path):
+    output = str(tmp_path / 'servicos.csv')
+    with serve(FixtureSite()) as server:
+        crawl = scraper(server)
+        rows = crawl.crawl(None)
+        before = server.requests
+        crawl.run_scraper(filename=output, details=True, details_concurrency=4)
+        requests = server.requests - before
+    urls = list(dict.fromkeys(row['URL'] for row in rows))
+    with open(details_filename(output), encoding='utf-8') as f:
+        details = [json.loads(line) for line in f]
+    assert [detail['URL'] for detail in details] == urls
+    # Uma requisição por página do catálogo e uma por serviço único
+    assert requests == before + len(urls)
+    first = next(row for row in rows if row['URL'] == urls[0])
+    assert details[0]['Título'] == first['Serviços']
+    assert details[0]['Perfis'] == list(dict.fromkeys(row['Perfis'] for row in rows if row['URL'] == urls[0]))
+    assert details[0]['Descrição'] and details[0]['Seções']
+
+
+@pytest.mark.parametrize('wp_api', [True, False])
+def test_api_source_matches_html_and_falls_back_without_wp_json(tmp_path, wp_api):
+    output = str(tmp_path / 'servicos.csv')
+    with serve(FixtureSite(wp_api=wp_api)) as server:
+        expected = [row.to_row() for row in scraper(server).crawl(None)]
+        crawl = scraper(server, source='api')
+        crawl.run_scraper(filename=output)
+    assert list(read_records(output)) == expected
+    # A sondagem de /wp-json/ sem a API não conta como página perdida
+    assert crawl.fetcher.stats['lost'] == 0
+
+
+@pytest.mark.parametrize('concurrent', [False, True])
+def test_monitor_keeps_profile_whose_first_page_failed(tmp_path, concurrent):
+    site = FixtureSite()
+    output = str(tmp_path / 'servicos.csv')
+    with serve(site) as server:
+        scraper(server).run_monitor(filename=output, concurrent=concurrent)
+        baseline = list(read_records(output))
+
+        # Uma mudança real em outro perfil faz a saída ser regravada
+        site.catalogue['fiscalizacao'][0]['title'] = 'Título alterado'
+        fail_path(site, '/Geral/agropecuaria/')
+        scraper(server).run_monitor(filename=output, concurrent=concurrent)
+
+    with open(changes_filename(output), encoding='utf-8') as f:
+        changes = [json.loads(line) for line in f]
+    assert [change['Tipo'] for change in changes] == ['alterado']
+    rows = list(read_records(output))
+    assert len(rows) == len(baseline)
+    assert [row['URL'] for row in rows] == [row['URL'] for row in baseline]
+    assert sum(row['Serviços'] == 'Título alterado' for row in rows) == 1
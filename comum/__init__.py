@@ -0,0 +1,3 @@
+"""
+Componentes compartilhados pelos scrapers e pelo cruzamento de dados SEFAZ-MS
+"""
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Agregação em uma passada sobre os registros
+Cada métrica é um acumulador que recebe os registros um a um; a agregação
+percorre os dados uma única vez e alimenta todos os acumuladores, então o
+custo do relatório cresce linearmente com o número de registros, qualquer
+que seja o número de métricas. Os acumuladores guardam só agregados (e
+`capacity` limita os de valores de alta cardinalidade), então os registros
+podem vir de um iterador sobre o arquivo sem que a memória cresça com ele
+"""
+
+import heapq
+import itertools
+from collections import Counter
+
+
+class Accumulator:
+    """Métrica calculada incrementalmente: add() a cada registro, result() no fim"""
+
+    def add(self, row):
+        raise NotImplementedError
+
+    def result(self):
+        raise NotImplementedError
+
+
+class Count(Accumulator):
+    """Número de registros (que satisfazem `predicate`, se informado)"""
+
+    def __init__(self, predicate=None):
+        self.predicate = predicate
+        self.count = 0
+
+    def add(self, row):
+        if self.predicate is None or self.predicate(row):
+            self.count += 1
+
+    def result(self):
+        return self.count
+
+
+class Sum(Accumulator):
+    """Soma de `value(registro)`"""
+
+    def __init__(self, value):
+        self.value = value
+        self.total = 0
+
+    def add(self, row):
+        self.total += self.value(row)
+
+    def result(self):
+        return self.total
+
+
+class Frequencies(Accumulator):
+    """Counter dos valores devolvidos por `values(registro)` (um iterável)
+
+    `initial` inclui chaves com contagem zero, na ordem dada, antes das
+    encontradas nos dados. Com `capacity`, quando o número de valores
+    distintos passa do limite, só os `capacity // 2` mais frequentes são
+    mantidos: a contagem é exata enquanto o limite não é atingido e, depois,
+    os valores frequentes continuam no topo (com contagens aproximadas para
+    baixo) e `pruned` fica True.
+    """
+
+    def __init__(self, values, initial=(), capacity=None):
+        self.values = values
+        self.counts = Counter(dict.fromkeys(initial, 0))
+        self.capacity = capacity
+        self.pruned = False
+
+    def add(self, row):
+        self.counts.update(self.values(row))
+        if self.capacity is not None and len(self.counts) > self.capacity:
+            self.counts = Counter(dict(self.counts.most_common(self.capacity // 2)))
+            self.pruned = True
+
+    def result(self):
+        return self.counts
+
+
+class Largest(Accumulator):
+    """Os `n` itens de maior `key`, em ordem decrescente
+
+    Guarda só `n` itens (heap); empates ficam na ordem de chegada, como em
+    uma ordenação estável da lista completa. `item(registro)` monta o item
+    guardado e `key(item)` dá o valor comparado.
+    """
+
+    def __init__(self, n, item, key):
+        self.n = n
+        self.item = item
+        self.key = key
+        self.heap = []
+        self.order = itertools.count()
+
+    def add(self, row):
+        item = self.item(row)
+        # A ordem negativa desempata sem nunca comparar os itens
+        entry = (self.key(item), -next(self.order), item)
+        if len(self.heap) < self.n:
+            heapq.heappush(self.heap, entry)
+        elif entry > self.heap[0]:
+            heapq.heapreplace(self.heap, entry)
+
+    def result(self):
+        return [item for _, _, item in sorted(self.heap, reverse=True)]
+
+
+class GroupMean(Accumulator):
+    """Média de `value(registro)` por `group(registro)`, na ordem dos grupos
+
+    Registros com grupo None são ignorados.
+    """
+
+    def __init__(self, group, value):
+        self.group = group
+        self.value = value
+        self.totals = {}
+
+    def add(self, row):
+        group = self.group(row)
+        if group is None:
+            return
+        total = self.totals.get(group)
+        if total is None:
+            total = self.totals[group] = [0, 0]
+        total[0] += self.value(row)
+        total[1] += 1
+
+    def result(self):
+        return {group: total / count for group, (total, count) in self.totals.items()}
+
+
+class GroupFrequencies(Accumulator):
+    """Counter de `values(registro)` para cada `group(registro)`, na ordem dos grupos"""
+
+    def __init__(self, group, values):
+        self.group = group
+        self.values = values
+        self.counts = {}
+
+    def add(self, row):
+        group = self.group(row)
+        counts = self.counts.get(group)
+        if counts is None:
+            counts = self.counts[group] = Counter()
+        counts.update(self.values(row))
+
+    def result(self):
+        return self.counts
+
+
+class Aggregation:
+    """Conjunto de acumuladores nomeados alimentados por uma única passada"""
+
+    def __init__(self, **accumulators):
+        self.accumulators = accumulators
+
+    def add(self, row):
+        for accumulator in self.accumulators.values():
+            accumulator.add(row)
+
+    def run(self, rows):
+        """Percorre `rows` (qualquer iterável) uma vez e devolve {nome: resultado}"""
+        add = [accumulator.add for accumulator in self.accumulators.values()]
+        for row in rows:
+            for add_row in add:
+                add_row(row)
+        return self.results()
+
+    def results(self):
+        return {name: accumulator.result() for name, accumulator in self.accumulators.items()}
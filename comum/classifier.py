@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Classificação de textos por palavras-chave
+Uma taxonomia (tipo -> palavras-chave) é compilada em um autômato de
+Aho-Corasick sobre o texto sem acentos e em minúsculas, então cada nome de
+serviço é classificado em uma única varredura, qualquer que seja o número
+de tipos e palavras-chave. 'certidão' e 'certidao' casam com as duas grafias
+"""
+
+import json
+import unicodedata
+from collections import deque
+
+
+def fold(text):
+    """Minúsculas e sem acentos: 'Emissão de Certidão' -> 'emissao de certidao'"""
+    text = text.lower()
+    if text.isascii():
+        return text
+    text = unicodedata.normalize('NFKD', text)
+    return ''.join(char for char in text if not unicodedata.combining(char))
+
+
+def load_taxonomy(filename):
+    """Lê uma taxonomia em JSON: {"Tipo": ["palavra-chave", ...], ...}
+
+    A ordem dos tipos no arquivo é a ordem de prioridade da classificação.
+    """
+    with open(filename, 'r', encoding='utf-8') as f:
+        taxonomy = json.load(f)
+    if not isinstance(taxonomy, dict) or not all(
+            isinstance(keywords, list) and all(isinstance(keyword, str) for keyword in keywords)
+            for keywords in taxonomy.values()):
+        raise ValueError(f"Taxonomia inválida em {filename}: esperado um objeto "
+                         f"{{tipo: [palavras-chave]}}")
+    return taxonomy
+
+
+class KeywordClassifier:
+    """Autômato de Aho-Corasick com as palavras-chave de todos os tipos
+
+    Cada estado guarda, em um inteiro, o conjunto (bits) dos tipos cujas
+    palavras-chave terminam nele, já somados os dos estados de falha. Uma
+    palavra-chave casa em qualquer posição do texto, como `palavra in texto`.
+    As falhas são resolvidas na compilação (uma transição por caractere na
+    varredura) e o resultado de cada texto distinto é guardado, já que o
+    mesmo serviço se repete entre perfis e snapshots.
+    """
+
+    # Textos distintos guardados antes de o cache ser esvaziado
+    CACHE_SIZE = 65536
+
+    def __init__(self, taxonomy):
+        self.taxonomy = {label: list(keywords) for label, keywords in taxonomy.items()}
+        self.labels = list(taxonomy)
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [0]
+        for index, keywords in enumerate(taxonomy.values()):
+            for keyword in keywords:
+                self._add(fold(keyword), 1 << index)
+        self._link()
+        self._cache = {}
+
+    @classmethod
+    def from_file(cls, filename):
+        return cls(load_taxonomy(filename))
+
+    def _add(self, keyword, label_bit):
+        if not keyword:
+            return
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(0)
+            state = next_state
+        self._output[state] |= label_bit
+
+    def _link(self):
+        # Busca em largura: a falha de um estado é sempre mais rasa que ele
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._output[next_state] |= self._output[self._fail[next_state]]
+                queue.append(next_state)
+        # Transições completas: caracteres sem aresta seguem a da falha
+        # (já completa, por ser mais rasa); fora do alfabeto, volta à raiz
+        self._delta = [dict(self._goto[0])]
+        queue = deque(self._goto[0].values())
+        self._delta.extend({} for _ in range(len(self._goto) - 1))
+        while queue:
+            state = queue.popleft()
+            self._delta[state] = {**self._delta[self._fail[state]], **self._goto[state]}
+            queue.extend(self._goto[state].values())
+
+    def matches(self, text):
+        """Bits dos tipos com alguma palavra-chave no texto (uma varredura)"""
+        text = text or ''
+        found = self._cache.get(text)
+        if found is not None:
+            return found
+        delta, output = self._delta, self._output
+        state = 0
+        found = 0
+        for char in fold(text):
+            state = delta[state].get(char, 0)
+            found |= output[state]
+        if len(self._cache) >= self.CACHE_SIZE:
+            self._cache.clear()
+        self._cache[text] = found
+        return found
+
+    def classify(self, text, default=None):
+        """Primeiro tipo da taxonomia (em ordem) que casa com o texto, ou `default`"""
+        found = self.matches(text)
+        if not found:
+            return default
+        return self.labels[(found & -found).bit_length() - 1]
+
+    def classify_all(self, text):
+        """Todos os tipos que casam com o texto, na ordem da taxonomia"""
+        found = self.matches(text)
+        return [label for index, label in enumerate(self.labels) if found >> index & 1]
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Catálogo deduplicado por URL canônica
+O mesmo serviço aparece em vários perfis; no formato deduplicado cada
+serviço é um único registro com a lista de perfis em Perfis (separados
+por ';', como as categorias), e pode ser expandido de volta para o
+formato longo de uma linha por perfil
+"""
+
+from comum.frontier import canonicalize_url
+
+SEPARATOR = ';'
+
+
+def split_values(value):
+    """'Agropecuária;Fiscalização' -> ['Agropecuária', 'Fiscalização']"""
+    return [item for item in str(value or '').split(SEPARATOR) if item]
+
+
+class ServiceIndex:
+    """Registros de serviços agrupados pela URL canônica, na ordem de aparição
+
+    Aceita linhas no formato longo (um perfil por linha) ou já
+    deduplicadas; categorias e perfis de ocorrências repetidas são unidos.
+    """
+
+    def __init__(self, rows=()):
+        self.services = {}
+        self.rows_seen = 0
+        self.add_rows(rows)
+
+    def add(self, row):
+        self.rows_seen += 1
+        url = row.get('URL', '')
+        if not url:
+            return
+        key = canonicalize_url(url)
+        if key not in self.services:
+            # A primeira ocorrência é mantida como veio (ordem e repetições de
+            # categorias incluídas), para que a expansão reproduza o original
+            self.services[key] = {
+                'Categorias': split_values(row.get('Categorias')),
+                'Perfis': [],
+                'Serviços': row.get('Serviços', ''),
+                'URL': url
+            }
+        entry = self.services[key]
+        for field in ('Categorias', 'Perfis'):
+            for value in split_values(row.get(field)):
+                if value not in entry[field]:
+                    entry[field].append(value)
+
+    def add_rows(self, rows):
+        for row in rows:
+            self.add(row)
+
+    def __len__(self):
+        return len(self.services)
+
+    def records(self):
+        """Um registro por serviço, no esquema Categorias/Perfis/Serviços/URL"""
+        for entry in self.services.values():
+            yield {
+                'Categorias': SEPARATOR.join(entry['Categorias']),
+                'Perfis': SEPARATOR.join(entry['Perfis']),
+                'Serviços': entry['Serviços'],
+                'URL': entry['URL']
+            }
+
+    def summary(self):
+        return (f"Deduplicação: {self.rows_seen} ocorrências -> {len(self)} serviços únicos "
+                f"({self.rows_seen - len(self)} repetições entre perfis)")
+
+
+def expand_profiles(records):
+    """Formato deduplicado -> formato longo (uma linha por perfil)
+
+    Linhas que já estão no formato longo passam inalteradas.
+    """
+    for record in records:
+        profiles = split_values(record.get('Perfis'))
+        if len(profiles) <= 1:
+            yield record
+            continue
+        for profile in profiles:
+            yield {**record, 'Perfis': profile}
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Coleta incremental e delta entre snapshots
+Compara o CSV da execução anterior com o atual, usando a URL como chave
+"""
+
+import csv
+import hashlib
+import json
+import os
+import threading
+
+from comum.dedup import split_values
+from comum.sinks import read_records
+
+DELTA_FIELDNAMES = [
+    'Tipo', 'URL',
+    'Serviços', 'Serviços_Anterior',
+    'Categorias', 'Categorias_Anterior',
+    'Perfis', 'Perfis_Anterior'
+]
+
+
+def load_snapshot(filename):
+    """Carrega um snapshot no esquema Categorias/Perfis/Serviços/URL (vazio se não existir)
+
+    Aceita qualquer formato gravado por comum.sinks (CSV, JSON Lines, Parquet).
+    """
+    if not os.path.exists(filename):
+        return []
+    return list(read_records(filename))
+
+
+def delta_filename(filename):
+    """sefaz_servicos.csv (ou .jsonl, .parquet) -> sefaz_servicos_delta.csv
+
+    O delta é sempre gravado em CSV (save_delta).
+    """
+    root, _ = os.path.splitext(filename)
+    return f"{root}_delta.csv"
+
+
+def index_by_url(rows):
+    """Agrupa as linhas por URL, unindo categorias e perfis de ocorrências repetidas
+
+    Aceita tanto o formato longo quanto o deduplicado (perfis separados por ';').
+    """
+    index = {}
+    for row in rows:
+        url = row.get('URL', '')
+        if not url:
+            continue
+        entry = index.setdefault(url, {
+            'Serviços': row.get('Serviços', ''),
+            'Categorias': set(),
+            'Perfis': set()
+        })
+        entry['Categorias'].update(split_values(row.get('Categorias')))
+        entry['Perfis'].update(split_values(row.get('Perfis')))
+    return index
+
+
+def compute_delta(old_rows, new_rows):
+    """Lista de mudanças (adicionado, removido, renomeado, recategorizado, perfis)"""
+    old_index = index_by_url(old_rows)
+    new_index = index_by_url(new_rows)
+    delta = []
+
+    def change(kind, url, new=None, old=None):
+        new = new or {'Serviços': '', 'Categorias': set(), 'Perfis': set()}
+        old = old or {'Serviços': '', 'Categorias': set(), 'Perfis': set()}
+        delta.append({
+            'Tipo': kind,
+            'URL': url,
+            'Serviços': new['Serviços'],
+            'Serviços_Anterior': old['Serviços'],
+            'Categorias': ';'.join(sorted(new['Categorias'])),
+            'Categorias_Anterior': ';'.join(sorted(old['Categorias'])),
+            'Perfis': ';'.join(sorted(new['Perfis'])),
+            'Perfis_Anterior': ';'.join(sorted(old['Perfis']))
+        })
+
+    for url, new in new_index.items():
+        old = old_index.get(url)
+        if old is None:
+            change('adicionado', url, new=new)
+            continue
+        if new['Serviços'] != old['Serviços']:
+            change('renomeado', url, new, old)
+        if new['Categorias'] != old['Categorias']:
+            change('recategorizado', url, new, old)
+        if new['Perfis'] != old['Perfis']:
+            change('perfis_alterados', url, new, old)
+
+    for url, old in old_index.items():
+        if url not in new_index:
+            change('removido', url, old=old)
+
+    return delta
+
+
+def save_delta(delta, filename):
+    """Salva o delta em CSV (o arquivo é sempre gerado, mesmo sem mudanças)"""
+    with open(filename, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=DELTA_FIELDNAMES)
+        writer.writeheader()
+        writer.writerows(delta)
+
+
+class PageManifest:
+    """Impressão digital de cada página coletada e o que foi extraído dela
+
+    Permite reaproveitar a extração de páginas cujo HTML não mudou desde a
+    execução anterior.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.previous = {}
+        self.current = {}
+        self.reused = 0
+        self.parsed = 0
+        self.lock = threading.Lock()
+        if os.path.exists(filename):
+            try:
+                with open(filename, 'r', encoding='utf-8') as f:
+                    self.previous = json.load(f)
+            except ValueError:
+                self.previous = {}
+
+    @staticmethod
+    def manifest_filename(filename):
+        """sefaz_servicos.csv -> sefaz_servicos_paginas.json"""
+        root, _ = os.path.splitext(filename)
+        return f"{root}_paginas.json"
+
+    @staticmethod
+    def content_hash(content):
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    def lookup(self, url, content):
+        """Resultado salvo da página se o conteúdo não mudou, senão None"""
+        digest = self.content_hash(content)
+        entry = self.previous.get(url)
+        if entry and entry['hash'] == digest:
+            with self.lock:
+                self.current[url] = entry
+                self.reused += 1
+            return entry['result']
+        return None
+
+    def record(self, url, content, result):
+        """Registra o resultado (serializável em JSON) extraído da página"""
+        digest = self.content_hash(content)
+        with self.lock:
+            self.current[url] = {'hash': digest, 'result': result}
+            self.parsed += 1
+
+    def save(self):
+        """Grava somente as páginas vistas nesta execução"""
+        tmp_path = self.filename + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.current, f, ensure_ascii=False)
+        os.replace(tmp_path, self.filename)
+
+    def summary(self):
+        return f"Páginas inalteradas reaproveitadas: {self.reused}, reprocessadas: {self.parsed}"
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Camada de requisições com novas tentativas e circuit breaker por host
+Falhas transitórias (timeouts, conexões derrubadas, 5xx, 429) são repetidas
+com backoff exponencial e jitter; um host que falha seguidamente deixa de
+ser requisitado por um tempo; páginas perdidas ficam registradas para o
+resumo da execução
+"""
+
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+class FetchError(Exception):
+    """Página não obtida após as tentativas"""
+
+    def __init__(self, url, reason):
+        super().__init__(f"{url}: {reason}")
+        self.url = url
+        self.reason = reason
+
+
+def classify_error(error):
+    """Motivo da falha e se vale a pena tentar de novo"""
+    if isinstance(error, requests.Timeout):
+        return 'timeout', True
+    if isinstance(error, requests.ConnectionError):
+        return 'conexão', True
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        status = error.response.status_code
+        return f"HTTP {status}", status in RETRY_STATUS
+    return type(error).__name__, False
+
+
+class CircuitBreaker:
+    """Estado de um host: fechado, aberto (sem requisições) ou meio-aberto
+
+    Após `threshold` falhas seguidas o circuito abre por `cooldown`
+    segundos; depois disso uma única requisição de teste é liberada e, se
+    der certo, o circuito fecha de novo. Enquanto o circuito está aberto ou
+    o teste está em andamento, acquire() espera em vez de recusar, então a
+    página não é dada como perdida só por causa do estado do host.
+    """
+
+    def __init__(self, threshold=5, cooldown=60.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.trips = 0
+        self.waits = 0
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+
+    def allow(self):
+        """Libera a requisição agora (circuito fechado ou vez do teste)?"""
+        with self.lock:
+            return self._allow()
+
+    def _allow(self):
+        if self.opened_at is None:
+            return True
+        if self.probing or time.monotonic() - self.opened_at < self.cooldown:
+            return False
+        self.probing = True
+        return True
+
+    def acquire(self):
+        """Espera até o circuito liberar uma requisição
+
+        Com o circuito aberto, espera o fim de `cooldown`; com um teste em
+        andamento, espera o resultado dele (fechado: segue; falhou: espera o
+        novo `cooldown`). Retorna True se a requisição liberada é o teste.
+        """
+        with self.lock:
+            if not self._allow():
+                self.waits += 1
+                while not self._allow():
+                    if self.probing:
+                        self.changed.wait()
+                    else:
+                        self.changed.wait(self.opened_at + self.cooldown - time.monotonic())
+            return self.opened_at is not None
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+            self.changed.notify_all()
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.probing or (self.opened_at is None and self.failures >= self.threshold):
+                self.opened_at = time.monotonic()
+                self.trips += 1
+            self.probing = False
+            self.changed.notify_all()
+
+    def release(self):
+        """Encerra um teste sem resultado sobre o host (ex.: exceção inesperada, 404)"""
+        with self.lock:
+            self.probing = False
+            self.changed.notify_all()
+
+
+class Fetcher:
+    """Obtém páginas com novas tentativas, passando pelo cache e pelo limitador
+
+    `fetch(url)` retorna o texto da página ou levanta FetchError. Com
+    `metrics` (comum.metrics.Metrics), cada tentativa é medida na etapa
+    'fetch' e os bytes recebidos da rede, os acertos do cache e as páginas
+    obtidas/perdidas são contados.
+    """
+
+    def __init__(self, session, timeout=10, retries=3, backoff=0.5, max_backoff=30.0,
+                 breaker_threshold=5, breaker_cooldown=60.0, cache=None, limiter=None,
+                 metrics=None):
+        self.session = session
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.cache = cache
+        self.limiter = limiter
+        self.metrics = metrics
+        self.breakers = {}
+        self.lost = []
+        self.lock = threading.Lock()
+        self.stats = {
+            'requests': 0,
+            'retries': 0,
+            'recovered': 0,
+            'lost': 0
+        }
+
+    def breaker(self, url):
+        host = (urlsplit(url).hostname or '').lower()
+        with self.lock:
+            if host not in self.breakers:
+                self.breakers[host] = CircuitBreaker(self.breaker_threshold, self.breaker_cooldown)
+            return self.breakers[host]
+
+    def _get(self, url):
+        """(conteúdo, origem, bytes): origem 'miss' se veio da rede, 'hit'/'revalidated' se do cache
+
+        `bytes` é o tamanho do corpo recebido (response.content, já
+        descomprimido), sem reencodar o texto.
+        """
+        if self.cache:
+            return self.cache.fetch_with_source(self.session, url, timeout=self.timeout, limiter=self.limiter)
+        if self.limiter:
+            response = self.limiter.request(self.session, 'GET', url, timeout=self.timeout)
+        else:
+            response = self.session.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        return response.text, 'miss', len(response.content)
+
+    def _delay(self, attempt):
+        # Backoff exponencial com jitter completo
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def _count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    def _lose(self, url, reason):
+        with self.lock:
+            self.stats['lost'] += 1
+            self.lost.append((url, reason))
+        if self.metrics:
+            self.metrics.increment('pages_total', status='lost')
+        return FetchError(url, reason)
+
+    def fetch(self, url, missing_ok=False):
+        """Texto da página; FetchError se não foi obtida após as tentativas
+
+        Com `missing_ok`, um 404 é uma resposta esperada (ex.: sondagem de uma
+        rota que o site pode não ter): levanta FetchError sem contar a página
+        como perdida.
+        """
+        breaker = self.breaker(url)
+        reason = None
+        for attempt in range(self.retries + 1):
+            # Com o circuito aberto, espera o cooldown (ou o teste) em vez de desistir
+            probe = breaker.acquire()
+            if attempt:
+                self._count('retries')
+            self._count('requests')
+            started = time.perf_counter()
+            try:
+                body, source, payload_bytes = self._get(url)
+            except requests.RequestException as e:
+                if self.metrics:
+                    self.metrics.observe('fetch', time.perf_counter() - started)
+                reason, retryable = classify_error(e)
+                if not retryable:
+                    # Falha definitiva da página, não do host: o circuito
+                    # não fecha nem zera as falhas, só o teste é encerrado
+                    if probe:
+                        breaker.release()
+                    if missing_ok and e.response is not None and e.response.status_code == 404:
+                        raise FetchError(url, reason)
+                    raise self._lose(url, reason)
+                breaker.record_failure()
+                if attempt < self.retries:
+                    time.sleep(self._delay(attempt))
+                continue
+            except BaseException:
+                if probe:
+                    breaker.release()
+                raise
+            breaker.record_success()
+            if attempt:
+                self._count('recovered')
+            if self.metrics:
+                self.metrics.observe('fetch', time.perf_counter() - started)
+                # Só bytes que vieram da rede; acertos do cache têm contador próprio
+                if source == 'miss':
+                    self.metrics.increment('response_payload_bytes_total', payload_bytes)
+                else:
+                    self.metrics.increment('cache_hits_total', status=source)
+                self.metrics.increment('pages_total', status='ok')
+            return body
+        raise self._lose(url, f"{reason} após {self.retries + 1} tentativas")
+
+    def summary(self):
+        """Resumo das requisições e das páginas perdidas"""
+        trips = sum(breaker.trips for breaker in self.breakers.values())
+        waits = sum(breaker.waits for breaker in self.breakers.values())
+        lines = [f"Requisições: {self.stats['requests']}, novas tentativas: {self.stats['retries']}, "
+                 f"recuperadas: {self.stats['recovered']}, páginas perdidas: {self.stats['lost']}, "
+                 f"circuit breaker acionado: {trips}x ({waits} esperas)"]
+        for url, reason in self.lost:
+            lines.append(f"  perdida: {url} ({reason})")
+        return '\n'.join(lines)
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fronteira de coleta com canonicalização de URLs
+Evita visitar duas vezes a mesma página escrita de formas diferentes e
+agenda de uma só vez toda a paginação do WordPress (/page/N/)
+"""
+
+import functools
+import heapq
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+PAGE_PATTERN = re.compile(r'/page/(\d+)/?$')
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+@functools.lru_cache(maxsize=65536)
+def canonicalize_url(url):
+    """Forma canônica de uma URL
+
+    Esquema e host em minúsculas, sem porta padrão, sem fragmento, barras
+    duplicadas removidas, barra final em caminhos sem extensão, parâmetros
+    ordenados e /page/1/ equivalente à primeira página. Memorizada: cada
+    página de um perfil agenda de novo toda a paginação dele, então as
+    mesmas URLs são canonicalizadas várias vezes.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+
+    path = re.sub(r'/{2,}', '/', parts.path) or '/'
+    path = re.sub(r'/page/1/?$', '/', path)
+    last_segment = path.rsplit('/', 1)[-1]
+    if last_segment and '.' not in last_segment:
+        path += '/'
+
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, path, query, ''))
+
+
+def page_number(url):
+    """Número da página na paginação (1 quando a URL não tem /page/N/)"""
+    match = PAGE_PATTERN.search(urlsplit(url).path)
+    return int(match.group(1)) if match else 1
+
+
+def expand_pagination(pagination_urls):
+    """Gera as URLs de todas as páginas de 2 até a última
+
+    A última página é lida dos links do bloco de paginação e as demais são
+    montadas a partir do mesmo padrão /page/N/. Sem esse padrão, retorna
+    lista vazia (resta seguir apenas os links encontrados).
+    """
+    numbered = [(page_number(url), url) for url in pagination_urls
+                if PAGE_PATTERN.search(urlsplit(url).path)]
+    if not numbered:
+        return []
+
+    last_page, sample = max(numbered)
+    parts = urlsplit(sample)
+    return [urlunsplit(parts._replace(path=PAGE_PATTERN.sub(f'/page/{number}/', parts.path)))
+            for number in range(2, last_page + 1)]
+
+
+class CrawlFrontier:
+    """Controle de URLs agendadas e da ordem de saída dos resultados
+
+    A fila em si fica com quem consome (deque no modo sequencial,
+    asyncio.Queue no concorrente); aqui ficam a deduplicação por URL
+    canônica e a chave de ordenação (perfil, página, ordem de descoberta).
+    Resultados concluídos fora de ordem ficam retidos até que todas as
+    páginas anteriores terminem, para que a saída possa ser gravada de
+    forma incremental sem perder a ordem. Com um diário (comum.journal),
+    agendamentos e resultados também são persistidos.
+    """
+
+    def __init__(self, journal=None):
+        self.keys = {}
+        self.journal = journal
+        self._sequence = 0
+        self._pending = []
+        self._results = {}
+
+    @classmethod
+    def restore(cls, journal, decode=None):
+        """Reconstrói a fronteira a partir do diário de uma coleta interrompida
+
+        Retorna (fronteira, linhas_liberadas, urls_pendentes): as linhas das
+        páginas já concluídas saem na ordem normal e as páginas pendentes ou
+        que falharam voltam para a fila. `decode` converte cada linha lida do
+        diário (ex.: ServiceRecord.from_row).
+        """
+        frontier = cls()
+        pages, rows = journal.load()
+        if decode is not None:
+            rows = {url: [decode(row) for row in page_rows] for url, page_rows in rows.items()}
+        for url, key, _ in pages:
+            frontier.keys[url] = key
+            heapq.heappush(frontier._pending, (key, url))
+            frontier._sequence = max(frontier._sequence, key[2] + 1)
+
+        released = []
+        pending = []
+        for url, _, status in pages:
+            if status == 'done':
+                released.extend(frontier.complete(url, rows.get(url, [])))
+            else:
+                pending.append(url)
+
+        frontier.journal = journal
+        return frontier, released, pending
+
+    def add(self, url, root_index=0):
+        """Agenda uma URL; retorna a forma canônica ou None se já foi agendada"""
+        canonical = canonicalize_url(url)
+        if canonical in self.keys:
+            return None
+        key = (root_index, page_number(canonical), self._sequence)
+        self.keys[canonical] = key
+        heapq.heappush(self._pending, (key, canonical))
+        self._sequence += 1
+        if self.journal:
+            self.journal.schedule(canonical, key)
+        return canonical
+
+    def root_of(self, url):
+        return self.keys[url][0]
+
+    def complete(self, url, results=(), failed=False):
+        """Marca a página como concluída (com ou sem resultados)
+
+        Retorna, em ordem, os resultados liberados: os desta página e os de
+        páginas posteriores que já estavam prontos, desde que nenhuma página
+        anterior ainda esteja pendente.
+        """
+        if self.journal:
+            self.journal.complete(url, results, failed)
+        self._results[url] = results
+        released = []
+        while self._pending and self._pending[0][1] in self._results:
+            _, ready = heapq.heappop(self._pending)
+            released.extend(self._results.pop(ready))
+        return released
+
+    def __contains__(self, url):
+        return canonicalize_url(url) in self.keys
+
+    def __len__(self):
+        return len(self.keys)
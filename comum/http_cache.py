@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache HTTP em disco com GET condicional
+Reaproveita páginas já baixadas revalidando-as com ETag / Last-Modified
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+
+class HttpCache:
+    def __init__(self, cache_dir='.http_cache', ttl=3600, max_bytes=50 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        # Dentro do TTL a página é servida sem nenhuma requisição; depois
+        # disso é revalidada com GET condicional
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(cache_dir, 'index.json')
+        self.lock = threading.Lock()
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'revalidated': 0
+        }
+        os.makedirs(cache_dir, exist_ok=True)
+        # O índice fica em ordem de uso (menos recente primeiro) e o tamanho
+        # total é mantido a cada gravação, então a remoção não ordena nem
+        # soma as entradas; o índice só vai para o disco em save()
+        self.index = self._load_index()
+        self.total_bytes = sum(entry['size'] for entry in self.index.values())
+    
+    def _load_index(self):
+        """Carrega o índice de entradas do cache, do menos ao mais usado recentemente"""
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return dict(sorted(index.items(), key=lambda item: item[1]['last_access']))
+    
+    def _touch(self, key, now):
+        """Marca o uso da entrada, movendo-a para o fim da ordem de uso"""
+        entry = self.index.pop(key, None)
+        if entry is not None:
+            entry['last_access'] = now
+            self.index[key] = entry
+        return entry
+    
+    def _body_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.html")
+    
+    def _read_body(self, key):
+        try:
+            with open(self._body_path(key), 'r', encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            return None
+    
+    def fetch(self, session, url, timeout=10, limiter=None):
+        """Obtém o conteúdo de uma URL passando pelo cache
+
+        Exceções de rede e de status HTTP são propagadas como em
+        session.get(...).raise_for_status(). Com um limitador
+        (comum.rate_limiter.RateLimiter), só as requisições que de fato vão
+        ao servidor consomem fichas.
+        """
+        return self.fetch_with_source(session, url, timeout, limiter)[0]
+    
+    def fetch_with_source(self, session, url, timeout=10, limiter=None):
+        """Como fetch(), mas retorna (conteúdo, origem, bytes)
+
+        A origem é 'hit' (cache dentro do TTL), 'revalidated' (304, corpo do
+        cache) ou 'miss' (corpo recebido do servidor); `bytes` é o tamanho do
+        corpo recebido (response.content), 0 quando o corpo veio do cache.
+        """
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        now = time.time()
+        
+        with self.lock:
+            entry = self.index.get(key)
+        body = self._read_body(key) if entry else None
+        
+        if body is not None and now - entry['stored_at'] < self.ttl:
+            with self.lock:
+                self._touch(key, now)
+                self.stats['hits'] += 1
+            return body, 'hit', 0
+        
+        headers = {}
+        if body is not None:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        
+        if limiter:
+            response = limiter.request(session, 'GET', url, timeout=timeout, headers=headers)
+        else:
+            response = session.get(url, timeout=timeout, headers=headers)
+        
+        if response.status_code == 304 and body is not None:
+            with self.lock:
+                entry = self._touch(key, now)
+                if entry is not None:
+                    entry['stored_at'] = now
+                self.stats['revalidated'] += 1
+            return body, 'revalidated', 0
+        
+        response.raise_for_status()
+        body = response.text
+        self._store(key, url, response, body, now)
+        with self.lock:
+            self.stats['misses'] += 1
+        return body, 'miss', len(response.content)
+    
+    def _store(self, key, url, response, body, now):
+        """Grava o corpo da resposta e atualiza o índice"""
+        with open(self._body_path(key), 'w', encoding='utf-8') as f:
+            f.write(body)
+        
+        with self.lock:
+            previous = self.index.pop(key, None)
+            if previous is not None:
+                self.total_bytes -= previous['size']
+            entry = {
+                'url': url,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'stored_at': now,
+                'last_access': now,
+                'size': len(body.encode('utf-8'))
+            }
+            self.index[key] = entry
+            self.total_bytes += entry['size']
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+    
+    def _evict(self):
+        """Remove as entradas menos usadas recentemente até caber no limite"""
+        while self.total_bytes > self.max_bytes and self.index:
+            key = next(iter(self.index))
+            self.total_bytes -= self.index.pop(key)['size']
+            try:
+                os.remove(self._body_path(key))
+            except OSError:
+                pass
+    
+    def _save_index(self):
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f)
+        os.replace(tmp_path, self.index_path)
+    
+    def save(self):
+        """Aplica o limite de tamanho e persiste o índice em disco"""
+        with self.lock:
+            self._evict()
+            self._save_index()
+    
+    def summary(self):
+        """Resumo das estatísticas do cache em uma linha"""
+        return (f"Cache HTTP: {self.stats['hits']} hits, {self.stats['misses']} misses, "
+                f"{self.stats['revalidated']} revalidações (304)")
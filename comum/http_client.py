@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cliente HTTP compartilhado com pool de conexões por host
+Sessão do requests com keep-alive, tamanho de pool configurável e
+compressão, usada pelos dois scrapers e pela validação de URLs, com
+estatísticas de reaproveitamento de conexões
+"""
+
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+
+USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+              '(KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36')
+
+
+class PoolAdapter(HTTPAdapter):
+    """HTTPAdapter que guarda os pools usados, para contar conexões abertas"""
+
+    def __init__(self, *args, **kwargs):
+        self.pools = []
+        self._pools_lock = threading.Lock()
+        super().__init__(*args, **kwargs)
+
+    def _track(self, pool):
+        with self._pools_lock:
+            if not any(pool is known for known in self.pools):
+                self.pools.append(pool)
+        return pool
+
+    def get_connection(self, url, proxies=None):
+        return self._track(super().get_connection(url, proxies))
+
+    def get_connection_with_tls_context(self, request, verify, proxies=None, cert=None):
+        # requests >= 2.32
+        return self._track(super().get_connection_with_tls_context(request, verify, proxies, cert))
+
+
+class HttpClient(requests.Session):
+    """Sessão com pool de conexões por host, keep-alive e compressão
+
+    `pool_connections` é o número de hosts com pool mantido e
+    `pool_maxsize` o de conexões abertas por host; deve cobrir o número de
+    requisições simultâneas, senão conexões excedentes são descartadas após
+    o uso. Aceita gzip/deflate (e brotli/zstd, se instalados).
+    """
+
+    def __init__(self, pool_connections=10, pool_maxsize=10, user_agent=USER_AGENT):
+        super().__init__()
+        self.pool_maxsize = pool_maxsize
+        self.adapter = PoolAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.mount('http://', self.adapter)
+        self.mount('https://', self.adapter)
+        self.headers.update({
+            'User-Agent': user_agent,
+            'Accept-Encoding': ACCEPT_ENCODING,
+            'Connection': 'keep-alive'
+        })
+
+    def stats(self):
+        """Requisições e conexões abertas por host"""
+        hosts = {}
+        with self.adapter._pools_lock:
+            pools = list(self.adapter.pools)
+        for pool in pools:
+            entry = hosts.setdefault(pool.host, {'requests': 0, 'connections': 0})
+            entry['requests'] += pool.num_requests
+            entry['connections'] += pool.num_connections
+        return hosts
+
+    def summary(self):
+        """Reaproveitamento de conexões em uma linha"""
+        hosts = self.stats()
+        requests_total = sum(entry['requests'] for entry in hosts.values())
+        connections = sum(entry['connections'] for entry in hosts.values())
+        if not requests_total:
+            return "Conexões HTTP: nenhuma requisição"
+        reused = requests_total - connections
+        return (f"Conexões HTTP: {requests_total} requisições em {connections} conexões "
+                f"({reused / requests_total:.0%} reaproveitadas, {len(hosts)} hosts)")
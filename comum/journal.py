@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Diário de coleta em SQLite (modo WAL)
+Registra a fronteira, as páginas concluídas e as linhas extraídas para que
+uma coleta interrompida possa ser retomada de onde parou
+"""
+
+import json
+import os
+import sqlite3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    root_index INTEGER,
+    page INTEGER,
+    seq INTEGER,
+    status TEXT
+);
+CREATE TABLE IF NOT EXISTS rows (
+    url TEXT,
+    position INTEGER,
+    data TEXT,
+    PRIMARY KEY (url, position)
+);
+"""
+
+
+def journal_filename(filename):
+    """sefaz_servicos.csv -> sefaz_servicos_journal.db"""
+    root, _ = os.path.splitext(filename)
+    return f"{root}_journal.db"
+
+
+def _encode(row):
+    """Registros (ex.: comum.records.ServiceRecord) viram linhas do CSV no JSON"""
+    if hasattr(row, 'to_row'):
+        return row.to_row()
+    raise TypeError(f"{type(row).__name__} não é serializável em JSON")
+
+
+class CrawlJournal:
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def _get_meta(self, key, default=None):
+        row = self.conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def _set_meta(self, key, value):
+        self.conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+                          (key, json.dumps(value, ensure_ascii=False, default=_encode)))
+
+    def has_unfinished_run(self):
+        return self._get_meta('status') == 'running'
+
+    def start(self, roots, snapshot=None):
+        """Descarta o conteúdo anterior e inicia uma nova coleta"""
+        with self.conn:
+            self.conn.execute('DELETE FROM pages')
+            self.conn.execute('DELETE FROM rows')
+            self.conn.execute('DELETE FROM meta')
+            self._set_meta('status', 'running')
+            self._set_meta('roots', list(roots))
+            if snapshot is not None:
+                self._set_meta('snapshot', snapshot)
+
+    def roots(self):
+        return self._get_meta('roots', [])
+
+    def snapshot(self):
+        """Snapshot anterior guardado no início da coleta (modo incremental)"""
+        return self._get_meta('snapshot', [])
+
+    def schedule(self, url, key):
+        """Registra uma página agendada (gravada no próximo complete)"""
+        root_index, page, seq = key
+        self.conn.execute(
+            'INSERT OR IGNORE INTO pages (url, root_index, page, seq, status) VALUES (?, ?, ?, ?, ?)',
+            (url, root_index, page, seq, 'pending'))
+
+    def complete(self, url, rows, failed=False):
+        """Grava o resultado da página e tudo o que foi agendado a partir dela"""
+        with self.conn:
+            self.conn.execute('DELETE FROM rows WHERE url = ?', (url,))
+            self.conn.executemany(
+                'INSERT INTO rows (url, position, data) VALUES (?, ?, ?)',
+                [(url, position, json.dumps(row, ensure_ascii=False, default=_encode))
+                 for position, row in enumerate(rows)])
+            self.conn.execute('UPDATE pages SET status = ? WHERE url = ?',
+                              ('failed' if failed else 'done', url))
+
+    def load(self):
+        """Páginas em ordem de agendamento [(url, chave, status)] e linhas por página"""
+        pages = [(url, (root_index, page, seq), status) for url, root_index, page, seq, status in
+                 self.conn.execute('SELECT url, root_index, page, seq, status FROM pages ORDER BY seq')]
+        rows = {}
+        for url, data in self.conn.execute('SELECT url, data FROM rows ORDER BY url, position'):
+            rows.setdefault(url, []).append(json.loads(data))
+        return pages, rows
+
+    def finish(self):
+        with self.conn:
+            self._set_meta('status', 'finished')
+
+    def close(self):
+        self.conn.close()
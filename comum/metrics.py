@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Métricas de execução: tempo por etapa, bytes e contagens
+Histogramas de duração (fetch, parse, extract, write, similaridade,
+validação de URLs...) e contadores, exportados em JSON e no formato texto
+do Prometheus ao final de cada execução
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+PREFIX = 'sefaz'
+
+
+def metrics_filenames(filename):
+    """sefaz_servicos.csv -> (sefaz_servicos_metricas.json, sefaz_servicos_metricas.prom)"""
+    root, _ = os.path.splitext(filename)
+    return f"{root}_metricas.json", f"{root}_metricas.prom"
+
+
+class Histogram:
+    """Histograma cumulativo de durações (em segundos)"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            yield bound, total
+
+    def quantile(self, q):
+        """Estimativa pelo limite superior do bucket que contém o quantil"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        for bound, total in self.cumulative():
+            if total >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'mean': round(self.sum / self.count, 6) if self.count else 0.0,
+            'p50': round(self.quantile(0.5), 6),
+            'p95': round(self.quantile(0.95), 6),
+            'max': round(self.max, 6)
+        }
+
+
+class Metrics:
+    """Registro de métricas de uma execução (thread-safe)
+
+    `job` identifica a origem (carta, site, cruzamento) e vira rótulo em
+    todas as séries exportadas.
+    """
+
+    def __init__(self, job):
+        self.job = job
+        self.stages = {}
+        self.counters = {}
+        self.started = time.time()
+        self.lock = threading.Lock()
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            if stage not in self.stages:
+                self.stages[stage] = Histogram()
+            self.stages[stage].observe(seconds)
+
+    @contextmanager
+    def timer(self, stage):
+        """Mede a duração do bloco como uma observação da etapa"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def increment(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def value(self, name, **labels):
+        return self.counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                'job': self.job,
+                'started_at': self.started,
+                'duration_seconds': round(time.time() - self.started, 3),
+                'stages': {stage: histogram.to_dict() for stage, histogram in sorted(self.stages.items())},
+                'counters': [{'name': name, 'labels': dict(labels), 'value': value}
+                             for (name, labels), value in sorted(self.counters.items())]
+            }
+
+    def to_prometheus(self):
+        """Formato texto de exposição do Prometheus"""
+        def labels(**values):
+            pairs = {'job': self.job, **values}
+            return '{' + ','.join(f'{key}="{value}"' for key, value in pairs.items()) + '}'
+
+        lines = [f"# HELP {PREFIX}_stage_duration_seconds Duração de cada etapa",
+                 f"# TYPE {PREFIX}_stage_duration_seconds histogram"]
+        with self.lock:
+            for stage, histogram in sorted(self.stages.items()):
+                for bound, total in histogram.cumulative():
+                    lines.append(f"{PREFIX}_stage_duration_seconds_bucket{labels(stage=stage, le=bound)} {total}")
+                lines.append(f"{PREFIX}_stage_duration_seconds_bucket{labels(stage=stage, le='+Inf')} {histogram.count}")
+                lines.append(f"{PREFIX}_stage_duration_seconds_sum{labels(stage=stage)} {histogram.sum:.6f}")
+                lines.append(f"{PREFIX}_stage_duration_seconds_count{labels(stage=stage)} {histogram.count}")
+
+            names = sorted({name for name, _ in self.counters})
+            for name in names:
+                lines.append(f"# TYPE {PREFIX}_{name} counter")
+                for (counter, counter_labels), value in sorted(self.counters.items()):
+                    if counter == name:
+                        lines.append(f"{PREFIX}_{name}{labels(**dict(counter_labels))} {value}")
+        lines.append(f"# TYPE {PREFIX}_run_duration_seconds gauge")
+        lines.append(f"{PREFIX}_run_duration_seconds{labels()} {time.time() - self.started:.3f}")
+        return '\n'.join(lines) + '\n'
+
+    def export(self, json_path, prometheus_path):
+        """Grava as métricas nos dois formatos"""
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        with open(prometheus_path, 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus())
+
+    def summary(self):
+        """Tempo total e médio de cada etapa em uma linha"""
+        with self.lock:
+            parts = [f"{stage}: {histogram.sum:.2f}s ({histogram.count}x, p95 {histogram.quantile(0.95) * 1000:.0f}ms)"
+                     for stage, histogram in sorted(self.stages.items())]
+        return "Tempo por etapa: " + ('; '.join(parts) if parts else "nenhuma medição")
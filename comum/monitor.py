@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Monitoramento de mudanças por bloco
+Cada página é dividida nos blocos que os scrapers extraem (ul.daems-list
+no site, div.card-body no catálogo) por uma varredura de tags, sem montar
+a árvore HTML, e cada bloco recebe uma impressão digital. Páginas iguais
+às da verificação anterior são descartadas pelo hash da página inteira;
+nas alteradas, só os blocos novos são extraídos e só os blocos que
+mudaram geram eventos de mudança
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+from comum.progress import event
+
+logger = logging.getLogger(__name__)
+
+def monitor_filename(filename):
+    """sefaz_servicos.csv -> sefaz_servicos_monitor.json"""
+    root, _ = os.path.splitext(filename)
+    return f"{root}_monitor.json"
+
+
+def changes_filename(filename):
+    """sefaz_servicos.csv -> sefaz_servicos_mudancas.jsonl"""
+    root, _ = os.path.splitext(filename)
+    return f"{root}_mudancas.jsonl"
+
+
+def fingerprint(text):
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+_patterns = {}
+
+
+def _block_patterns(tag, css_class):
+    key = (tag, css_class)
+    if key not in _patterns:
+        start = re.compile(r'<%s\b[^>]*\bclass\s*=\s*["\'](?:[^"\']*\s)?%s(?:\s[^"\']*)?["\']'
+                           % (tag, re.escape(css_class)), re.IGNORECASE)
+        tags = re.compile(r'<(/?)%s\b' % tag, re.IGNORECASE)
+        _patterns[key] = (start, tags)
+    return _patterns[key]
+
+
+def find_blocks(html, tag, css_class):
+    """HTML de cada elemento <tag class="... css_class ..."> da página, na ordem
+
+    Varre só as tags de abertura e fechamento de `tag` para achar o fim de
+    cada bloco (com aninhamento); blocos aninhados em outro bloco da mesma
+    classe ficam dentro dele.
+    """
+    start, tags = _block_patterns(tag, css_class)
+    blocks = []
+    position = 0
+    while True:
+        match = start.search(html, position)
+        if not match:
+            return blocks
+        end = len(html)
+        depth = 0
+        for tag_match in tags.finditer(html, match.start()):
+            depth += -1 if tag_match.group(1) else 1
+            if depth == 0:
+                close = html.find('>', tag_match.end())
+                end = close + 1 if close >= 0 else len(html)
+                break
+        blocks.append(html[match.start():end])
+        position = end
+
+
+class BlockMonitor:
+    """Impressões digitais por página e por bloco entre verificações
+
+    O estado (JSON) guarda, para cada página, o hash da página inteira, o
+    escopo dos blocos (ex.: perfil), dados da página e, para cada bloco, a
+    impressão digital, a chave (ex.: URL do serviço ou categoria) e as
+    linhas extraídas. Um bloco é identificado por (escopo, chave), então um
+    serviço que só mudou de página na paginação não conta como mudança.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.previous = {}
+        self.current = {}
+        self.baseline = not os.path.exists(filename)
+        self.lock = threading.Lock()
+        self._reset_counts()
+        if not self.baseline:
+            try:
+                with open(filename, 'r', encoding='utf-8') as f:
+                    self.previous = json.load(f)
+            except ValueError:
+                self.baseline = True
+        self._index_previous()
+
+    def _reset_counts(self):
+        self.unchanged_pages = 0
+        self.changed_pages = 0
+        self.kept_pages = 0
+        self.reused_blocks = 0
+        self.extracted_blocks = 0
+
+    def _index_previous(self):
+        self._known = {}
+        for page in self.previous.values():
+            for block in page['blocks']:
+                self._known[(page['scope'], block['fp'])] = block
+
+    def check(self, url, content, split, extract):
+        """Linhas, dados e chaves dos blocos da página, extraindo só blocos novos
+
+        `split(content)` -> (escopo, dados_da_página, [html de cada bloco]) e
+        `extract(bloco, dados_da_página)` -> (chave, linhas) só são chamados
+        se a página mudou. Retorna (linhas, dados_da_página, chaves).
+        """
+        page_hash = fingerprint(content)
+        previous = self.previous.get(url)
+        if previous is not None and previous['hash'] == page_hash:
+            with self.lock:
+                self.current[url] = previous
+                self.unchanged_pages += 1
+            return self._page_result(previous)
+
+        scope, info, blocks = split(content)
+        entries = []
+        for block in blocks:
+            digest = fingerprint(block)
+            entry = self._known.get((scope, digest))
+            if entry is None:
+                key, rows = extract(block, info)
+                entry = {'fp': digest, 'key': key, 'rows': rows}
+                with self.lock:
+                    self.extracted_blocks += 1
+            else:
+                with self.lock:
+                    self.reused_blocks += 1
+            entries.append(entry)
+        page = {'hash': page_hash, 'scope': scope, 'info': info, 'blocks': entries}
+        with self.lock:
+            self.current[url] = page
+            self.changed_pages += 1
+        return self._page_result(page)
+
+    @staticmethod
+    def _page_result(page):
+        rows = [row for block in page['blocks'] for row in block['rows']]
+        keys = [block['key'] for block in page['blocks'] if block['key'] is not None]
+        return rows, page['info'], keys
+
+    def keep(self, url):
+        """Mantém o estado anterior de uma página que não pôde ser obtida
+
+        A página conta como inalterada: retorna (linhas, dados, chaves) da
+        verificação anterior, para que quem chama reaproveite as linhas e siga
+        a paginação dela, ou None se a página não era conhecida.
+        """
+        with self.lock:
+            page = self.previous.get(url)
+            if page is None:
+                return None
+            self.current[url] = page
+            self.kept_pages += 1
+        return self._page_result(page)
+
+    @staticmethod
+    def _blocks_by_identity(pages):
+        blocks = {}
+        for url, page in pages.items():
+            for block in page['blocks']:
+                identity = (page['scope'], block['key'] if block['key'] is not None else block['fp'])
+                blocks[identity] = (url, block)
+        return blocks
+
+    def changes(self):
+        """Blocos adicionados, alterados e removidos desde a verificação anterior"""
+        if self.baseline:
+            return []
+        old = self._blocks_by_identity(self.previous)
+        new = self._blocks_by_identity(self.current)
+        changes = []
+
+        def change(kind, identity, url, block=None, old_block=None):
+            changes.append({
+                'Tipo': kind,
+                'Escopo': identity[0],
+                'Bloco': identity[1],
+                'Página': url,
+                'Linhas': len(block['rows']) if block else 0,
+                'Linhas_Anterior': len(old_block['rows']) if old_block else 0
+            })
+
+        for identity, (url, block) in new.items():
+            if identity not in old:
+                change('adicionado', identity, url, block)
+            elif old[identity][1]['fp'] != block['fp']:
+                change('alterado', identity, url, block, old[identity][1])
+        for identity, (url, old_block) in old.items():
+            if identity not in new:
+                change('removido', identity, url, old_block=old_block)
+        return changes
+
+    def finish(self, changes_path=None):
+        """Encerra a verificação: registra as mudanças, grava o estado e prepara a próxima
+
+        Cada mudança vira um evento 'block_changed' e, com `changes_path`,
+        uma linha JSON acrescentada ao arquivo. Retorna a lista de mudanças.
+        """
+        changes = self.changes()
+        for change in changes:
+            event(logger, 'block_changed',
+                  f"Bloco {change['Tipo']}: {change['Escopo']} / {change['Bloco']} ({change['Página']})",
+                  level=logging.INFO, **change)
+        if changes and changes_path:
+            checked_at = time.strftime('%Y-%m-%dT%H:%M:%S')
+            with open(changes_path, 'a', encoding='utf-8') as f:
+                for change in changes:
+                    f.write(json.dumps({'Verificado_em': checked_at, **change}, ensure_ascii=False) + '\n')
+        logger.info(self.summary(changes))
+
+        # Sem páginas alteradas, o estado gravado continua valendo
+        if self.baseline or self.changed_pages or self.current.keys() != self.previous.keys():
+            tmp_path = self.filename + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.current, f, ensure_ascii=False)
+            os.replace(tmp_path, self.filename)
+        self.previous, self.current = self.current, {}
+        self.baseline = False
+        self._index_previous()
+        self._reset_counts()
+        return changes
+
+    def summary(self, changes):
+        pages = (f"{self.unchanged_pages} páginas inalteradas, {self.changed_pages} alteradas "
+                 f"({self.extracted_blocks} blocos extraídos, {self.reused_blocks} reaproveitados)")
+        if self.kept_pages:
+            pages += f", {self.kept_pages} mantidas da verificação anterior (falha ao baixar)"
+        if self.baseline:
+            return f"Monitor: linha de base registrada; {pages}"
+        return f"Monitor: {len(changes)} blocos mudaram; {pages}"
+
+
+def run_polls(poll, interval=0, polls=None):
+    """Executa poll() uma vez ou, com `interval` > 0, a cada `interval` segundos
+
+    `polls` limita o número de verificações; Ctrl+C encerra o laço.
+    Retorna o número de verificações feitas.
+    """
+    count = 0
+    try:
+        while True:
+            started = time.monotonic()
+            poll()
+            count += 1
+            if interval <= 0 or (polls is not None and count >= polls):
+                return count
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
+    except KeyboardInterrupt:
+        logger.info(f"Monitoramento interrompido após {count} verificações")
+        return count
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Backends de parsing HTML com extração direcionada
+Materializam apenas os blocos usados pelos scrapers (card-body, categorias,
+paginacao, daems-list) e devolvem estruturas simples, iguais para todos os
+backends:
+
+- parse_catalogue(html) -> {'heading': texto do h1.green ou None,
+                            'cards': [{'href', 'title', 'categories'}],
+                            'pagination': [hrefs do div.paginacao]}
+- parse_site(html) -> [{'category': texto, 'items': [(nome, href)]}]
+
+A referência continua sendo a extração com a árvore completa do
+BeautifulSoup feita pelos próprios scrapers (backend 'bs4').
+"""
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+BACKENDS = ('bs4', 'html.parser', 'lxml', 'selectolax')
+
+
+def _classes(value):
+    """Normaliza o atributo class (string ou lista) para um conjunto"""
+    if not value:
+        return set()
+    if isinstance(value, str):
+        return set(value.split())
+    return set(value)
+
+
+def _catalogue_blocks(name, attrs):
+    classes = _classes(attrs.get('class'))
+    if name == 'div':
+        return 'card-body' in classes or 'paginacao' in classes
+    return name == 'h1' and 'green' in classes
+
+
+def _site_blocks(name, attrs):
+    return name == 'div' and 'daems-list-column' in _classes(attrs.get('class'))
+
+
+class HtmlParserBackend:
+    """BeautifulSoup + html.parser, construindo só os blocos de interesse"""
+
+    name = 'html.parser'
+
+    def parse_catalogue(self, html):
+        soup = BeautifulSoup(html, 'html.parser', parse_only=SoupStrainer(_catalogue_blocks))
+        heading = soup.find('h1', class_='green')
+        cards = []
+        for card_body in soup.find_all('div', class_='card-body'):
+            card = {'href': None, 'title': None, 'categories': []}
+            link = card_body.find('a', href=True)
+            if link:
+                card['href'] = link['href']
+                title = link.find('h5', class_='card-title')
+                if title:
+                    card['title'] = title.get_text(strip=True)
+            categories_div = card_body.find('div', class_='categorias')
+            if categories_div:
+                card['categories'] = [a.get_text(strip=True)
+                                      for a in categories_div.find_all('a', rel='category tag')]
+            cards.append(card)
+
+        pagination_div = soup.find('div', class_='paginacao')
+        pagination = [a.get('href') for a in pagination_div.find_all('a', href=True)] if pagination_div else []
+        return {
+            'heading': heading.get_text(strip=True) if heading else None,
+            'cards': cards,
+            'pagination': pagination
+        }
+
+    def parse_site(self, html):
+        soup = BeautifulSoup(html, 'html.parser', parse_only=SoupStrainer(_site_blocks))
+        blocks = []
+        for column in soup.find_all('div', class_='daems-list-column'):
+            for service_list in column.find_all('ul', class_='daems-list'):
+                title = service_list.find('li', class_='daems-titulos')
+                if not title:
+                    continue
+                items = []
+                for item in service_list.find_all('li', class_='daems-list-itens'):
+                    link = item.find('a')
+                    if link:
+                        items.append((link.get_text(strip=True), link.get('href')))
+                blocks.append({'category': title.get_text(strip=True), 'items': items})
+        return blocks
+
+
+def _xpath_class(tag, css_class):
+    return f"{tag}[contains(concat(' ', normalize-space(@class), ' '), ' {css_class} ')]"
+
+
+class LxmlBackend:
+    """lxml.html com consultas XPath (árvore construída em C)"""
+
+    name = 'lxml'
+
+    def __init__(self):
+        from lxml import etree, html
+        self._etree = etree
+        self._html = html
+        self._parser = html.HTMLParser(encoding='utf-8')
+
+    def _parse(self, content):
+        return self._html.fromstring(content.encode('utf-8'), parser=self._parser)
+
+    def _text(self, element):
+        # Mesmo resultado de get_text(strip=True): trechos aparados e concatenados
+        return ''.join(text.strip() for text in element.itertext(self._etree.Element))
+
+    def parse_catalogue(self, html):
+        root = self._parse(html)
+        headings = root.xpath('//' + _xpath_class('h1', 'green'))
+        cards = []
+        for card_body in root.xpath('//' + _xpath_class('div', 'card-body')):
+            card = {'href': None, 'title': None, 'categories': []}
+            links = card_body.xpath('.//a[@href]')
+            if links:
+                card['href'] = links[0].get('href')
+                titles = links[0].xpath('.//' + _xpath_class('h5', 'card-title'))
+                if titles:
+                    card['title'] = self._text(titles[0])
+            categories_divs = card_body.xpath('.//' + _xpath_class('div', 'categorias'))
+            if categories_divs:
+                card['categories'] = [self._text(a) for a in categories_divs[0].xpath(
+                    ".//a[normalize-space(@rel)='category tag']")]
+            cards.append(card)
+
+        pagination_divs = root.xpath('//' + _xpath_class('div', 'paginacao'))
+        pagination = [a.get('href') for a in pagination_divs[0].xpath('.//a[@href]')] if pagination_divs else []
+        return {
+            'heading': self._text(headings[0]) if headings else None,
+            'cards': cards,
+            'pagination': pagination
+        }
+
+    def parse_site(self, html):
+        root = self._parse(html)
+        blocks = []
+        for column in root.xpath('//' + _xpath_class('div', 'daems-list-column')):
+            for service_list in column.xpath('.//' + _xpath_class('ul', 'daems-list')):
+                titles = service_list.xpath('.//' + _xpath_class('li', 'daems-titulos'))
+                if not titles:
+                    continue
+                items = []
+                for item in service_list.xpath('.//' + _xpath_class('li', 'daems-list-itens')):
+                    links = item.xpath('.//a')
+                    if links:
+                        items.append((self._text(links[0]), links[0].get('href')))
+                blocks.append({'category': self._text(titles[0]), 'items': items})
+        return blocks
+
+
+class SelectolaxBackend:
+    """selectolax com seletores CSS (lexbor; Modest nas versões antigas)"""
+
+    name = 'selectolax'
+
+    def __init__(self):
+        try:
+            from selectolax.lexbor import LexborHTMLParser as HTMLParser
+        except ImportError:
+            from selectolax.parser import HTMLParser
+        self._parser_class = HTMLParser
+
+    @staticmethod
+    def _text(node):
+        return node.text(deep=True, separator='', strip=True)
+
+    def parse_catalogue(self, html):
+        tree = self._parser_class(html)
+        heading = tree.css_first('h1.green')
+        cards = []
+        for card_body in tree.css('div.card-body'):
+            card = {'href': None, 'title': None, 'categories': []}
+            link = card_body.css_first('a[href]')
+            if link:
+                card['href'] = link.attributes.get('href') or ''
+                title = link.css_first('h5.card-title')
+                if title:
+                    card['title'] = self._text(title)
+            categories_div = card_body.css_first('div.categorias')
+            if categories_div:
+                card['categories'] = [self._text(a) for a in categories_div.css('a[rel]')
+                                      if ' '.join((a.attributes.get('rel') or '').split()) == 'category tag']
+            cards.append(card)
+
+        pagination_div = tree.css_first('div.paginacao')
+        pagination = [a.attributes.get('href') or '' for a in pagination_div.css('a[href]')] if pagination_div else []
+        return {
+            'heading': self._text(heading) if heading else None,
+            'cards': cards,
+            'pagination': pagination
+        }
+
+    def parse_site(self, html):
+        tree = self._parser_class(html)
+        blocks = []
+        for column in tree.css('div.daems-list-column'):
+            for service_list in column.css('ul.daems-list'):
+                title = service_list.css_first('li.daems-titulos')
+                if not title:
+                    continue
+                items = []
+                for item in service_list.css('li.daems-list-itens'):
+                    link = item.css_first('a')
+                    if link:
+                        items.append((self._text(link), link.attributes.get('href')))
+                blocks.append({'category': self._text(title), 'items': items})
+        return blocks
+
+
+def get_backend(name):
+    """Instancia o backend pelo nome (ImportError se a biblioteca não estiver instalada)"""
+    if name == 'html.parser':
+        return HtmlParserBackend()
+    if name == 'lxml':
+        return LxmlBackend()
+    if name == 'selectolax':
+        return SelectolaxBackend()
+    raise ValueError(f"Backend de parsing desconhecido: {name} (opções: {', '.join(BACKENDS)})")
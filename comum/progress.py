@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Eventos estruturados e progresso das execuções
+Eventos em JSON Lines, níveis de verbosidade, resumos periódicos de
+progresso (taxa e ETA) e logging assíncrono: os handlers rodam em uma
+thread própria (QueueHandler/QueueListener), então os laços de coleta só
+enfileiram os registros e não esperam pela escrita no terminal ou em disco
+"""
+
+import contextlib
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# -q, padrão e -v
+VERBOSITY_LEVELS = {0: logging.WARNING, 1: logging.INFO, 2: logging.DEBUG}
+
+# Bibliotecas cujo DEBUG (uma linha por requisição) repetiria os eventos dos scrapers
+QUIET_LOGGERS = ('urllib3', 'asyncio')
+
+
+def events_filename(filename):
+    """sefaz_servicos.csv -> sefaz_servicos_eventos.jsonl"""
+    root, _ = os.path.splitext(filename)
+    return f"{root}_eventos.jsonl"
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Um objeto JSON por registro: horário, nível, evento, mensagem e campos"""
+
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'event': getattr(record, 'event', 'log'),
+            'message': record.getMessage()
+        }
+        entry.update(getattr(record, 'fields', {}))
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def event(logger, name, message, level=logging.DEBUG, **fields):
+    """Registra o evento `name` com campos estruturados (nível DEBUG por padrão)
+
+    No terminal aparece só `message`; no arquivo de eventos, também os campos.
+    """
+    if logger.isEnabledFor(level):
+        logger.log(level, message, extra={'event': name, 'fields': fields})
+
+
+def add_logging_arguments(parser):
+    """Opções de verbosidade e arquivo de eventos comuns aos scripts"""
+    parser.add_argument('-v', '--verbose', action='count', default=0,
+                        help="mostra também os eventos por página/serviço")
+    parser.add_argument('-q', '--quiet', action='count', default=0,
+                        help="mostra apenas avisos e erros")
+    parser.add_argument('--events', nargs='?', const='', default=None, metavar='ARQUIVO',
+                        help="grava todos os eventos em JSON Lines (padrão: <saída>_eventos.jsonl)")
+
+
+def verbosity_from_args(args):
+    return max(0, min(2, 1 + args.verbose - args.quiet))
+
+
+def events_path_from_args(args, filename):
+    """Arquivo de eventos pedido em --events (None se a opção não foi usada)"""
+    if args.events is None:
+        return None
+    return args.events or events_filename(filename)
+
+
+@contextlib.contextmanager
+def structured_logging(verbosity=1, events_path=None, stream=None):
+    """Configura o logging raiz com uma fila e uma thread de escrita
+
+    O terminal recebe os registros a partir do nível de `verbosity`; com
+    `events_path`, todos os eventos (inclusive DEBUG) vão para o arquivo
+    em JSON Lines. Ao sair, a fila é descarregada e a configuração
+    anterior do logger raiz é restaurada.
+    """
+    console = logging.StreamHandler(stream or sys.stderr)
+    console.setLevel(VERBOSITY_LEVELS[verbosity])
+    console.setFormatter(logging.Formatter(LOG_FORMAT))
+    handlers = [console]
+    if events_path:
+        events = logging.FileHandler(events_path, 'w', encoding='utf-8')
+        events.setLevel(logging.DEBUG)
+        events.setFormatter(JsonLinesFormatter())
+        handlers.append(events)
+
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    root = logging.getLogger()
+    previous = (root.handlers[:], root.level)
+    quiet_levels = {name: logging.getLogger(name).level for name in QUIET_LOGGERS}
+    root.handlers = [logging.handlers.QueueHandler(log_queue)]
+    root.setLevel(min(handler.level for handler in handlers))
+    for name in QUIET_LOGGERS:
+        logging.getLogger(name).setLevel(logging.INFO)
+    listener.start()
+    try:
+        yield listener
+    finally:
+        listener.stop()
+        for handler in handlers:
+            handler.close()
+        root.handlers, level = previous
+        root.setLevel(level)
+        for name, quiet_level in quiet_levels.items():
+            logging.getLogger(name).setLevel(quiet_level)
+
+
+def worker_logging():
+    """Logging de um processo de parsing: só avisos, direto no stderr
+
+    O processo herda (via fork) o QueueHandler do principal, mas a fila
+    copiada não é lida por ninguém.
+    """
+    root = logging.getLogger()
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    root.handlers = [handler]
+    root.setLevel(logging.WARNING)
+
+
+class Progress:
+    """Resumo periódico de um laço: concluídos/total, taxa e ETA
+
+    advance() só registra um evento 'progress' se `interval` segundos se
+    passaram desde o anterior, então pode ser chamado a cada item. O total
+    pode crescer durante a execução (ex.: páginas de paginação descobertas).
+    """
+
+    def __init__(self, logger, label, total=None, unit='itens', interval=5.0):
+        self.logger = logger
+        self.label = label
+        self.total = total
+        self.unit = unit
+        self.interval = interval
+        self.done = 0
+        self.started = time.monotonic()
+        self._last_report = self.started
+        self._lock = threading.Lock()
+
+    def advance(self, count=1, total=None):
+        with self._lock:
+            self.done += count
+            if total is not None:
+                self.total = total
+            now = time.monotonic()
+            if now - self._last_report < self.interval:
+                return
+            self._last_report = now
+        self._report('progress')
+
+    def finish(self):
+        self._report('progress_done')
+
+    def rate(self):
+        elapsed = time.monotonic() - self.started
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    def eta(self):
+        """Segundos restantes estimados pela taxa média, ou None sem total"""
+        rate = self.rate()
+        if self.total is None or not rate:
+            return None
+        return max(0.0, (self.total - self.done) / rate)
+
+    def _report(self, name):
+        rate, eta = self.rate(), self.eta()
+        counted = f"{self.done}/{self.total}" if self.total is not None else f"{self.done}"
+        message = f"{self.label}: {counted} {self.unit}, {rate:.1f} {self.unit}/s"
+        if self.total:
+            message += f" ({self.done / self.total:.0%})"
+        if eta is not None and name == 'progress':
+            message += f", ETA {eta:.0f}s"
+        event(self.logger, name, message, level=logging.INFO, label=self.label, done=self.done,
+              total=self.total, rate=round(rate, 2),
+              eta_s=None if eta is None else round(eta, 1),
+              elapsed_s=round(time.monotonic() - self.started, 2))
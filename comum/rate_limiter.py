@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Limitador de taxa adaptativo por host
+Token bucket cuja taxa segue o que o servidor aguenta (AIMD): cresce aos
+poucos enquanto as respostas são rápidas e cai pela metade diante de
+latência alta, timeouts ou respostas 429/503, respeitando Retry-After
+"""
+
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+THROTTLE_STATUS = (429, 503)
+
+
+def parse_retry_after(value, now=None):
+    """Segundos de espera pedidos em Retry-After (número ou data HTTP), ou None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    now = time.time() if now is None else now
+    return max(0.0, moment.timestamp() - now)
+
+
+def parse_host_rates(values):
+    """['host=2.5', ...] (formato da linha de comando) -> {'host': 2.5}"""
+    rates = {}
+    for value in values or []:
+        host, _, rate = value.partition('=')
+        if not host or not rate:
+            raise ValueError(f"Taxa por host inválida: {value} (use host=requisições_por_segundo)")
+        rates[host.lower()] = float(rate)
+    return rates
+
+
+class TokenBucket:
+    """Balde de fichas de um host, com taxa ajustada por AIMD"""
+
+    def __init__(self, rate, burst=1, min_rate=0.2, max_rate=10.0,
+                 increase=0.25, decrease=0.5, target_latency=1.0):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.target_latency = target_latency
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.last_decrease = 0.0
+        self.lock = threading.Lock()
+        self.stats = {
+            'requests': 0,
+            'throttled': 0,
+            'slow': 0,
+            'errors': 0,
+            'waited': 0.0
+        }
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """Bloqueia até haver uma ficha disponível e a consome"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.blocked_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    self.stats['requests'] += 1
+                    return
+                wait = max(self.blocked_until - now, (1 - self.tokens) / self.rate)
+                self.stats['waited'] += wait
+            time.sleep(wait)
+
+    def on_success(self, latency):
+        with self.lock:
+            if latency > self.target_latency:
+                self.stats['slow'] += 1
+                self._back_off()
+            else:
+                self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self, retry_after=None):
+        with self.lock:
+            self.stats['throttled'] += 1
+            self._back_off()
+            if retry_after is not None:
+                self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+                self.tokens = 0
+
+    def on_error(self):
+        # Timeout ou conexão recusada: sinal de sobrecarga, nunca de folga
+        with self.lock:
+            self.stats['errors'] += 1
+            self._back_off()
+
+    def _back_off(self):
+        # Uma redução por janela de latência: respostas lentas que chegam
+        # juntas refletem o mesmo congestionamento
+        now = time.monotonic()
+        if now - self.last_decrease >= self.target_latency:
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self.last_decrease = now
+
+
+class RateLimiter:
+    """Conjunto de token buckets, um por host
+
+    `rate` é a taxa inicial (requisições por segundo) e `host_rates`
+    permite fixar a taxa inicial de hosts específicos. Todos os baldes se
+    ajustam entre `min_rate` e `max_rate` conforme as respostas observadas.
+    """
+
+    def __init__(self, rate=1.0, burst=1, min_rate=0.2, max_rate=10.0,
+                 target_latency=1.0, host_rates=None):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.target_latency = target_latency
+        self.host_rates = {host.lower(): value for host, value in (host_rates or {}).items()}
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, url):
+        host = (urlsplit(url).hostname or '').lower()
+        with self.lock:
+            if host not in self.buckets:
+                rate = self.host_rates.get(host, self.rate)
+                self.buckets[host] = TokenBucket(rate, burst=self.burst,
+                                                 min_rate=min(self.min_rate, rate),
+                                                 max_rate=max(self.max_rate, rate),
+                                                 target_latency=self.target_latency)
+            return self.buckets[host]
+
+    def acquire(self, url):
+        self.bucket(url).acquire()
+
+    def observe(self, url, latency, status_code=None, headers=None):
+        """Ajusta a taxa do host a partir de uma resposta observada"""
+        bucket = self.bucket(url)
+        if status_code in THROTTLE_STATUS:
+            bucket.on_throttle(parse_retry_after((headers or {}).get('Retry-After')))
+        else:
+            bucket.on_success(latency)
+
+    def request(self, session, method, url, **kwargs):
+        """session.request(...) passando pelo limitador do host
+
+        Aceita uma requests.Session ou o próprio módulo requests. Exceções
+        são propagadas e reduzem a taxa do host, como uma resposta 429 sem
+        Retry-After.
+        """
+        self.acquire(url)
+        started = time.monotonic()
+        try:
+            response = session.request(method, url, **kwargs)
+        except Exception:
+            self.bucket(url).on_error()
+            raise
+        self.observe(url, time.monotonic() - started, response.status_code, response.headers)
+        return response
+
+    def summary(self):
+        """Taxa final e contadores de cada host em uma linha"""
+        parts = []
+        for host, bucket in sorted(self.buckets.items()):
+            parts.append(f"{host}: {bucket.rate:.2f} req/s, {bucket.stats['requests']} requisições, "
+                         f"{bucket.stats['throttled']} limitadas (429/503), "
+                         f"{bucket.stats['slow']} lentas, {bucket.stats['errors']} falhas, espera {bucket.stats['waited']:.1f}s")
+        return "Limitador de taxa: " + ('; '.join(parts) if parts else "nenhuma requisição")
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Registro compacto de um serviço
+Objeto com __slots__ no lugar de um dict por serviço: perfis e
+categorias (poucos valores distintos) são internados e as categorias
+ficam em uma tupla compartilhada entre serviços com o mesmo conjunto.
+Conversão de e para o esquema Categorias/Perfis/Serviços/URL dos CSVs
+"""
+
+import sys
+
+from comum.dedup import SEPARATOR
+
+# Tuplas de categorias já vistas, reaproveitadas entre registros
+_category_tuples = {}
+
+
+def intern_categories(categories):
+    """Tupla única (e de strings internadas) para um conjunto de categorias"""
+    key = tuple(categories)
+    cached = _category_tuples.get(key)
+    if cached is None:
+        cached = _category_tuples.setdefault(key, tuple(sys.intern(category) for category in key))
+    return cached
+
+
+class ServiceRecord:
+    """Serviço extraído por um dos scrapers
+
+    `categories` aceita uma sequência ou o texto separado por ';' do CSV;
+    o texto é dividido sem descartar partes vazias, então to_row() devolve
+    exatamente o que foi lido (ex.: 'A;;B'). Também responde a get()/[] pelos nomes das colunas do CSV, para os
+    consumidores de linhas (sinks, delta, deduplicação).
+    """
+
+    __slots__ = ('categories', 'profile', 'title', 'url')
+
+    def __init__(self, categories=(), profile='', title='', url=''):
+        if isinstance(categories, str):
+            categories = categories.split(SEPARATOR) if categories else ()
+        self.categories = intern_categories(categories)
+        self.profile = sys.intern(profile or '')
+        self.title = title or ''
+        self.url = url or ''
+
+    @classmethod
+    def from_row(cls, row):
+        """Registro a partir de uma linha no esquema do CSV"""
+        return cls(row.get('Categorias', ''), row.get('Perfis', ''),
+                   row.get('Serviços', ''), row.get('URL', ''))
+
+    def to_row(self):
+        """Linha no esquema do CSV (categorias unidas por ';')"""
+        return {
+            'Categorias': SEPARATOR.join(self.categories),
+            'Perfis': self.profile,
+            'Serviços': self.title,
+            'URL': self.url
+        }
+
+    def get(self, field, default=None):
+        if field == 'Categorias':
+            return SEPARATOR.join(self.categories)
+        if field in FIELD_ATTRIBUTES:
+            return getattr(self, FIELD_ATTRIBUTES[field])
+        return default
+
+    def keys(self):
+        # csv.DictWriter confere as chaves antes de gravar a linha
+        return FIELD_ATTRIBUTES.keys()
+
+    def __getitem__(self, field):
+        if field not in FIELD_ATTRIBUTES:
+            raise KeyError(field)
+        return self.get(field)
+
+    def _key(self):
+        return (self.categories, self.profile, self.title, self.url)
+
+    def __eq__(self, other):
+        if not isinstance(other, ServiceRecord):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __getstate__(self):
+        return self._key()
+
+    def __setstate__(self, state):
+        self.categories, self.profile, self.title, self.url = state
+        self.categories = intern_categories(self.categories)
+        self.profile = sys.intern(self.profile)
+
+    def __repr__(self):
+        return f"ServiceRecord({self.title!r}, profile={self.profile!r}, url={self.url!r})"
+
+
+FIELD_ATTRIBUTES = {
+    'Categorias': 'categories',
+    'Perfis': 'profile',
+    'Serviços': 'title',
+    'URL': 'url'
+}
+
+
+def to_rows(records):
+    """Registros -> linhas do CSV (para JSON, diário e manifesto)"""
+    return [record.to_row() for record in records]
+
+
+def from_rows(rows):
+    """Linhas do CSV -> registros"""
+    return [ServiceRecord.from_row(row) for row in rows]
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache em disco dos resultados das análises
+A chave é o hash do conteúdo do arquivo de entrada somado à versão do
+código da análise (hash dos fontes) e aos parâmetros (ex.: taxonomia):
+se nada disso mudou, os agregados já calculados são reaproveitados e os
+relatórios são só renderizados de novo. Entradas antigas ou que passem do
+limite de tamanho são descartadas
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import time
+
+
+def file_digest(filename, chunk_size=1024 * 1024):
+    """Hash (blake2b) do conteúdo do arquivo, lido em blocos"""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def code_version(*sources):
+    """Hash dos arquivos-fonte de uma análise: muda quando o código muda
+
+    Cada fonte é um caminho ou um objeto (classe, função, módulo) cujo
+    arquivo inteiro entra no hash.
+    """
+    digest = hashlib.blake2b(digest_size=10)
+    for source in sources:
+        path = source if isinstance(source, str) else inspect.getsourcefile(source)
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def add_cache_arguments(parser):
+    """Opções do cache de análises comuns aos scripts de análise"""
+    parser.add_argument('--cache-dir', default='.analysis_cache',
+                        help="diretório do cache de resultados das análises")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="recalcula tudo, sem ler nem gravar o cache")
+    parser.add_argument('--cache-max-age', type=float, default=30,
+                        help="dias antes de uma entrada do cache ser descartada")
+    parser.add_argument('--cache-max-mb', type=float, default=100,
+                        help="tamanho máximo do cache em MB (as menos usadas saem primeiro)")
+    parser.add_argument('--clear-cache', action='store_true',
+                        help="remove os resultados desta análise do cache e sai")
+
+
+def cache_from_args(args):
+    """ResultCache configurado pelas opções, ou None com --no-cache"""
+    if args.no_cache:
+        return None
+    return ResultCache(args.cache_dir, max_age=args.cache_max_age * 24 * 3600,
+                       max_bytes=int(args.cache_max_mb * 1024 * 1024))
+
+
+class ResultCache:
+    """Resultados (qualquer objeto serializável com pickle) por chave de conteúdo
+
+    Os resultados são gravados com pickle, então o diretório do cache deve
+    ser local e confiável, como o do cache HTTP. `max_age` (segundos) e
+    `max_bytes` limitam as entradas mantidas; as menos usadas recentemente
+    saem primeiro.
+    """
+
+    def __init__(self, cache_dir='.analysis_cache', max_age=30 * 24 * 3600, max_bytes=100 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(cache_dir, 'index.json')
+        self.stats = {
+            'hits': 0,
+            'misses': 0
+        }
+        os.makedirs(cache_dir, exist_ok=True)
+        self.index = self._load_index()
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _result_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pickle")
+
+    @staticmethod
+    def key(analysis, filename, version, params=None):
+        """Chave de um resultado: análise, versão do código, conteúdo da entrada e parâmetros"""
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(json.dumps([analysis, version, file_digest(filename), params],
+                                 ensure_ascii=False, sort_keys=True).encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Resultado guardado para a chave, ou None"""
+        entry = self.index.get(key)
+        if entry is None or time.time() - entry['stored_at'] > self.max_age:
+            self.stats['misses'] += 1
+            return None
+        try:
+            with open(self._result_path(key), 'rb') as f:
+                result = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            del self.index[key]
+            self.stats['misses'] += 1
+            return None
+        entry['last_access'] = time.time()
+        self.stats['hits'] += 1
+        self._save_index()
+        return result
+
+    def put(self, key, result, analysis, source):
+        """Grava o resultado, aplica os limites e persiste o índice"""
+        path = self._result_path(key)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        now = time.time()
+        self.index[key] = {
+            'analysis': analysis,
+            'source': os.path.abspath(source),
+            'stored_at': now,
+            'last_access': now,
+            'size': os.path.getsize(path)
+        }
+        self._evict()
+        self._save_index()
+
+    def invalidate(self, analysis=None, source=None):
+        """Remove as entradas da análise e/ou do arquivo de entrada (todas, sem filtros)
+
+        Retorna o número de entradas removidas.
+        """
+        source = os.path.abspath(source) if source else None
+        keys = [key for key, entry in self.index.items()
+                if (analysis is None or entry['analysis'] == analysis)
+                and (source is None or entry['source'] == source)]
+        for key in keys:
+            self._remove(key)
+        self._save_index()
+        return len(keys)
+
+    def _remove(self, key):
+        del self.index[key]
+        try:
+            os.remove(self._result_path(key))
+        except OSError:
+            pass
+
+    def _evict(self):
+        """Remove entradas vencidas e, depois, as menos usadas até caber no limite"""
+        now = time.time()
+        for key in [key for key, entry in self.index.items() if now - entry['stored_at'] > self.max_age]:
+            self._remove(key)
+
+        total = sum(entry['size'] for entry in self.index.values())
+        for key, entry in sorted(self.index.items(), key=lambda item: item[1]['last_access']):
+            if total <= self.max_bytes:
+                break
+            total -= entry['size']
+            self._remove(key)
+
+    def _save_index(self):
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f)
+        os.replace(tmp_path, self.index_path)
+
+    def summary(self):
+        """Resumo das estatísticas do cache em uma linha"""
+        return f"Cache de análises: {self.stats['hits']} hits, {self.stats['misses']} misses"
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Saídas incrementais (sinks) para os registros de serviços
+Cada linha é gravada assim que é extraída, em CSV, JSON Lines ou Parquet.
+No Parquet as colunas são tipadas: Categorias é uma lista e perfis,
+categorias e fonte são dicionarizados (poucos valores distintos)
+"""
+
+import csv
+import json
+import os
+
+from comum.dedup import SEPARATOR, split_values
+
+FIELDNAMES = ['Categorias', 'Perfis', 'Serviços', 'URL']
+
+# Colunas multivaloradas (texto separado por ';' no CSV, lista no Parquet)
+LIST_FIELDS = ('Categorias',)
+# Colunas com poucos valores distintos, gravadas como dicionário no Parquet
+DICTIONARY_FIELDS = ('Categorias', 'Perfis', 'fonte')
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Parquet requer pyarrow (pip install pyarrow)") from e
+    return pa, pq
+
+
+def parquet_type(pa, field, default=None):
+    """Tipo Arrow de uma coluna: listas e dicionários conforme LIST_FIELDS/DICTIONARY_FIELDS"""
+    value_type = default or pa.string()
+    if field in DICTIONARY_FIELDS and pa.types.is_string(value_type):
+        value_type = pa.dictionary(pa.int32(), value_type)
+    if field in LIST_FIELDS:
+        return pa.list_(value_type)
+    return value_type
+
+
+def parquet_schema(fieldnames):
+    pa, _ = _import_pyarrow()
+    return pa.schema([(field, parquet_type(pa, field)) for field in fieldnames])
+
+
+class RecordSink:
+    """Base comum: contagem de registros e uso como context manager"""
+
+    def __init__(self, filename, fieldnames=FIELDNAMES):
+        self.filename = filename
+        self.fieldnames = fieldnames
+        self.count = 0
+
+    def write(self, row):
+        raise NotImplementedError
+
+    def write_rows(self, rows):
+        for row in rows:
+            self.write(row)
+
+    def close(self):
+        raise NotImplementedError
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class CsvSink(RecordSink):
+    """CSV com cabeçalho, descarregado em disco a cada linha"""
+
+    def __init__(self, filename, fieldnames=FIELDNAMES):
+        super().__init__(filename, fieldnames)
+        self._file = open(filename, 'w', newline='', encoding='utf-8')
+        self._writer = csv.DictWriter(self._file, fieldnames=fieldnames)
+        self._writer.writeheader()
+        self._file.flush()
+
+    def write(self, row):
+        self._writer.writerow(row)
+        self._file.flush()
+        self.count += 1
+
+    def close(self):
+        self._file.close()
+
+
+class JsonlSink(RecordSink):
+    """Um objeto JSON por linha, descarregado em disco a cada linha"""
+
+    def __init__(self, filename, fieldnames=FIELDNAMES):
+        super().__init__(filename, fieldnames)
+        self._file = open(filename, 'w', encoding='utf-8')
+
+    def write(self, row):
+        record = {field: row.get(field, '') for field in self.fieldnames}
+        self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._file.flush()
+        self.count += 1
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetSink(RecordSink):
+    """Parquet gravado em grupos de linhas (requer pyarrow)
+
+    O formato não permite gravar linha a linha; cada lote de `batch_size`
+    registros vira um row group assim que completo.
+    """
+
+    def __init__(self, filename, fieldnames=FIELDNAMES, batch_size=500):
+        super().__init__(filename, fieldnames)
+        pa, pq = _import_pyarrow()
+        self._pa = pa
+        self._schema = parquet_schema(fieldnames)
+        self._writer = pq.ParquetWriter(filename, self._schema)
+        self.batch_size = batch_size
+        self._buffer = []
+
+    def write(self, row):
+        record = {field: row.get(field, '') for field in self.fieldnames}
+        for field in LIST_FIELDS:
+            if field in record and isinstance(record[field], str):
+                record[field] = split_values(record[field])
+        self._buffer.append(record)
+        self.count += 1
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            table = self._pa.Table.from_pylist(self._buffer, schema=self._schema)
+            self._writer.write_table(table)
+            self._buffer = []
+
+    def close(self):
+        self.flush()
+        self._writer.close()
+
+
+SINKS = {
+    '.csv': CsvSink,
+    '.jsonl': JsonlSink,
+    '.parquet': ParquetSink
+}
+
+
+def open_sink(filename, fieldnames=FIELDNAMES):
+    """Abre o sink correspondente à extensão do arquivo"""
+    extension = os.path.splitext(filename)[1].lower()
+    if extension not in SINKS:
+        raise ValueError(f"Formato de saída não suportado: {filename} (use {', '.join(SINKS)})")
+    return SINKS[extension](filename, fieldnames)
+
+
+def _join_lists(record):
+    """Listas do Parquet de volta ao texto separado por ';' dos demais formatos"""
+    for field in LIST_FIELDS:
+        if isinstance(record.get(field), list):
+            record[field] = SEPARATOR.join(record[field])
+    return record
+
+
+def read_records(filename):
+    """Lê registros gravados por qualquer um dos sinks, um de cada vez
+
+    Todos os formatos chegam no mesmo esquema de texto (Categorias
+    separadas por ';').
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.jsonl':
+        with open(filename, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    elif extension == '.parquet':
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(filename)
+        for batch in parquet_file.iter_batches():
+            for record in batch.to_pylist():
+                yield _join_lists(record)
+    else:
+        with open(filename, 'r', encoding='utf-8') as f:
+            yield from csv.DictReader(f)
+
+
+def read_dataframe(filename):
+    """Carrega CSV, JSON Lines ou Parquet em um DataFrame do pandas
+
+    No Parquet, colunas dicionarizadas viram categóricas e as listas são
+    unidas com ';' (o esquema dos CSVs), sem parsing de texto linha a linha.
+    """
+    import pandas as pd
+
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.parquet':
+        pa, pq = _import_pyarrow()
+        import pyarrow.compute as pc
+        table = pq.read_table(filename)
+        for field in LIST_FIELDS:
+            if field in table.column_names:
+                index = table.column_names.index(field)
+                values = table.column(field).cast(pa.list_(pa.string()))
+                table = table.set_column(index, field, pc.binary_join(values, SEPARATOR))
+        return table.to_pandas()
+    if extension == '.jsonl':
+        return pd.read_json(filename, lines=True, dtype=False)
+    return pd.read_csv(filename)
+
+
+def write_dataframe(df, filename):
+    """Grava um DataFrame em Parquet tipado ou, para outras extensões, em CSV
+
+    Colunas de LIST_FIELDS (texto separado por ';') viram listas e as de
+    DICTIONARY_FIELDS são dicionarizadas.
+    """
+    if os.path.splitext(filename)[1].lower() != '.parquet':
+        df.to_csv(filename, index=False, encoding='utf-8')
+        return
+    pa, pq = _import_pyarrow()
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for index, field in enumerate(table.column_names):
+        if field in LIST_FIELDS:
+            values = [split_values(value) if isinstance(value, str) else None for value in df[field]]
+            column = pa.array(values, type=parquet_type(pa, field))
+        elif field in DICTIONARY_FIELDS:
+            column = table.column(field).cast(pa.string()).dictionary_encode()
+        else:
+            continue
+        table = table.set_column(index, field, column)
+    pq.write_table(table, filename)
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+"""Respostas e sessão HTTP falsas usadas pelos testes de comum"""
+
+import requests
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, text='', headers=None, content=None):
+        self.status_code = status_code
+        self.text = text
+        # Corpo em bytes; por padrão, o texto em UTF-8
+        self.content = text.encode('utf-8') if content is None else content
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"HTTP {self.status_code}", response=self)
+
+
+class FakeSession:
+    """Responde com `handler(url, headers)` e registra as requisições feitas
+
+    `handler` retorna uma FakeResponse ou levanta uma exceção do requests.
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.calls = []
+
+    def get(self, url, timeout=None, headers=None):
+        self.calls.append((url, dict(headers or {})))
+        return self.handler(url, headers or {})
+
+    def request(self, method, url, timeout=None, headers=None):
+        return self.get(url, timeout=timeout, headers=headers)
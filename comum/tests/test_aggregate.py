@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+from collections import Counter
+
+from comum.aggregate import (Aggregation, Count, Frequencies, GroupFrequencies, GroupMean, Largest,
+                             Sum)
+
+ROWS = [
+    {'perfil': 'A', 'palavras': ['x', 'y'], 'n': 3},
+    {'perfil': 'B', 'palavras': ['x'], 'n': 5},
+    {'perfil': 'A', 'palavras': [], 'n': 5},
+    {'perfil': None, 'palavras': ['z'], 'n': 1},
+]
+
+
+def test_single_pass_over_an_iterator():
+    aggregation = Aggregation(
+        total=Count(),
+        grandes=Count(lambda row: row['n'] >= 5),
+        soma=Sum(lambda row: row['n']),
+        palavras=Frequencies(lambda row: row['palavras'], initial=['w']),
+        media=GroupMean(lambda row: row['perfil'], lambda row: row['n']),
+        por_perfil=GroupFrequencies(lambda row: row['perfil'], lambda row: row['palavras']),
+    )
+    results = aggregation.run(iter(ROWS))
+    assert results['total'] == 4
+    assert results['grandes'] == 2
+    assert results['soma'] == 14
+    assert results['palavras'] == Counter({'x': 2, 'y': 1, 'z': 1, 'w': 0})
+    assert list(results['palavras'])[0] == 'w'
+    assert results['media'] == {'A': 4.0, 'B': 5.0}
+    assert results['por_perfil']['A'] == Counter({'x': 1, 'y': 1})
+
+
+def test_largest_keeps_stable_order_for_ties():
+    largest = Largest(2, item=lambda row: (row['perfil'], row['n']), key=lambda item: item[1])
+    for row in ROWS:
+        largest.add(row)
+    # Como sorted(..., reverse=True)[:2] da lista completa: empates na ordem de chegada
+    assert largest.result() == [('B', 5), ('A', 5)]
+
+
+def test_frequencies_capacity_keeps_frequent_values():
+    frequencies = Frequencies(lambda row: row, capacity=4)
+    for values in (['a'] * 10, ['b'] * 5, ['c'], ['d'], ['e']):
+        frequencies.add(values)
+    assert frequencies.pruned
+    assert frequencies.result().most_common(2) == [('a', 10), ('b', 5)]
+    assert len(frequencies.result()) <= 4
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+import json
+import random
+
+import pytest
+
+from comum.classifier import KeywordClassifier, fold, load_taxonomy
+
+TAXONOMY = {
+    'Certidão': ['certidão', 'certidao'],
+    'Consulta': ['consulta'],
+    'Cadastro': ['cadastro', 'inscrição'],
+}
+
+
+def naive(taxonomy, text):
+    """Referência: `palavra in texto` para cada palavra-chave, na ordem da taxonomia"""
+    text = fold(text)
+    return [label for label, keywords in taxonomy.items()
+            if any(fold(keyword) in text for keyword in keywords if keyword)]
+
+
+def test_fold():
+    assert fold('Emissão de CERTIDÃO') == 'emissao de certidao'
+    assert fold('consulta') == 'consulta'
+
+
+def test_classify_returns_first_label_in_taxonomy_order():
+    classifier = KeywordClassifier(TAXONOMY)
+    assert classifier.classify('Consulta de Certidão Negativa') == 'Certidão'
+    assert classifier.classify('CONSULTA ao cadastro') == 'Consulta'
+    assert classifier.classify('Inscricao estadual') == 'Cadastro'
+    assert classifier.classify('Pagamento', default='Outros') == 'Outros'
+    assert classifier.classify(None) is None
+    assert classifier.classify_all('consulta ao cadastro') == ['Consulta', 'Cadastro']
+
+
+def test_overlapping_keywords_follow_failure_links():
+    taxonomy = {'he': ['he'], 'she': ['she'], 'his': ['his'], 'hers': ['hers']}
+    classifier = KeywordClassifier(taxonomy)
+    assert classifier.classify_all('ushers') == ['he', 'she', 'hers']
+    assert classifier.classify_all('ahishe') == ['he', 'she', 'his']
+
+
+def test_matches_naive_substring_search():
+    taxonomy = {f'T{i}': [''.join(random.Random(i * 7 + j).choices('abcã', k=1 + j % 4)) for j in range(3)]
+                for i in range(6)}
+    classifier = KeywordClassifier(taxonomy)
+    rng = random.Random(1)
+    for _ in range(500):
+        text = ''.join(rng.choices('abcãd ', k=rng.randint(0, 12)))
+        assert classifier.classify_all(text) == naive(taxonomy, text)
+        # Segunda consulta vem do cache com o mesmo resultado
+        assert classifier.classify_all(text) == naive(taxonomy, text)
+
+
+def test_load_taxonomy(tmp_path):
+    path = tmp_path / 'taxonomia.json'
+    path.write_text(json.dumps(TAXONOMY, ensure_ascii=False), encoding='utf-8')
+    assert KeywordClassifier.from_file(str(path)).labels == list(TAXONOMY)
+
+    path.write_text(json.dumps({'Certidão': 'certidão'}), encoding='utf-8')
+    with pytest.raises(ValueError):
+        load_taxonomy(str(path))
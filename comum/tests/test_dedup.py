@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+from comum.dedup import ServiceIndex, expand_profiles, split_values
+
+
+def row(url, profile, categories='A', title='Serviço'):
+    return {'Categorias': categories, 'Perfis': profile, 'Serviços': title, 'URL': url}
+
+
+def test_split_values():
+    assert split_values('A;B;;C') == ['A', 'B', 'C']
+    assert split_values(None) == []
+
+
+def test_index_merges_rows_by_canonical_url_in_order():
+    index = ServiceIndex([
+        row('http://h/a/', 'P1', 'A;B'),
+        row('http://h/b/', 'P1'),
+        row('HTTP://h/a', 'P2', 'B;C'),
+        row('', 'P3'),
+    ])
+    assert index.rows_seen == 4
+    assert list(index.records()) == [
+        {'Categorias': 'A;B;C', 'Perfis': 'P1;P2', 'Serviços': 'Serviço', 'URL': 'http://h/a/'},
+        {'Categorias': 'A', 'Perfis': 'P1', 'Serviços': 'Serviço', 'URL': 'http://h/b/'},
+    ]
+    assert '2 serviços únicos' in index.summary()
+
+
+def test_expand_profiles_restores_the_long_format():
+    long_rows = [row('http://h/a/', 'P1'), row('http://h/a/', 'P2'), row('http://h/b/', 'P1')]
+    expanded = list(expand_profiles(ServiceIndex(long_rows).records()))
+    assert expanded == long_rows
+    # Linhas já no formato longo passam inalteradas
+    assert list(expand_profiles(long_rows)) == long_rows
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+from comum.delta import PageManifest, compute_delta, delta_filename, load_snapshot, save_delta
+from comum.records import ServiceRecord
+
+
+def row(url, title='Serviço', categories='A', profiles='P1'):
+    return {'Categorias': categories, 'Perfis': profiles, 'Serviços': title, 'URL': url}
+
+
+def kinds(delta):
+    return sorted((change['Tipo'], change['URL']) for change in delta)
+
+
+def test_compute_delta_classifies_each_change():
+    old = [row('u1'), row('u2', title='Antigo'), row('u3', categories='A'), row('u4'), row('u5')]
+    new = [row('u1'), row('u2', title='Novo'), row('u3', categories='A;B'),
+           row('u4', profiles='P1;P2'), row('u6')]
+    assert kinds(compute_delta(old, new)) == [
+        ('adicionado', 'u6'),
+        ('perfis_alterados', 'u4'),
+        ('recategorizado', 'u3'),
+        ('removido', 'u5'),
+        ('renomeado', 'u2'),
+    ]
+    renamed = next(change for change in compute_delta(old, new) if change['Tipo'] == 'renomeado')
+    assert (renamed['Serviços'], renamed['Serviços_Anterior']) == ('Novo', 'Antigo')
+
+
+def test_compute_delta_long_and_deduplicated_formats_are_equivalent():
+    long_rows = [row('u1', categories='A', profiles='P1'), row('u1', categories='B', profiles='P2')]
+    deduplicated = [row('u1', categories='B;A', profiles='P2;P1')]
+    assert compute_delta(long_rows, deduplicated) == []
+
+
+def test_compute_delta_accepts_records():
+    records = [ServiceRecord(['A'], 'P1', 'Serviço', 'u1')]
+    assert compute_delta([row('u1')], records) == []
+
+
+def test_delta_round_trip(tmp_path):
+    filename = str(tmp_path / 'servicos.csv')
+    assert load_snapshot(filename) == []
+    assert delta_filename('sefaz.parquet') == 'sefaz_delta.csv'
+    delta = compute_delta([], [row('u1')])
+    save_delta(delta, delta_filename(filename))
+    assert load_snapshot(delta_filename(filename)) == delta
+    save_delta([], delta_filename(filename))
+    assert load_snapshot(delta_filename(filename)) == []
+
+
+def test_page_manifest_reuses_unchanged_pages(tmp_path):
+    filename = PageManifest.manifest_filename(str(tmp_path / 'servicos.csv'))
+    manifest = PageManifest(filename)
+    assert manifest.lookup('u', '<html>1</html>') is None
+    manifest.record('u', '<html>1</html>', {'rows': [row('u1')]})
+    manifest.record('v', '<html>2</html>', {'rows': []})
+    manifest.save()
+
+    manifest = PageManifest(filename)
+    assert manifest.lookup('u', '<html>1</html>') == {'rows': [row('u1')]}
+    assert manifest.lookup('v', '<html>mudou</html>') is None
+    manifest.save()
+    # Só as páginas vistas nesta execução são mantidas
+    assert PageManifest(filename).previous.keys() == {'u'}
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+
+import pytest
+import requests
+
+from comum.fetch import CircuitBreaker, Fetcher, FetchError, classify_error
+from comum.http_cache import HttpCache
+from comum.metrics import Metrics
+from comum.tests.fakes import FakeResponse, FakeSession
+
+
+def responses(*items):
+    """Handler que devolve (ou levanta) os itens em sequência e repete o último"""
+    items = list(items)
+
+    def handler(url, headers):
+        item = items.pop(0) if len(items) > 1 else items[0]
+        if isinstance(item, Exception):
+            raise item
+        return item
+    return handler
+
+
+def fetcher(handler, **kwargs):
+    kwargs.setdefault('backoff', 0)
+    return Fetcher(FakeSession(handler), **kwargs)
+
+
+def test_classify_error():
+    assert classify_error(requests.Timeout()) == ('timeout', True)
+    assert classify_error(requests.ConnectionError()) == ('conexão', True)
+    assert classify_error(requests.HTTPError(response=FakeResponse(503))) == ('HTTP 503', True)
+    assert classify_error(requests.HTTPError(response=FakeResponse(404))) == ('HTTP 404', False)
+
+
+def test_transient_failures_are_retried():
+    f = fetcher(responses(requests.Timeout(), FakeResponse(502), FakeResponse(200, 'ok')), retries=3)
+    assert f.fetch('http://h/a/') == 'ok'
+    assert f.stats == {'requests': 3, 'retries': 2, 'recovered': 1, 'lost': 0}
+
+
+def test_definitive_failures_are_not_retried():
+    f = fetcher(responses(FakeResponse(404)), retries=3)
+    with pytest.raises(FetchError, match='HTTP 404'):
+        f.fetch('http://h/a/')
+    assert f.stats['requests'] == 1
+    assert f.lost == [('http://h/a/', 'HTTP 404')]
+
+
+def test_expected_404_is_not_a_lost_page():
+    f = fetcher(responses(FakeResponse(404)), retries=3)
+    with pytest.raises(FetchError, match='HTTP 404'):
+        f.fetch('http://h/wp-json/', missing_ok=True)
+    assert f.stats['lost'] == 0 and f.lost == []
+
+
+def test_page_is_lost_after_its_retries():
+    f = fetcher(responses(FakeResponse(503)), retries=2, breaker_threshold=10)
+    with pytest.raises(FetchError, match='após 3 tentativas'):
+        f.fetch('http://h/a/')
+    assert f.stats == {'requests': 3, 'retries': 2, 'recovered': 0, 'lost': 1}
+
+
+def test_breaker_opens_and_closes_after_a_successful_probe():
+    breaker = CircuitBreaker(threshold=2, cooldown=0.05)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow()       # requisição de teste
+    assert not breaker.allow()   # só uma por vez
+    breaker.record_success()
+    assert breaker.allow()
+    assert breaker.trips == 1
+
+
+def test_definitive_failures_leave_the_breaker_alone():
+    f = fetcher(responses(FakeResponse(503), FakeResponse(503), FakeResponse(404), FakeResponse(503)),
+                retries=0, breaker_threshold=3, breaker_cooldown=0.01)
+    for i in range(3):
+        with pytest.raises(FetchError):
+            f.fetch(f'http://h/{i}/')
+    breaker = f.breaker('http://h/')
+    assert breaker.failures == 2 and breaker.trips == 0
+    with pytest.raises(FetchError):
+        f.fetch('http://h/3/')
+    assert breaker.trips == 1
+
+    # Um 404 na requisição de teste libera a vez sem fechar o circuito
+    time.sleep(0.02)
+    f.session.handler = responses(FakeResponse(404))
+    with pytest.raises(FetchError, match='HTTP 404'):
+        f.fetch('http://h/4/')
+    assert breaker.opened_at is not None and not breaker.probing
+
+
+def test_open_breaker_makes_callers_wait_instead_of_losing_pages():
+    outage_until = time.monotonic() + 0.1
+
+    def handler(url, headers):
+        return FakeResponse(503 if time.monotonic() < outage_until else 200, 'ok')
+
+    # Cada página espera o circuito em vez de gastar tentativas; mesmo a que
+    # faz todos os testes tem tentativas para 0,25 s, mais que a queda
+    f = fetcher(handler, retries=5, breaker_threshold=2, breaker_cooldown=0.05)
+    results = []
+    threads = [threading.Thread(target=lambda i=i: results.append(f.fetch(f'http://h/{i}/')))
+               for i in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ['ok'] * 6
+    assert f.stats['lost'] == 0
+    assert f.breaker('http://h/').trips >= 1
+
+
+def test_dead_host_loses_each_page_after_its_own_retries():
+    f = fetcher(responses(FakeResponse(503)), retries=1, breaker_threshold=1, breaker_cooldown=0.01)
+    for i in range(3):
+        with pytest.raises(FetchError):
+            f.fetch(f'http://h/{i}/')
+    assert f.stats == {'requests': 6, 'retries': 3, 'recovered': 0, 'lost': 3}
+
+
+def test_metrics_count_pages_and_bytes():
+    metrics = Metrics('teste')
+    f = fetcher(responses(FakeResponse(200, 'corpo'), FakeResponse(404)), metrics=metrics)
+    f.fetch('http://h/a/')
+    with pytest.raises(FetchError):
+        f.fetch('http://h/b/')
+    assert metrics.value('response_payload_bytes_total') == len('corpo')
+    assert metrics.value('pages_total', status='ok') == 1
+    assert metrics.value('pages_total', status='lost') == 1
+    assert metrics.stages['fetch'].count == 2
+
+
+def test_metrics_count_received_bytes_not_reencoded_text():
+    # Página em Latin-1: 'ação' tem 4 bytes no corpo e 6 em UTF-8
+    metrics = Metrics('teste')
+    f = fetcher(responses(FakeResponse(200, 'ação', content='ação'.encode('latin-1'))), metrics=metrics)
+    f.fetch('http://h/a/')
+    assert metrics.value('response_payload_bytes_total') == 4
+
+
+def test_metrics_count_only_network_bytes(tmp_path):
+    session = FakeSession(lambda url, headers: FakeResponse(200, 'corpo', headers={'ETag': '"1"'}))
+    metrics = Metrics('teste')
+    f = Fetcher(session, cache=HttpCache(str(tmp_path), ttl=3600), metrics=metrics)
+    f.fetch('http://h/a/')
+    f.fetch('http://h/a/')
+    assert metrics.value('response_payload_bytes_total') == len('corpo')
+    assert metrics.value('cache_hits_total', status='hit') == 1
+    assert metrics.value('pages_total', status='ok') == 2
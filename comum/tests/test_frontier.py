@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+from comum.frontier import CrawlFrontier, canonicalize_url, expand_pagination, page_number
+
+
+def test_canonicalize_url_equivalent_spellings():
+    canonical = 'https://www.exemplo.gov.br/Geral/agropecuaria/'
+    assert canonicalize_url('HTTPS://WWW.Exemplo.gov.br:443/Geral/agropecuaria') == canonical
+    assert canonicalize_url('https://www.exemplo.gov.br//Geral/agropecuaria/#topo') == canonical
+    assert canonicalize_url('https://www.exemplo.gov.br/Geral/agropecuaria/page/1/') == canonical
+
+
+def test_canonicalize_url_keeps_files_ports_and_sorts_query():
+    assert canonicalize_url('http://h:8080/doc.pdf') == 'http://h:8080/doc.pdf'
+    assert canonicalize_url('http://h/busca?b=2&a=1') == 'http://h/busca/?a=1&b=2'
+
+
+def test_page_number_and_expand_pagination():
+    assert page_number('http://h/Geral/x/') == 1
+    assert page_number('http://h/Geral/x/page/7/') == 7
+    links = ['http://h/Geral/x/page/2/', 'http://h/Geral/x/page/5/', 'http://h/Geral/x/']
+    assert expand_pagination(links) == [f'http://h/Geral/x/page/{n}/' for n in range(2, 6)]
+    assert expand_pagination(['http://h/Geral/x/?pagina=2']) == []
+
+
+def test_add_ignores_urls_already_scheduled():
+    frontier = CrawlFrontier()
+    assert frontier.add('http://h/a') == 'http://h/a/'
+    assert frontier.add('HTTP://h/a/#x') is None
+    assert 'http://h/a/' in frontier
+    assert len(frontier) == 1
+
+
+def test_results_are_released_in_profile_and_page_order():
+    frontier = CrawlFrontier()
+    first = frontier.add('http://h/a/', 0)
+    second = frontier.add('http://h/b/', 1)
+    page_two = frontier.add('http://h/a/page/2/', 0)
+
+    # Concluídas fora de ordem, ficam retidas até as anteriores terminarem
+    assert frontier.complete(second, ['b1']) == []
+    assert frontier.complete(page_two, ['a2']) == []
+    assert frontier.complete(first, ['a1']) == ['a1', 'a2', 'b1']
+
+
+def test_failed_pages_do_not_block_the_output():
+    frontier = CrawlFrontier()
+    first = frontier.add('http://h/a/')
+    second = frontier.add('http://h/b/')
+    assert frontier.complete(second, ['b']) == []
+    assert frontier.complete(first, failed=True) == ['b']
+
+
+def test_canonicalize_url_is_memoised():
+    canonicalize_url.cache_clear()
+    canonicalize_url('http://h/a')
+    canonicalize_url('http://h/a')
+    assert canonicalize_url.cache_info().hits == 1
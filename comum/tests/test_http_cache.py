@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+from comum.http_cache import HttpCache
+from comum.tests.fakes import FakeResponse, FakeSession
+
+
+class Server:
+    """Página com ETag que responde 304 a If-None-Match com o ETag atual"""
+
+    def __init__(self, body='<html>v1</html>', etag='"v1"'):
+        self.body = body
+        self.etag = etag
+
+    def __call__(self, url, headers):
+        if headers.get('If-None-Match') == self.etag:
+            return FakeResponse(304, headers={'ETag': self.etag})
+        return FakeResponse(200, self.body, headers={'ETag': self.etag})
+
+
+def test_fresh_entries_are_served_without_requests(tmp_path):
+    session = FakeSession(Server())
+    cache = HttpCache(str(tmp_path), ttl=3600)
+    assert cache.fetch_with_source(session, 'http://h/a/') == ('<html>v1</html>', 'miss', 15)
+    assert cache.fetch_with_source(session, 'http://h/a/') == ('<html>v1</html>', 'hit', 0)
+    assert len(session.calls) == 1
+    assert cache.stats == {'hits': 1, 'misses': 1, 'revalidated': 0}
+
+
+def test_stale_entries_are_revalidated_with_conditional_get(tmp_path):
+    server = Server()
+    session = FakeSession(server)
+    cache = HttpCache(str(tmp_path), ttl=0)
+    cache.fetch(session, 'http://h/a/')
+    assert cache.fetch_with_source(session, 'http://h/a/') == ('<html>v1</html>', 'revalidated', 0)
+    assert session.calls[-1][1] == {'If-None-Match': '"v1"'}
+
+    server.body, server.etag = '<html>v2</html>', '"v2"'
+    assert cache.fetch_with_source(session, 'http://h/a/') == ('<html>v2</html>', 'miss', 15)
+    assert cache.stats == {'hits': 0, 'misses': 2, 'revalidated': 1}
+
+
+def test_index_is_persisted_on_save(tmp_path):
+    session = FakeSession(Server())
+    cache = HttpCache(str(tmp_path), ttl=3600)
+    cache.fetch(session, 'http://h/a/')
+    cache.save()
+
+    cache = HttpCache(str(tmp_path), ttl=3600)
+    assert cache.fetch_with_source(session, 'http://h/a/')[1] == 'hit'
+    assert len(session.calls) == 1
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    session = FakeSession(lambda url, headers: FakeResponse(200, 'x' * 10))
+    cache = HttpCache(str(tmp_path), ttl=3600, max_bytes=25)
+    cache.fetch(session, 'http://h/a/')
+    cache.fetch(session, 'http://h/b/')
+    cache.fetch(session, 'http://h/a/')  # a passa a ser a mais recente
+    cache.fetch(session, 'http://h/c/')
+    assert cache.total_bytes == 20
+    assert [entry['url'] for entry in cache.index.values()] == ['http://h/a/', 'http://h/c/']
+    cache.save()
+
+    # A ordem de uso sobrevive ao índice gravado
+    cache = HttpCache(str(tmp_path), ttl=3600, max_bytes=25)
+    cache.fetch(session, 'http://h/d/')
+    assert [entry['url'] for entry in cache.index.values()] == ['http://h/c/', 'http://h/d/']
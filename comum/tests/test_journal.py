@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+from comum.frontier import CrawlFrontier
+from comum.journal import CrawlJournal, journal_filename
+
+
+def test_journal_filename():
+    assert journal_filename('dados/servicos.csv') == 'dados/servicos_journal.db'
+
+
+def test_restore_resumes_from_journal(tmp_path):
+    journal = CrawlJournal(str(tmp_path / 'coleta_journal.db'))
+    journal.start(['http://h/a/', 'http://h/b/'])
+    frontier = CrawlFrontier(journal)
+    first = frontier.add('http://h/a/', 0)
+    second = frontier.add('http://h/b/', 1)
+    third = frontier.add('http://h/a/page/2/', 0)
+    frontier.complete(second, [{'URL': 'b'}])
+    frontier.complete(first, [{'URL': 'a'}])
+    frontier.complete(third, failed=True)
+    journal.close()
+
+    journal = CrawlJournal(str(tmp_path / 'coleta_journal.db'))
+    assert journal.has_unfinished_run()
+    assert journal.roots() == ['http://h/a/', 'http://h/b/']
+    restored, released, pending = CrawlFrontier.restore(journal)
+    # A página com falha volta para a fila e retém as linhas posteriores
+    assert released == [{'URL': 'a'}]
+    assert pending == [third]
+    assert restored.add('http://h/a/page/2') is None
+    assert restored.complete(third, [{'URL': 'a2'}]) == [{'URL': 'a2'}, {'URL': 'b'}]
+    journal.finish()
+    assert not journal.has_unfinished_run()
+    journal.close()
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+import json
+
+from comum.metrics import Histogram, Metrics, metrics_filenames
+
+
+def test_histogram_quantiles_use_bucket_bounds():
+    histogram = Histogram(buckets=(0.1, 1.0, 10.0))
+    for value in (0.05, 0.05, 0.5, 5.0):
+        histogram.observe(value)
+    assert list(histogram.cumulative()) == [(0.1, 2), (1.0, 3), (10.0, 4)]
+    assert histogram.quantile(0.5) == 0.1
+    assert histogram.quantile(0.95) == 5.0  # limitado ao máximo observado
+
+
+def test_export(tmp_path):
+    metrics = Metrics('carta')
+    metrics.observe('fetch', 0.2)
+    metrics.increment('pages_total', status='ok')
+    metrics.increment('pages_total', 2, status='ok')
+    assert metrics.value('pages_total', status='ok') == 3
+
+    json_path, prometheus_path = metrics_filenames(str(tmp_path / 'servicos.csv'))
+    metrics.export(json_path, prometheus_path)
+    with open(json_path, encoding='utf-8') as f:
+        exported = json.load(f)
+    assert exported['stages']['fetch']['count'] == 1
+    with open(prometheus_path, encoding='utf-8') as f:
+        text = f.read()
+    assert 'sefaz_pages_total{job="carta",status="ok"} 3' in text
+    assert 'sefaz_stage_duration_seconds_count{job="carta",stage="fetch"} 1' in text
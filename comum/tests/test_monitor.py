@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+import json
+
+from comum.monitor import BlockMonitor, find_blocks, run_polls
+
+
+def page(*items):
+    return '<html>' + ''.join(f'<ul class="daems-list"><li>{item}</li></ul>' for item in items) + '</html>'
+
+
+def split(content):
+    return 'Perfil', {}, find_blocks(content, 'ul', 'daems-list')
+
+
+def extract(block, info):
+    name = block.split('<li>')[1].split('</li>')[0].split(':')[0]
+    return name, [{'Serviços': block}]
+
+
+def test_find_blocks_handles_nesting_and_class_lists():
+    html = ('<ul class="outra daems-list"><li><ul class="x"><li>a</li></ul></li></ul>'
+            '<ul class="daems-listas">não</ul><UL CLASS="daems-list">b</UL>')
+    assert find_blocks(html, 'ul', 'daems-list') == [
+        '<ul class="outra daems-list"><li><ul class="x"><li>a</li></ul></li></ul>',
+        '<UL CLASS="daems-list">b</UL>',
+    ]
+
+
+def test_only_changed_blocks_are_extracted_and_reported(tmp_path):
+    state = str(tmp_path / 'servicos_monitor.json')
+    changes_path = str(tmp_path / 'servicos_mudancas.jsonl')
+    monitor = BlockMonitor(state)
+    assert monitor.baseline
+    rows, _, keys = monitor.check('u', page('A:1', 'B:1'), split, extract)
+    assert keys == ['A', 'B'] and len(rows) == 2
+    assert monitor.finish(changes_path) == []
+
+    monitor = BlockMonitor(state)
+    calls = []
+
+    def counting_extract(block, info):
+        calls.append(block)
+        return extract(block, info)
+
+    monitor.check('u', page('A:1', 'B:2', 'C:1'), split, counting_extract)
+    assert len(calls) == 2  # A foi reaproveitado
+    changes = monitor.finish(changes_path)
+    assert sorted((change['Tipo'], change['Bloco']) for change in changes) == [
+        ('adicionado', 'C'), ('alterado', 'B')]
+
+    # Página idêntica: nada é extraído nem reportado
+    monitor.check('u', page('A:1', 'B:2', 'C:1'), split, counting_extract)
+    assert len(calls) == 2
+    assert monitor.finish(changes_path) == []
+
+    monitor.check('u', page('A:1'), split, counting_extract)
+    assert [change['Tipo'] for change in monitor.finish(changes_path)] == ['removido', 'removido']
+    with open(changes_path, encoding='utf-8') as f:
+        assert len([json.loads(line) for line in f]) == 4
+
+
+def test_pages_that_could_not_be_fetched_keep_their_state(tmp_path):
+    monitor = BlockMonitor(str(tmp_path / 'monitor.json'))
+    monitor.check('u', page('A:1'), split, extract)
+    monitor.finish()
+    rows, _, keys = monitor.keep('u')
+    assert keys == ['A'] and len(rows) == 1
+    assert monitor.keep('desconhecida') is None
+    assert monitor.finish() == []
+
+
+def test_run_polls():
+    calls = []
+    assert run_polls(lambda: calls.append(1)) == 1
+    assert run_polls(lambda: calls.append(1), interval=0.01, polls=3) == 3
+    assert len(calls) == 4
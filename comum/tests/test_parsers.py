@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from comum.parsers import BACKENDS, get_backend
+
+CATALOGUE = """
+<html><body>
+<h1 class="titulo green"> Agropecuária </h1>
+<div class="card card-body extra">
+  <a href="https://h/servico-1/"><h5 class="card-title">Emissão de <b>Certidão</b></h5></a>
+  <div class="categorias">
+    <a rel="category  tag" href="#">Certidões</a>
+    <a rel="tag" href="#">Ignorada</a>
+    <a rel="category tag" href="#">ICMS &amp; IPVA</a>
+  </div>
+</div>
+<div class="card-body"><a href="https://h/servico-2/"><h5 class="card-title">Sem categorias</h5></a></div>
+<div class="card-body"><span>Sem link</span></div>
+<div class="paginacao"><a href="https://h/page/2/">2</a><a href="https://h/page/3/">3</a></div>
+</body></html>
+"""
+
+SITE = """
+<html><body>
+<div class="daems-list-column">
+  <ul class="daems-list">
+    <li class="daems-titulos"> Certidões </li>
+    <li class="daems-list-itens"><a href="https://h/a/">Certidão <em>Negativa</em></a></li>
+    <li class="daems-list-itens">sem link</li>
+  </ul>
+  <ul class="daems-list"><li class="daems-list-itens"><a href="https://h/x/">Sem título</a></li></ul>
+  <ul class="outra daems-list">
+    <li class="daems-titulos">IPVA</li>
+    <li class="daems-list-itens"><a href="https://h/b.pdf">Tabela</a></li>
+  </ul>
+</div>
+<ul class="daems-list"><li class="daems-titulos">Fora da coluna</li></ul>
+</body></html>
+"""
+
+TARGETED = [name for name in BACKENDS if name != 'bs4']
+
+
+def backend(name):
+    if name == 'lxml':
+        pytest.importorskip('lxml')
+    if name == 'selectolax':
+        pytest.importorskip('selectolax')
+    return get_backend(name)
+
+
+def test_catalogue_reference():
+    assert backend('html.parser').parse_catalogue(CATALOGUE) == {
+        'heading': 'Agropecuária',
+        'cards': [
+            {'href': 'https://h/servico-1/', 'title': 'Emissão deCertidão',
+             'categories': ['Certidões', 'ICMS & IPVA']},
+            {'href': 'https://h/servico-2/', 'title': 'Sem categorias', 'categories': []},
+            {'href': None, 'title': None, 'categories': []},
+        ],
+        'pagination': ['https://h/page/2/', 'https://h/page/3/']
+    }
+
+
+def test_site_reference():
+    assert backend('html.parser').parse_site(SITE) == [
+        {'category': 'Certidões', 'items': [('CertidãoNegativa', 'https://h/a/')]},
+        {'category': 'IPVA', 'items': [('Tabela', 'https://h/b.pdf')]},
+    ]
+
+
+@pytest.mark.parametrize('name', TARGETED)
+def test_backends_are_equivalent(name):
+    reference = backend('html.parser')
+    candidate = backend(name)
+    assert candidate.parse_catalogue(CATALOGUE) == reference.parse_catalogue(CATALOGUE)
+    assert candidate.parse_site(SITE) == reference.parse_site(SITE)
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        get_backend('regex')
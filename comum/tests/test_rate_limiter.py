@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+import time
+from email.utils import formatdate
+
+import pytest
+import requests
+
+from comum.rate_limiter import RateLimiter, TokenBucket, parse_host_rates, parse_retry_after
+from comum.tests.fakes import FakeResponse, FakeSession
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('120') == 120.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('amanhã') is None
+    now = time.time()
+    assert parse_retry_after(formatdate(now + 30, usegmt=True), now=now) == pytest.approx(30, abs=1)
+    assert parse_retry_after(formatdate(now - 30, usegmt=True), now=now) == 0.0
+
+
+def test_parse_host_rates():
+    assert parse_host_rates(['WWW.Exemplo.gov.br=2.5', 'h=1']) == {'www.exemplo.gov.br': 2.5, 'h': 1.0}
+    with pytest.raises(ValueError):
+        parse_host_rates(['sem-taxa'])
+
+
+def test_rate_increases_additively_up_to_max_rate():
+    bucket = TokenBucket(rate=1.0, max_rate=1.5, increase=0.25)
+    bucket.on_success(0.1)
+    assert bucket.rate == 1.25
+    for _ in range(5):
+        bucket.on_success(0.1)
+    assert bucket.rate == 1.5
+
+
+def test_rate_halves_once_per_latency_window():
+    bucket = TokenBucket(rate=8.0, min_rate=1.0, target_latency=0.05)
+    bucket.on_success(1.0)
+    bucket.on_success(1.0)  # mesma janela: uma única redução
+    assert bucket.rate == 4.0
+    assert bucket.stats['slow'] == 2
+    for _ in range(4):
+        time.sleep(0.06)
+        bucket.on_success(1.0)
+    assert bucket.rate == 1.0
+
+
+def test_throttle_respects_retry_after():
+    bucket = TokenBucket(rate=100.0, max_rate=100.0)
+    bucket.on_throttle(retry_after=0.1)
+    assert bucket.rate == 50.0
+    started = time.monotonic()
+    bucket.acquire()
+    assert time.monotonic() - started >= 0.09
+    assert bucket.stats['throttled'] == 1
+
+
+def test_bucket_spaces_requests_at_the_current_rate():
+    bucket = TokenBucket(rate=20.0, max_rate=20.0)
+    started = time.monotonic()
+    for _ in range(4):
+        bucket.acquire()
+    # A primeira ficha já está no balde; as outras três chegam a cada 50 ms
+    assert time.monotonic() - started >= 0.14
+    assert bucket.stats['requests'] == 4
+
+
+def test_limiter_keeps_one_bucket_per_host():
+    limiter = RateLimiter(rate=1.0, max_rate=10.0, host_rates={'Lento': 0.5})
+    assert limiter.bucket('http://a/x') is limiter.bucket('http://A/y')
+    assert limiter.bucket('http://a/x') is not limiter.bucket('http://b/x')
+    assert limiter.bucket('http://lento/').rate == 0.5
+
+
+def test_request_feeds_responses_back_to_the_bucket():
+    session = FakeSession(lambda url, headers: FakeResponse(429, headers={'Retry-After': '0'}))
+    limiter = RateLimiter(rate=4.0, max_rate=4.0)
+    response = limiter.request(session, 'GET', 'http://h/a/')
+    assert response.status_code == 429
+    bucket = limiter.bucket('http://h/')
+    assert bucket.stats['throttled'] == 1
+    assert bucket.rate == 2.0
+
+
+def test_request_errors_slow_the_host_down():
+    def handler(url, headers):
+        raise requests.Timeout()
+
+    limiter = RateLimiter(rate=4.0, max_rate=8.0)
+    with pytest.raises(requests.Timeout):
+        limiter.request(FakeSession(handler), 'GET', 'http://h/a/')
+    bucket = limiter.bucket('http://h/')
+    assert bucket.stats['errors'] == 1
+    assert bucket.rate == 2.0
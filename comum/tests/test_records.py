@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+import pickle
+
+import pytest
+
+from comum.records import ServiceRecord, from_rows, to_rows
+
+ROW = {'Categorias': 'A;B', 'Perfis': 'Cidadão', 'Serviços': 'Certidão', 'URL': 'http://h/a/'}
+
+
+def test_round_trip_through_csv_rows():
+    record = ServiceRecord.from_row(ROW)
+    assert record.categories == ('A', 'B')
+    assert record.to_row() == ROW
+    assert to_rows(from_rows([ROW])) == [ROW]
+
+
+@pytest.mark.parametrize('categories', ['', 'A', 'A;;B', ';A;'])
+def test_category_text_is_written_back_unchanged(categories):
+    row = {**ROW, 'Categorias': categories}
+    assert ServiceRecord.from_row(row).to_row() == row
+
+
+def test_behaves_like_a_row():
+    record = ServiceRecord.from_row(ROW)
+    assert record['Categorias'] == 'A;B'
+    assert record.get('Perfis') == 'Cidadão'
+    assert record.get('Outro', '-') == '-'
+    assert list(record.keys()) == list(ROW)
+    with pytest.raises(KeyError):
+        record['Outro']
+
+
+def test_categories_are_shared_between_records():
+    first = ServiceRecord(['A', 'B'], 'P', 'x', 'u1')
+    second = ServiceRecord('A;B', 'P', 'y', 'u2')
+    assert first.categories is second.categories
+
+
+def test_equality_hash_and_pickle():
+    record = ServiceRecord.from_row(ROW)
+    copy = pickle.loads(pickle.dumps(record))
+    assert copy == record
+    assert hash(copy) == hash(record)
+    assert copy.categories is record.categories
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+import argparse
+import os
+import time
+
+from comum.result_cache import ResultCache, add_cache_arguments, cache_from_args, code_version
+
+
+def write(path, text):
+    path.write_text(text, encoding='utf-8')
+    return str(path)
+
+
+def test_key_depends_on_content_version_and_params(tmp_path):
+    source = write(tmp_path / 'dados.csv', 'a,b\n1,2\n')
+    key = ResultCache.key('analise', source, 'v1', {'taxonomia': None})
+    assert key == ResultCache.key('analise', source, 'v1', {'taxonomia': None})
+    assert key != ResultCache.key('analise', source, 'v2', {'taxonomia': None})
+    assert key != ResultCache.key('analise', source, 'v1', {'taxonomia': 'x.json'})
+    write(tmp_path / 'dados.csv', 'a,b\n1,3\n')
+    assert key != ResultCache.key('analise', source, 'v1', {'taxonomia': None})
+
+
+def test_code_version_follows_source_files(tmp_path):
+    module = write(tmp_path / 'analise.py', 'x = 1\n')
+    version = code_version(module, ResultCache)
+    assert version == code_version(module, ResultCache)
+    write(tmp_path / 'analise.py', 'x = 2\n')
+    assert version != code_version(module, ResultCache)
+
+
+def test_get_put_and_invalidate(tmp_path):
+    source = write(tmp_path / 'dados.csv', 'x')
+    cache = ResultCache(str(tmp_path / 'cache'))
+    key = cache.key('analise', source, 'v1')
+    assert cache.get(key) is None
+    cache.put(key, {'total': 3}, 'analise', source)
+
+    cache = ResultCache(str(tmp_path / 'cache'))
+    assert cache.get(key) == {'total': 3}
+    assert cache.stats == {'hits': 1, 'misses': 0}
+    assert cache.invalidate(analysis='outra') == 0
+    assert cache.invalidate(source=source) == 1
+    assert cache.get(key) is None
+
+
+def test_old_and_least_recently_used_entries_are_evicted(tmp_path):
+    source = write(tmp_path / 'dados.csv', 'x')
+    cache = ResultCache(str(tmp_path / 'cache'), max_age=3600, max_bytes=10 ** 6)
+    keys = [cache.key('analise', source, f'v{i}') for i in range(3)]
+    for key in keys:
+        cache.put(key, b'x' * 100, 'analise', source)
+    cache.index[keys[0]]['stored_at'] = time.time() - 7200
+    cache.get(keys[1])
+    size = cache.index[keys[1]]['size']
+    cache.max_bytes = 2 * size
+
+    cache.put(cache.key('analise', source, 'v3'), b'x' * 100, 'analise', source)
+    assert keys[0] not in cache.index                     # vencida
+    assert keys[2] not in cache.index                     # menos usada
+    assert keys[1] in cache.index
+    assert not os.path.exists(os.path.join(cache.cache_dir, f'{keys[0]}.pickle'))
+
+
+def test_command_line_options(tmp_path):
+    parser = argparse.ArgumentParser()
+    add_cache_arguments(parser)
+    args = parser.parse_args(['--cache-dir', str(tmp_path), '--cache-max-age', '1', '--cache-max-mb', '2'])
+    cache = cache_from_args(args)
+    assert (cache.max_age, cache.max_bytes) == (24 * 3600, 2 * 1024 * 1024)
+    assert cache_from_args(parser.parse_args(['--no-cache'])) is None
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from comum.records import ServiceRecord
+from comum.sinks import open_sink, read_dataframe, read_records, write_dataframe
+
+ROWS = [
+    {'Categorias': 'A;B', 'Perfis': 'Cidadão', 'Serviços': 'Certidão', 'URL': 'http://h/a/'},
+    {'Categorias': '', 'Perfis': 'Empresa', 'Serviços': 'Consulta, "rápida"', 'URL': 'http://h/b/'},
+]
+
+
+@pytest.mark.parametrize('extension', ['.csv', '.jsonl', '.parquet'])
+def test_round_trip(tmp_path, extension):
+    if extension == '.parquet':
+        pytest.importorskip('pyarrow')
+    filename = str(tmp_path / f'servicos{extension}')
+    with open_sink(filename) as sink:
+        sink.write(ServiceRecord.from_row(ROWS[0]))
+        sink.write_rows(ROWS[1:])
+    assert sink.count == 2
+    assert list(read_records(filename)) == ROWS
+
+
+def test_unknown_extension(tmp_path):
+    with pytest.raises(ValueError):
+        open_sink(str(tmp_path / 'servicos.xlsx'))
+
+
+def test_parquet_columns_are_typed(tmp_path):
+    pa = pytest.importorskip('pyarrow')
+    pq = pytest.importorskip('pyarrow.parquet')
+    filename = str(tmp_path / 'servicos.parquet')
+    with open_sink(filename) as sink:
+        sink.write_rows(ROWS)
+    schema = pq.read_schema(filename)
+    assert pa.types.is_list(schema.field('Categorias').type)
+    assert pa.types.is_dictionary(schema.field('Perfis').type)
+
+
+def test_dataframe_round_trip(tmp_path):
+    pd = pytest.importorskip('pandas')
+    pytest.importorskip('pyarrow')
+    filename = str(tmp_path / 'servicos.parquet')
+    write_dataframe(pd.DataFrame(ROWS), filename)
+    df = read_dataframe(filename)
+    assert list(df['Categorias']) == ['A;B', '']
+    assert list(df['Perfis'].astype(str)) == ['Cidadão', 'Empresa']
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+import json
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from comum.fetch import FetchError
+from comum.wp_api import WordPressAPI, WordPressAPIError, rendered
+
+
+class FakeFetcher:
+    """Coleção de `total` itens com paginação do WordPress (400 além da última página)"""
+
+    def __init__(self, total, envelope=True):
+        self.total = total
+        self.envelope = envelope
+        self.urls = []
+
+    def fetch(self, url, missing_ok=False):
+        self.urls.append(url)
+        params = {key: values[0] for key, values in parse_qs(urlsplit(url).query).items()}
+        per_page, page = int(params['per_page']), int(params['page'])
+        pages = max(1, -(-self.total // per_page))
+        if page > pages:
+            raise FetchError(url, 'HTTP 400')
+        items = [{'id': i} for i in range((page - 1) * per_page, min(self.total, page * per_page))]
+        if self.envelope and '_envelope' in params:
+            return json.dumps({'body': items, 'status': 200,
+                               'headers': {'X-WP-Total': self.total, 'X-WP-TotalPages': pages}})
+        return json.dumps(items)
+
+
+@pytest.mark.parametrize('total, requests', [(0, 1), (3, 2), (4, 2), (5, 3)])
+def test_collection_stops_at_the_last_page(total, requests):
+    fetcher = FakeFetcher(total)
+    api = WordPressAPI(fetcher, 'http://h/', per_page=2)
+    assert [item['id'] for item in api.iter_collection('wp/v2/posts')] == list(range(total))
+    assert len(fetcher.urls) == requests
+
+
+def test_collection_without_envelope_stops_at_a_short_page():
+    fetcher = FakeFetcher(3, envelope=False)
+    api = WordPressAPI(fetcher, 'http://h/', per_page=2)
+    assert len(list(api.iter_collection('wp/v2/posts'))) == 3
+    assert len(fetcher.urls) == 2
+
+
+def test_envelope_errors_and_unexpected_bodies():
+    class Fixed:
+        def __init__(self, body):
+            self.body = body
+
+        def fetch(self, url, missing_ok=False):
+            return self.body
+
+    api = WordPressAPI(Fixed(json.dumps({'body': {}, 'status': 400, 'headers': {}})), 'http://h')
+    with pytest.raises(WordPressAPIError, match='HTTP 400'):
+        list(api.iter_collection('wp/v2/posts'))
+    api = WordPressAPI(Fixed('<html>'), 'http://h')
+    with pytest.raises(WordPressAPIError, match='JSON'):
+        list(api.iter_collection('wp/v2/posts'))
+    assert not api.available()
+
+
+def test_rendered():
+    assert rendered({'rendered': ' ICMS &amp; IPVA '}) == 'ICMS & IPVA'
+    assert rendered(None) == ''
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cliente da API REST do WordPress (wp-json)
+Lê posts e termos de taxonomia em páginas grandes (per_page=100) pelo
+mesmo Fetcher dos scrapers (limitador, novas tentativas, cache), em vez
+de percorrer o HTML renderizado
+"""
+
+import html
+import json
+from urllib.parse import urlencode
+
+from comum.fetch import FetchError
+
+MAX_PER_PAGE = 100
+
+
+class WordPressAPIError(Exception):
+    """API REST indisponível ou com resposta inesperada"""
+
+
+def rendered(value):
+    """Texto de um campo renderizado ({'rendered': ...}) sem entidades HTML"""
+    if isinstance(value, dict):
+        value = value.get('rendered', '')
+    return html.unescape(value or '').strip()
+
+
+class WordPressAPI:
+    """Acesso às rotas wp/v2 de um site WordPress
+
+    `fetcher` é um comum.fetch.Fetcher; falhas de rede e respostas que não
+    são JSON viram WordPressAPIError, para que o chamador possa voltar ao
+    scraping do HTML.
+    """
+
+    def __init__(self, fetcher, base_url, per_page=MAX_PER_PAGE):
+        self.fetcher = fetcher
+        self.root = base_url.rstrip('/') + '/wp-json/'
+        self.per_page = min(per_page, MAX_PER_PAGE)
+        self.requests = 0
+
+    def url(self, route, **params):
+        query = urlencode(params, doseq=True)
+        return self.root + route.strip('/') + (f"?{query}" if query else '')
+
+    def get(self, route, missing_ok=False, **params):
+        url = self.url(route, **params)
+        self.requests += 1
+        try:
+            body = self.fetcher.fetch(url, missing_ok=missing_ok)
+        except FetchError as e:
+            raise WordPressAPIError(str(e)) from e
+        try:
+            return json.loads(body)
+        except ValueError as e:
+            raise WordPressAPIError(f"{url}: resposta não é JSON") from e
+
+    def available(self):
+        """True se o site expõe as rotas wp/v2
+
+        Um 404 em /wp-json/ é só um site sem a API REST, não uma página perdida.
+        """
+        try:
+            index = self.get('', missing_ok=True)
+        except WordPressAPIError:
+            return False
+        return isinstance(index, dict) and 'wp/v2' in index.get('namespaces', [])
+
+    def iter_collection(self, route, **params):
+        """Itens de uma coleção paginada, `per_page` por requisição
+
+        As páginas vêm com `_envelope`, que traz no corpo os cabeçalhos da
+        resposta: o Fetcher e o cache HTTP guardam só o corpo, e é
+        X-WP-TotalPages que diz qual é a última página, sem requisitar uma
+        além dela (HTTP 400 no WordPress, contada como página perdida).
+        Sem envelope (API que o ignora), para na primeira página
+        incompleta.
+        """
+        page = 1
+        while True:
+            response = self.get(route, per_page=self.per_page, page=page, _envelope=1, **params)
+            items, total_pages = self._unwrap(route, response)
+            if not isinstance(items, list):
+                raise WordPressAPIError(f"{route}: esperada uma lista de itens")
+            yield from items
+            if total_pages is None:
+                if len(items) < self.per_page:
+                    return
+            elif page >= total_pages:
+                return
+            page += 1
+
+    @staticmethod
+    def _unwrap(route, response):
+        """(itens, X-WP-TotalPages ou None) de uma resposta com ou sem envelope"""
+        if not (isinstance(response, dict) and 'body' in response and 'headers' in response):
+            return response, None
+        if response.get('status', 200) >= 400:
+            raise WordPressAPIError(f"{route}: HTTP {response['status']}")
+        headers = {key.lower(): value for key, value in (response['headers'] or {}).items()}
+        try:
+            return response['body'], int(headers['x-wp-totalpages'])
+        except (KeyError, TypeError, ValueError):
+            return response['body'], None
+
+    def taxonomies(self):
+        """{nome: {'rest_base': ..., ...}} das taxonomias públicas"""
+        taxonomies = self.get('wp/v2/taxonomies')
+        if not isinstance(taxonomies, dict):
+            raise WordPressAPIError("wp/v2/taxonomies: resposta inesperada")
+        return taxonomies
+
+    def terms(self, rest_base):
+        """{id: termo} de uma taxonomia, com o nome já sem entidades HTML"""
+        return {term['id']: {**term, 'name': rendered(term.get('name'))}
+                for term in self.iter_collection(f"wp/v2/{rest_base}")}
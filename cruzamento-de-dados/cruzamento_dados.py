@@ -13,20 +13,47 @@ Este script realiza:
 """
 
 import pandas as pd
-import requests
+import argparse
+import hashlib
+import json
+import logging
+import os
 import re
-import time
+import sys
 from collections import Counter, defaultdict
 from difflib import SequenceMatcher
 from urllib.parse import urlparse
 import csv
 from datetime import datetime
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from comum.dedup import expand_profiles
+from comum.http_client import HttpClient
+from comum.metrics import Metrics
+from comum.progress import (Progress, add_logging_arguments, event, events_path_from_args,
+                            structured_logging, verbosity_from_args)
+from comum.rate_limiter import RateLimiter
+from comum.sinks import read_dataframe, write_dataframe
+
+logger = logging.getLogger(__name__)
+
 class CruzamentoDados:
-    def __init__(self):
-        self.carta_servico_path = '../carta-de-servico/sefaz_servicos.csv'
-        self.site_sefaz_path = '../site-sefaz/sefaz_site_servicos.csv'
+    def __init__(self, carta_servico_path='../carta-de-servico/sefaz_servicos.csv',
+                 site_sefaz_path='../site-sefaz/sefaz_site_servicos.csv', parquet=False):
+        # Entradas em CSV, JSON Lines ou Parquet (comum.sinks.read_dataframe)
+        self.carta_servico_path = carta_servico_path
+        self.site_sefaz_path = site_sefaz_path
         self.output_path = 'base_dados_unificada.csv'
+        self.similares_path = 'servicos_similares.csv'
+        # Hash por URL das entradas e pares de nomes similares, para --incremental
+        self.similares_entradas_path = 'servicos_similares_entradas.json'
+        # Com `parquet`, base unificada e pares similares também em Parquet
+        # tipado; os CSVs continuam sendo gerados para exportação
+        self.parquet = parquet
+        self.output_parquet_path = 'base_dados_unificada.parquet'
+        self.similares_parquet_path = 'servicos_similares.parquet'
+        self.metricas_json_path = 'cruzamento_metricas.json'
+        self.metricas_prom_path = 'cruzamento_metricas.prom'
         
         # Dados carregados
         self.df_carta = None
@@ -35,9 +62,18 @@ class CruzamentoDados:
         
         # Análises
         self.servicos_similares = []
+        self.nomes_similares = []
+        self.threshold_similares = None
         self.categorias_mapeadas = {}
         self.perfis_mapeados = {}
         self.urls_validadas = {}
+        # Limitador de taxa adaptativo por host usado na validação de URLs
+        # (taxa inicial de 2 req/s, a antiga pausa fixa de 0,5 segundo)
+        self.limiter = RateLimiter(rate=2.0)
+        # Conexões mantidas abertas entre as validações de um mesmo host
+        self.http = HttpClient()
+        # Tempo por etapa e contagens (comum.metrics)
+        self.metrics = Metrics('cruzamento')
         
         # Estatísticas
         self.stats = {
@@ -55,12 +91,12 @@ class CruzamentoDados:
         
         try:
             # Carta de Serviço
-            self.df_carta = pd.read_csv(self.carta_servico_path)
+            self.df_carta = self._expandir_perfis(read_dataframe(self.carta_servico_path))
             self.df_carta['fonte'] = 'Carta de Serviço'
             print(f"   ✅ Carta de Serviço: {len(self.df_carta)} serviços")
             
             # Site SEFAZ
-            self.df_site = pd.read_csv(self.site_sefaz_path)
+            self.df_site = read_dataframe(self.site_sefaz_path)
             self.df_site['fonte'] = 'Site SEFAZ'
             print(f"   ✅ Site SEFAZ: {len(self.df_site)} serviços")
             
@@ -73,6 +109,19 @@ class CruzamentoDados:
             print(f"   ❌ Erro ao carregar dados: {e}")
             raise
     
+    def _expandir_perfis(self, df):
+        """Volta a saída deduplicada do scraper (--dedup) ao formato de uma linha por perfil
+
+        Usa comum.dedup.expand_profiles, a mesma expansão dos scrapers.
+        """
+        perfis = df['Perfis'].astype('string')
+        if not perfis.str.contains(';', regex=False).any():
+            return df
+        expandido = pd.DataFrame(list(expand_profiles(df.to_dict('records'))), columns=df.columns)
+        expandido = expandido.astype({**df.dtypes.to_dict(), 'Perfis': perfis.dtype})
+        print(f"   ↔️  Catálogo deduplicado: {len(df)} serviços expandidos para {len(expandido)} linhas por perfil")
+        return expandido
+    
     def _padronizar_colunas(self):
         """Padroniza nomes das colunas entre os datasets"""
         colunas_padrao = ['Categorias', 'Perfis', 'Serviços', 'URL', 'fonte']
@@ -83,38 +132,144 @@ class CruzamentoDados:
             if colunas_faltantes:
                 print(f"   ⚠️  {nome}: Colunas faltantes: {colunas_faltantes}")
     
-    def identificar_servicos_similares(self, threshold=0.7):
-        """Identifica serviços similares entre os dois datasets"""
-        print(f"\n🔍 Identificando serviços similares (threshold: {threshold})...")
-        
-        servicos_carta = self.df_carta['Serviços'].tolist()
-        servicos_site = self.df_site['Serviços'].tolist()
+    def identificar_servicos_similares(self, threshold=0.7, anteriores=None):
+        """Identifica serviços similares entre os dois datasets
         
-        similares_encontrados = 0
+        Com `anteriores` (ver identificar_servicos_similares_incremental),
+        pares de nomes que só aparecem em URLs inalteradas reaproveitam o
+        resultado anterior em vez de serem comparados de novo.
+        """
+        print(f"\n🔍 Identificando serviços similares (threshold: {threshold})...")
         
-        for i, servico_carta in enumerate(servicos_carta):
-            for j, servico_site in enumerate(servicos_site):
-                similaridade = SequenceMatcher(None, 
-                                             servico_carta.lower(), 
-                                             servico_site.lower()).ratio()
+        # O mesmo serviço se repete em vários perfis: a similaridade é
+        # calculada uma vez por par de nomes distintos e replicada nas linhas
+        linhas_carta = self._linhas_por_nome(self.df_carta)
+        linhas_site = self._linhas_por_nome(self.df_site)
+        print(f"   📊 Nomes distintos: {len(linhas_carta)} na carta, {len(linhas_site)} no site")
+        
+        if anteriores is None:
+            alterados_site = linhas_site
+        else:
+            alterados_carta, alterados_site, similares_anteriores = anteriores
+            alterados_site = {nome: linhas_site[nome] for nome in alterados_site}
+        
+        pares = []
+        self.nomes_similares = []
+        comparados = 0
+        progresso = Progress(logger, 'Similaridade', total=len(linhas_carta), unit='nomes')
+        for servico_carta, indices_carta in linhas_carta.items():
+            if anteriores is None or servico_carta in alterados_carta:
+                candidatos = linhas_site
+            else:
+                # Nome inalterado: só os nomes alterados do site são comparados;
+                # os demais pares já foram avaliados na execução anterior
+                candidatos = alterados_site
+                for servico_site, similaridade in similares_anteriores.get(servico_carta, ()):
+                    if servico_site in linhas_site and servico_site not in alterados_site:
+                        self.nomes_similares.append((servico_carta, servico_site, similaridade))
+                        pares.extend((i, j, similaridade) for i in indices_carta for j in linhas_site[servico_site])
+            for servico_site, indices_site in candidatos.items():
+                similaridade = SequenceMatcher(None, servico_carta, servico_site).ratio()
+                comparados += 1
                 
                 if similaridade >= threshold:
-                    self.servicos_similares.append({
-                        'servico_carta': servico_carta,
-                        'servico_site': servico_site,
-                        'similaridade': round(similaridade, 3),
-                        'categoria_carta': self.df_carta.iloc[i]['Categorias'],
-                        'categoria_site': self.df_site.iloc[j]['Categorias'],
-                        'perfil_carta': self.df_carta.iloc[i]['Perfis'],
-                        'perfil_site': self.df_site.iloc[j]['Perfis'],
-                        'url_carta': self.df_carta.iloc[i]['URL'],
-                        'url_site': self.df_site.iloc[j]['URL']
-                    })
-                    similares_encontrados += 1
-        
-        print(f"   ✅ {similares_encontrados} pares de serviços similares encontrados")
+                    self.nomes_similares.append((servico_carta, servico_site, similaridade))
+                    pares.extend((i, j, similaridade) for i in indices_carta for j in indices_site)
+            progresso.advance()
+        progresso.finish()
+        
+        self.servicos_similares = [self._par_similar(i, j, similaridade) for i, j, similaridade in sorted(pares)]
+        similares_encontrados = len(pares)
+        self.threshold_similares = threshold
+        
+        print(f"   ✅ {similares_encontrados} pares de serviços similares encontrados "
+              f"({comparados} pares de nomes comparados)")
         self.stats['servicos_duplicados'] = similares_encontrados
     
+    @staticmethod
+    def _linhas_por_nome(df):
+        """Nome do serviço em minúsculas -> índices das linhas com esse nome"""
+        linhas = defaultdict(list)
+        for i, servico in enumerate(df['Serviços']):
+            linhas[str(servico).lower()].append(i)
+        return linhas
+    
+    @staticmethod
+    def _impressoes_por_url(df):
+        """URL -> hash do conteúdo de todas as linhas com essa URL"""
+        linhas = defaultdict(list)
+        for url, categorias, perfis, servico in zip(df['URL'], df['Categorias'], df['Perfis'], df['Serviços']):
+            linhas[str(url)].append('\x1f'.join(str(valor) for valor in (categorias, perfis, servico)))
+        return {url: hashlib.blake2b('\x1e'.join(sorted(conteudo)).encode('utf-8'), digest_size=12).hexdigest()
+                for url, conteudo in linhas.items()}
+    
+    @staticmethod
+    def _nomes_alterados(df, impressoes, impressoes_anteriores):
+        """Nomes (em minúsculas) das linhas cujas URLs são novas ou mudaram"""
+        urls = {url for url, impressao in impressoes.items() if impressoes_anteriores.get(url) != impressao}
+        return {str(servico).lower() for servico, url in zip(df['Serviços'], df['URL']) if str(url) in urls}, urls
+    
+    def _par_similar(self, i, j, similaridade):
+        """Monta o registro de um par similar (linha i da carta, linha j do site)"""
+        return {
+            'servico_carta': self.df_carta.iloc[i]['Serviços'],
+            'servico_site': self.df_site.iloc[j]['Serviços'],
+            'similaridade': round(similaridade, 3),
+            'categoria_carta': self.df_carta.iloc[i]['Categorias'],
+            'categoria_site': self.df_site.iloc[j]['Categorias'],
+            'perfil_carta': self.df_carta.iloc[i]['Perfis'],
+            'perfil_site': self.df_site.iloc[j]['Perfis'],
+            'url_carta': self.df_carta.iloc[i]['URL'],
+            'url_site': self.df_site.iloc[j]['URL']
+        }
+    
+    def identificar_servicos_similares_incremental(self, threshold=0.7):
+        """Recalcula os pares similares só para as URLs alteradas desde a execução anterior
+        
+        A execução anterior gravou, junto com servicos_similares.csv, o hash
+        do conteúdo de cada URL das duas entradas e os pares de nomes
+        similares (servicos_similares_entradas.json). As entradas atuais são
+        comparadas com esse retrato, sem depender dos deltas dos scrapers:
+        nomes de URLs novas ou alteradas são comparados com todos os do
+        outro lado, e os pares entre nomes de URLs inalteradas vêm do
+        resultado anterior. A saída é a mesma do cálculo completo. Sem
+        retrato ou com outro threshold, faz o cálculo completo.
+        """
+        try:
+            with open(self.similares_entradas_path, 'r', encoding='utf-8') as f:
+                retrato = json.load(f)
+        except (OSError, ValueError):
+            retrato = None
+        if retrato is None or retrato.get('threshold') != threshold:
+            print("\n   ⚠️  Retrato da execução anterior ausente ou com outro threshold, fazendo cálculo completo")
+            self.identificar_servicos_similares(threshold)
+            return
+        
+        nomes_carta, urls_carta = self._nomes_alterados(
+            self.df_carta, self._impressoes_por_url(self.df_carta), retrato['carta'])
+        nomes_site, urls_site = self._nomes_alterados(
+            self.df_site, self._impressoes_por_url(self.df_site), retrato['site'])
+        print(f"\n   📊 URLs novas ou alteradas desde a execução anterior: "
+              f"{len(urls_carta)} na carta, {len(urls_site)} no site")
+        
+        similares_anteriores = defaultdict(list)
+        for servico_carta, servico_site, similaridade in retrato['similares']:
+            similares_anteriores[servico_carta].append((servico_site, similaridade))
+        self.identificar_servicos_similares(threshold, (nomes_carta, nomes_site, similares_anteriores))
+    
+    def salvar_retrato_similares(self):
+        """Grava o retrato das entradas usado pela próxima execução incremental"""
+        retrato = {
+            'threshold': self.threshold_similares,
+            'carta': self._impressoes_por_url(self.df_carta),
+            'site': self._impressoes_por_url(self.df_site),
+            'similares': self.nomes_similares
+        }
+        tmp_path = self.similares_entradas_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(retrato, f, ensure_ascii=False)
+        os.replace(tmp_path, self.similares_entradas_path)
+    
     def mapear_categorias(self):
         """Mapeia e padroniza categorias entre os datasets"""
         print("\n📂 Mapeando e padronizando categorias...")
@@ -200,10 +355,12 @@ class CruzamentoDados:
         
         validas = 0
         invalidas = 0
+        progresso = Progress(logger, 'Validação de URLs', total=len(urls_amostra), unit='URLs')
         
         for url in urls_amostra:
             try:
-                response = requests.head(url, timeout=10, allow_redirects=True)
+                with self.metrics.timer('url_request'):
+                    response = self.limiter.request(self.http, 'HEAD', url, timeout=10, allow_redirects=True)
                 status = response.status_code
                 
                 if status == 200:
@@ -220,15 +377,21 @@ class CruzamentoDados:
                 self.urls_validadas[url] = {'status': 'erro', 'erro': str(e)}
                 invalidas += 1
             
-            # Rate limiting
-            time.sleep(0.5)
+            event(logger, 'url_checked', f"{url}: {self.urls_validadas[url]['status']}",
+                  url=url, **self.urls_validadas[url])
+            progresso.advance()
+        progresso.finish()
         
         self.stats['urls_validas'] = validas
         self.stats['urls_invalidas'] = invalidas
+        self.metrics.increment('urls_total', validas, status='valida')
+        self.metrics.increment('urls_total', invalidas, status='invalida')
         
         print(f"   ✅ URLs válidas: {validas}")
         print(f"   ❌ URLs inválidas: {invalidas}")
         print(f"   📊 Taxa de sucesso: {(validas/(validas+invalidas)*100):.1f}%")
+        print(f"   ⏱️ {self.limiter.summary()}")
+        print(f"   🔌 {self.http.summary()}")
     
     def criar_base_unificada(self):
         """Cria base de dados unificada"""
@@ -256,6 +419,9 @@ class CruzamentoDados:
         self.stats['total_servicos'] = len(self.df_unificado)
         print(f"   ✅ Base unificada criada: {len(self.df_unificado)} registros")
         print(f"   💾 Salva em: {self.output_path}")
+        if self.parquet:
+            write_dataframe(self.df_unificado, self.output_parquet_path)
+            print(f"   💾 Salva em: {self.output_parquet_path}")
     
     def gerar_relatorio_executivo(self):
         """Gera relatório executivo para a chefia"""
@@ -390,10 +556,15 @@ O cruzamento de dados revelou oportunidades significativas de melhoria na gestã
         print("\n💾 Salvando análises detalhadas...")
         
         # Serviços similares
+        if self.threshold_similares is not None:
+            self.salvar_retrato_similares()
         if self.servicos_similares:
             df_similares = pd.DataFrame(self.servicos_similares)
-            df_similares.to_csv('servicos_similares.csv', index=False, encoding='utf-8')
+            df_similares.to_csv(self.similares_path, index=False, encoding='utf-8')
             print("   ✅ Serviços similares: servicos_similares.csv")
+            if self.parquet:
+                write_dataframe(df_similares, self.similares_parquet_path)
+                print(f"   ✅ Serviços similares: {self.similares_parquet_path}")
         
         # Mapeamento de categorias
         if self.categorias_mapeadas:
@@ -423,31 +594,47 @@ O cruzamento de dados revelou oportunidades significativas de melhoria na gestã
                     ])
             print("   ✅ Validação de URLs: validacao_urls.csv")
     
-    def executar_analise_completa(self):
+    def executar_analise_completa(self, incremental=False):
         """Executa análise completa de cruzamento de dados"""
         print("🚀 Iniciando Análise de Cruzamento de Dados SEFAZ-MS")
         print("=" * 60)
         
         try:
             # Carregar dados
-            self.carregar_dados()
+            with self.metrics.timer('load'):
+                self.carregar_dados()
+            self.metrics.increment('rows_total', len(self.df_carta), fonte='carta')
+            self.metrics.increment('rows_total', len(self.df_site), fonte='site')
             
             # Análises
-            self.identificar_servicos_similares()
-            self.mapear_categorias()
-            self.mapear_perfis()
-            self.validar_urls()
+            with self.metrics.timer('similarity'):
+                if incremental:
+                    self.identificar_servicos_similares_incremental()
+                else:
+                    self.identificar_servicos_similares()
+            self.metrics.increment('similar_pairs_total', self.stats['servicos_duplicados'])
+            with self.metrics.timer('category_mapping'):
+                self.mapear_categorias()
+            with self.metrics.timer('profile_mapping'):
+                self.mapear_perfis()
+            with self.metrics.timer('url_validation'):
+                self.validar_urls()
             
             # Gerar outputs
-            self.criar_base_unificada()
-            self.gerar_relatorio_executivo()
-            self.salvar_analises_detalhadas()
+            with self.metrics.timer('write'):
+                self.criar_base_unificada()
+                self.gerar_relatorio_executivo()
+                self.salvar_analises_detalhadas()
+            self.metrics.increment('rows_total', self.stats['total_servicos'], fonte='unificada')
+            self.metrics.export(self.metricas_json_path, self.metricas_prom_path)
             
             print("\n" + "=" * 60)
             print("✅ Análise de cruzamento concluída com sucesso!")
             print(f"📊 {self.stats['total_servicos']} serviços processados")
             print(f"🔍 {self.stats['servicos_duplicados']} duplicações identificadas")
             print(f"🔗 {self.stats['urls_validas']}/{self.stats['urls_validas']+self.stats['urls_invalidas']} URLs válidas")
+            print(f"⏱️ {self.metrics.summary()}")
+            print(f"📈 Métricas salvas em {self.metricas_json_path} e {self.metricas_prom_path}")
             
         except Exception as e:
             print(f"\n❌ Erro durante a análise: {e}")
@@ -455,8 +642,21 @@ O cruzamento de dados revelou oportunidades significativas de melhoria na gestã
 
 def main():
     """Função principal"""
-    cruzamento = CruzamentoDados()
-    cruzamento.executar_analise_completa()
+    parser = argparse.ArgumentParser(description="Cruzamento de dados SEFAZ-MS")
+    parser.add_argument('--incremental', action='store_true',
+                        help="recalcula similaridades apenas para URLs alteradas desde a execução anterior")
+    parser.add_argument('--carta', default='../carta-de-servico/sefaz_servicos.csv',
+                        help="catálogo da Carta de Serviço (.csv, .jsonl ou .parquet)")
+    parser.add_argument('--site', default='../site-sefaz/sefaz_site_servicos.csv',
+                        help="serviços do site SEFAZ (.csv, .jsonl ou .parquet)")
+    parser.add_argument('--parquet', action='store_true',
+                        help="grava também a base unificada e os pares similares em Parquet")
+    add_logging_arguments(parser)
+    args = parser.parse_args()
+    
+    with structured_logging(verbosity_from_args(args), events_path_from_args(args, 'cruzamento.jsonl')):
+        cruzamento = CruzamentoDados(args.carta, args.site, parquet=args.parquet)
+        cruzamento.executar_analise_completa(incremental=args.incremental)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,20 +1,106 @@
-import csv
-from collections import Counter, defaultdict
+import argparse
+import os
+import sys
 import re
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from comum.aggregate import Aggregation, Count, Frequencies, GroupFrequencies, Sum
+from comum.classifier import KeywordClassifier, load_taxonomy
+from comum.result_cache import add_cache_arguments, cache_from_args, code_version
+from comum.sinks import read_records
+
+# Tipos de serviço por palavras-chave (sem acentos na comparação), em ordem de prioridade
+SERVICE_TYPES = {
+    'Cadastro': ['cadastro', 'inscrição', 'registro'],
+    'Certidão': ['certidão', 'atestado'],
+    'Consulta': ['consulta', 'pesquisa'],
+    'Emissão': ['emissão', 'geração'],
+    'Declaração': ['declaração'],
+    'Processo': ['processo', 'procedimento']
+}
+
+# Resultados em cache valem para a versão do código da análise (analysis_version)
+ANALYSIS_NAME = 'analise_site_sefaz'
+
+# Palavras distintas mantidas na contagem de palavras-chave (ver Frequencies)
+WORD_CAPACITY = 50000
+
+WORD_PATTERN = re.compile(r'\b\w+\b')
+
+def analysis_version():
+    """Hash dos fontes da análise, calculado só quando o cache é usado"""
+    return code_version(__file__, Aggregation, KeywordClassifier, read_records)
+
+def url_domain(url):
+    """Domínio da SEFAZ a que a URL pertence ('outros' fora deles)"""
+    if 'catalogo.sefaz.ms.gov.br' in url:
+        return 'catalogo.sefaz.ms.gov.br'
+    elif 'servicos.efazenda.ms.gov.br' in url:
+        return 'servicos.efazenda.ms.gov.br'
+    elif 'sefaz.ms.gov.br' in url:
+        return 'sefaz.ms.gov.br'
+    return 'outros'
+
+def url_file_type(url):
+    """Tipo de recurso pela extensão da URL"""
+    if url.endswith('.pdf'):
+        return 'PDF'
+    elif url.endswith('.doc') or url.endswith('.docx'):
+        return 'DOC'
+    return 'WEB'
+
+def service_words(row):
+    """Palavras do nome do serviço com mais de 3 caracteres, em minúsculas"""
+    return [word for word in WORD_PATTERN.findall(row['Serviços'].lower()) if len(word) > 3]
+
+def site_metrics(classifier):
+    """Acumuladores de todas as análises, alimentados por uma única passada"""
+    return Aggregation(
+        total=Count(),
+        categories=Frequencies(lambda row: (row['Categorias'],)),
+        profiles=Frequencies(lambda row: (row['Perfis'],)),
+        profile_categories=GroupFrequencies(lambda row: row['Perfis'], lambda row: (row['Categorias'],)),
+        domains=Frequencies(lambda row: (url_domain(row['URL']),)),
+        file_types=Frequencies(lambda row: (url_file_type(row['URL']),)),
+        words=Frequencies(service_words, capacity=WORD_CAPACITY),
+        # Primeiro tipo da taxonomia que casa; sem nenhum, 'Outros'
+        service_types=Frequencies(lambda row: (classifier.classify(row['Serviços'], 'Outros'),)),
+        pdfs=Count(lambda row: row['URL'].endswith('.pdf')),
+        name_length=Sum(lambda row: len(row['Serviços']))
+    )
+
 class AnaliseSiteSefaz:
-    def __init__(self, csv_file="sefaz_site_servicos.csv"):
+    """Análises dos serviços do site calculadas em uma única leitura dos dados
+
+    Os registros são lidos um a um (do arquivo ou de `rows`, qualquer
+    iterador de registros) e só os agregados ficam em memória, então o
+    tamanho do arquivo não limita a análise. Com `cache`
+    (comum.result_cache.ResultCache), os agregados de um arquivo já
+    analisado com o mesmo código e taxonomia são reaproveitados.
+    """
+    
+    def __init__(self, csv_file="sefaz_site_servicos.csv", taxonomy=None, rows=None, cache=None):
         self.csv_file = csv_file
-        self.data = []
-        self.load_data()
+        self.classifier = KeywordClassifier(taxonomy or SERVICE_TYPES)
+        self.cache = cache
+        self.stats = None
+        self.load_data(rows)
     
-    def load_data(self):
-        """Carrega dados do arquivo CSV"""
+    def load_data(self, rows=None):
+        """Lê os dados do arquivo CSV (ou da saída em JSON Lines/Parquet do scraper) e calcula os agregados"""
         try:
-            with open(self.csv_file, 'r', encoding='utf-8') as file:
-                reader = csv.DictReader(file)
-                self.data = [row for row in reader]
-            print(f"Dados carregados: {len(self.data)} registros")
+            key = None
+            if rows is None and self.cache is not None:
+                key = self.cache.key(ANALYSIS_NAME, self.csv_file, analysis_version(),
+                                     {'taxonomy': self.classifier.taxonomy, 'word_capacity': WORD_CAPACITY})
+                self.stats = self.cache.get(key)
+                if self.stats is not None:
+                    print(f"Dados carregados: {self.stats['total']} registros (do cache de análises)")
+                    return
+            self.stats = site_metrics(self.classifier).run(rows if rows is not None else read_records(self.csv_file))
+            print(f"Dados carregados: {self.stats['total']} registros")
+            if key is not None:
+                self.cache.put(key, self.stats, ANALYSIS_NAME, self.csv_file)
         except FileNotFoundError:
             print(f"Arquivo {self.csv_file} não encontrado!")
         except Exception as e:
@@ -22,35 +108,30 @@ class AnaliseSiteSefaz:
     
     def analyze_categories(self):
         """Analisa a distribuição de categorias"""
-        categories = [row['Categorias'] for row in self.data]
-        category_count = Counter(categories)
+        category_count = self.stats['categories']
         
         print("\n=== ANÁLISE DE CATEGORIAS ===")
         print(f"Total de categorias únicas: {len(category_count)}")
         print("\nTop 10 categorias mais frequentes:")
         for category, count in category_count.most_common(10):
-            percentage = (count / len(self.data)) * 100
+            percentage = (count / self.stats['total']) * 100
             print(f"  {category}: {count} serviços ({percentage:.1f}%)")
         
         return category_count
     
     def analyze_by_profile(self):
-        """Analisa serviços por perfil"""
-        profile_data = defaultdict(list)
-        
-        for row in self.data:
-            profile_data[row['Perfis']].append(row)
+        """Analisa serviços por perfil (retorna as categorias contadas por perfil)"""
+        profile_data = self.stats['profile_categories']
         
         print("\n=== ANÁLISE POR PERFIL ===")
-        for profile, services in profile_data.items():
-            categories = set(service['Categorias'] for service in services)
+        for profile, profile_categories in profile_data.items():
+            services = self.stats['profiles'][profile]
             print(f"\n{profile}:")
-            print(f"  Serviços: {len(services)}")
-            print(f"  Categorias únicas: {len(categories)}")
-            print(f"  Média de categorias por serviço: {len(categories)/len(services):.1f}")
+            print(f"  Serviços: {services}")
+            print(f"  Categorias únicas: {len(profile_categories)}")
+            print(f"  Média de categorias por serviço: {len(profile_categories)/services:.1f}")
             
             # Top 3 categorias por perfil
-            profile_categories = Counter(service['Categorias'] for service in services)
             print("  Top 3 categorias:")
             for cat, count in profile_categories.most_common(3):
                 print(f"    - {cat}: {count} serviços")
@@ -59,60 +140,30 @@ class AnaliseSiteSefaz:
     
     def analyze_urls(self):
         """Analisa padrões de URLs"""
-        urls = [row['URL'] for row in self.data]
+        total = self.stats['total']
         
         # Domínios
-        domains = []
-        for url in urls:
-            if 'catalogo.sefaz.ms.gov.br' in url:
-                domains.append('catalogo.sefaz.ms.gov.br')
-            elif 'servicos.efazenda.ms.gov.br' in url:
-                domains.append('servicos.efazenda.ms.gov.br')
-            elif 'sefaz.ms.gov.br' in url:
-                domains.append('sefaz.ms.gov.br')
-            else:
-                domains.append('outros')
-        
-        domain_count = Counter(domains)
+        domain_count = self.stats['domains']
         
         print("\n=== ANÁLISE DE URLs ===")
         print("Distribuição por domínio:")
         for domain, count in domain_count.most_common():
-            percentage = (count / len(urls)) * 100
+            percentage = (count / total) * 100
             print(f"  {domain}: {count} URLs ({percentage:.1f}%)")
         
         # Tipos de arquivo
-        file_types = []
-        for url in urls:
-            if url.endswith('.pdf'):
-                file_types.append('PDF')
-            elif url.endswith('.doc') or url.endswith('.docx'):
-                file_types.append('DOC')
-            else:
-                file_types.append('WEB')
-        
-        file_count = Counter(file_types)
+        file_count = self.stats['file_types']
         print("\nTipos de recursos:")
         for file_type, count in file_count.most_common():
-            percentage = (count / len(urls)) * 100
+            percentage = (count / total) * 100
             print(f"  {file_type}: {count} recursos ({percentage:.1f}%)")
         
         return domain_count, file_count
     
     def analyze_service_names(self):
         """Analisa padrões nos nomes dos serviços"""
-        services = [row['Serviços'] for row in self.data]
-        
         # Palavras-chave mais comuns
-        all_words = []
-        for service in services:
-            # Remove caracteres especiais e converte para minúsculas
-            words = re.findall(r'\b\w+\b', service.lower())
-            # Filtra palavras com mais de 3 caracteres
-            words = [word for word in words if len(word) > 3]
-            all_words.extend(words)
-        
-        word_count = Counter(all_words)
+        word_count = self.stats['words']
         
         print("\n=== ANÁLISE DE NOMES DE SERVIÇOS ===")
         print("Palavras-chave mais frequentes:")
@@ -120,28 +171,11 @@ class AnaliseSiteSefaz:
             print(f"  {word}: {count} ocorrências")
         
         # Serviços por tipo (baseado em palavras-chave)
-        service_types = {
-            'Cadastro': ['cadastro', 'inscrição', 'registro'],
-            'Certidão': ['certidão', 'certidao', 'atestado'],
-            'Consulta': ['consulta', 'pesquisa'],
-            'Emissão': ['emissão', 'emissao', 'geração'],
-            'Declaração': ['declaração', 'declaracao'],
-            'Processo': ['processo', 'procedimento']
-        }
-        
-        type_count = defaultdict(int)
-        for service in services:
-            service_lower = service.lower()
-            for service_type, keywords in service_types.items():
-                if any(keyword in service_lower for keyword in keywords):
-                    type_count[service_type] += 1
-                    break
-            else:
-                type_count['Outros'] += 1
+        type_count = self.stats['service_types']
         
         print("\nClassificação por tipo de serviço:")
         for service_type, count in sorted(type_count.items(), key=lambda x: x[1], reverse=True):
-            percentage = (count / len(services)) * 100
+            percentage = (count / self.stats['total']) * 100
             print(f"  {service_type}: {count} serviços ({percentage:.1f}%)")
         
         return word_count, type_count
@@ -149,24 +183,25 @@ class AnaliseSiteSefaz:
     def generate_insights(self):
         """Gera insights estratégicos"""
         print("\n=== INSIGHTS ESTRATÉGICOS ===")
+        total = self.stats['total']
         
         # Perfil com mais serviços
-        profile_counts = Counter(row['Perfis'] for row in self.data)
+        profile_counts = self.stats['profiles']
         top_profile = profile_counts.most_common(1)[0]
         print(f"1. Perfil prioritário: {top_profile[0]} ({top_profile[1]} serviços)")
         
         # Categoria mais comum
-        category_counts = Counter(row['Categorias'] for row in self.data)
+        category_counts = self.stats['categories']
         top_category = category_counts.most_common(1)[0]
         print(f"2. Categoria principal: {top_category[0]} ({top_category[1]} serviços)")
         
         # Análise de digitalização
-        pdf_count = sum(1 for row in self.data if row['URL'].endswith('.pdf'))
-        digital_percentage = ((len(self.data) - pdf_count) / len(self.data)) * 100
+        pdf_count = self.stats['pdfs']
+        digital_percentage = ((total - pdf_count) / total) * 100
         print(f"3. Nível de digitalização: {digital_percentage:.1f}% dos serviços são digitais")
         
         # Distribuição de complexidade (baseada no tamanho do nome)
-        avg_name_length = sum(len(row['Serviços']) for row in self.data) / len(self.data)
+        avg_name_length = self.stats['name_length'] / total
         print(f"4. Complexidade média dos nomes: {avg_name_length:.0f} caracteres")
         
         # Perfis com menor cobertura
@@ -175,47 +210,107 @@ class AnaliseSiteSefaz:
     
     def save_detailed_report(self, filename="relatorio_detalhado_site_sefaz.txt"):
         """Salva relatório detalhado em arquivo"""
+        total = self.stats['total']
         with open(filename, 'w', encoding='utf-8') as f:
             f.write("RELATÓRIO DETALHADO - ANÁLISE SITE SEFAZ-MS\n")
             f.write("=" * 50 + "\n\n")
             
             # Estatísticas gerais
-            f.write(f"Total de serviços: {len(self.data)}\n")
-            f.write(f"Total de perfis: {len(set(row['Perfis'] for row in self.data))}\n")
-            f.write(f"Total de categorias: {len(set(row['Categorias'] for row in self.data))}\n\n")
+            f.write(f"Total de serviços: {total}\n")
+            f.write(f"Total de perfis: {len(self.stats['profiles'])}\n")
+            f.write(f"Total de categorias: {len(self.stats['categories'])}\n\n")
             
             # Distribuição por perfil
-            profile_counts = Counter(row['Perfis'] for row in self.data)
+            profile_counts = self.stats['profiles']
             f.write("DISTRIBUIÇÃO POR PERFIL:\n")
             for profile, count in profile_counts.most_common():
-                percentage = (count / len(self.data)) * 100
+                percentage = (count / total) * 100
                 f.write(f"  {profile}: {count} ({percentage:.1f}%)\n")
             
             f.write("\nCATEGORIAS MAIS FREQUENTES:\n")
-            category_counts = Counter(row['Categorias'] for row in self.data)
+            category_counts = self.stats['categories']
             for category, count in category_counts.most_common(10):
                 f.write(f"  {category}: {count}\n")
         
         print(f"\nRelatório detalhado salvo em: {filename}")
     
+    def save_markdown_report(self, filename="relatorio_detalhado_site_sefaz.md"):
+        """Salva o relatório detalhado em Markdown, com as tabelas de cada análise"""
+        total = self.stats['total']
+        
+        def table(title, headers, items, with_percentage=True):
+            columns = headers + (['%'] if with_percentage else [])
+            section = f"\n## {title}\n\n"
+            section += "| " + " | ".join(columns) + " |\n"
+            section += "|" + "|".join('---' for _ in columns) + "|\n"
+            for name, count in items:
+                section += f"| {name} | {count} |"
+                section += f" {(count / total) * 100:.1f}% |\n" if with_percentage else "\n"
+            return section
+        
+        relatorio = "# Relatório Detalhado - Análise Site SEFAZ-MS\n\n"
+        relatorio += f"- **Total de serviços**: {total}\n"
+        relatorio += f"- **Total de perfis**: {len(self.stats['profiles'])}\n"
+        relatorio += f"- **Total de categorias**: {len(self.stats['categories'])}\n"
+        relatorio += f"- **Serviços em PDF**: {self.stats['pdfs']}\n"
+        relatorio += table("Distribuição por Perfil", ['Perfil', 'Serviços'], self.stats['profiles'].most_common())
+        relatorio += table("Categorias Mais Frequentes", ['Categoria', 'Serviços'],
+                           self.stats['categories'].most_common(10))
+        relatorio += table("Domínios", ['Domínio', 'URLs'], self.stats['domains'].most_common())
+        relatorio += table("Tipos de Recurso", ['Tipo', 'Recursos'], self.stats['file_types'].most_common())
+        relatorio += table("Tipos de Serviço", ['Tipo', 'Serviços'],
+                           sorted(self.stats['service_types'].items(), key=lambda x: x[1], reverse=True))
+        relatorio += table("Palavras-chave Mais Frequentes", ['Palavra', 'Ocorrências'],
+                           self.stats['words'].most_common(15), with_percentage=False)
+        
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write(relatorio)
+        
+        print(f"Relatório em Markdown salvo em: {filename}")
+    
     def run_complete_analysis(self):
         """Executa análise completa"""
         print("INICIANDO ANÁLISE COMPLETA DOS DADOS DO SITE SEFAZ-MS")
         print("=" * 60)
         
+        if self.stats is None:
+            return
+        
         self.analyze_categories()
         self.analyze_by_profile()
         self.analyze_urls()
         self.analyze_service_names()
         self.generate_insights()
         self.save_detailed_report()
+        self.save_markdown_report()
         
         print("\n" + "=" * 60)
         print("ANÁLISE COMPLETA FINALIZADA!")
         print("=" * 60)
 
 def main():
-    analyzer = AnaliseSiteSefaz()
+    parser = argparse.ArgumentParser(description="Análise dos serviços do site SEFAZ-MS")
+    parser.add_argument('arquivo', nargs='?', default="sefaz_site_servicos.csv",
+                        help="serviços extraídos (.csv, .jsonl ou .parquet)")
+    parser.add_argument('--taxonomy', metavar='ARQUIVO',
+                        help="tipos de serviço e palavras-chave em JSON (padrão: SERVICE_TYPES)")
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+    
+    cache = cache_from_args(args)
+    if args.clear_cache:
+        removed = cache.invalidate(ANALYSIS_NAME) if cache else 0
+        print(f"{removed} resultados removidos do cache")
+        return
+    
+    taxonomy = None
+    if args.taxonomy:
+        try:
+            taxonomy = load_taxonomy(args.taxonomy)
+        except (OSError, ValueError) as e:
+            parser.error(f"não foi possível carregar a taxonomia: {e}")
+    
+    analyzer = AnaliseSiteSefaz(args.arquivo, taxonomy, cache=cache)
     analyzer.run_complete_analysis()
 
 if __name__ == "__main__":
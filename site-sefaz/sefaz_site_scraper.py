@@ -1,13 +1,55 @@
-import requests
 from bs4 import BeautifulSoup
+import argparse
 import csv
-import time
+import logging
+import os
+import sys
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 from urllib.parse import urljoin, urlparse
 import re
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from comum.delta import PageManifest, compute_delta, delta_filename, load_snapshot, save_delta
+from comum.fetch import Fetcher, FetchError
+from comum.metrics import Metrics, metrics_filenames
+from comum.monitor import BlockMonitor, changes_filename, find_blocks, monitor_filename, run_polls
+from comum.http_cache import HttpCache
+from comum.http_client import HttpClient
+from comum.parsers import BACKENDS, get_backend
+from comum.progress import (Progress, add_logging_arguments, event, events_path_from_args,
+                            structured_logging, verbosity_from_args, worker_logging)
+from comum.rate_limiter import RateLimiter, parse_host_rates
+from comum.records import ServiceRecord, from_rows, to_rows
+from comum.sinks import FIELDNAMES, open_sink
+
+logger = logging.getLogger(__name__)
+
 class SefazSiteScraper:
-    def __init__(self, base_url="https://www.sefaz.ms.gov.br/"):
+    def __init__(self, base_url="https://www.sefaz.ms.gov.br/", cache=None,
+                 parser='bs4', verify_parser=False, limiter=None, timeout=30, retries=3,
+                 metrics=None, parse_workers=0, client=None, max_per_host=5):
         self.base_url = base_url
+        # 'bs4' usa a árvore completa do BeautifulSoup; os demais backends
+        # (comum.parsers) extraem apenas os blocos daems-list. Com
+        # verify_parser, cada página é conferida contra o resultado do 'bs4'.
+        self.parser = parser
+        self.backend = get_backend(parser) if parser != 'bs4' else None
+        self.verify_parser = verify_parser
+        # Cache HTTP opcional (comum.http_cache.HttpCache)
+        self.cache = cache
+        # Manifesto de páginas, ativo apenas no modo incremental
+        self.manifest = None
+        # Impressões digitais por lista daems-list, ativas apenas no modo
+        # monitor (comum.monitor.BlockMonitor)
+        self.block_monitor = None
+        # Processos de parsing (0 = parsing na mesma thread dos downloads)
+        self.parse_workers = parse_workers
+        # Páginas de perfil baixadas simultaneamente no modo concorrente
+        self.max_per_host = max_per_host
+        # Limitador de taxa adaptativo por host (comum.rate_limiter); a taxa
+        # inicial de 1 req/s equivale à antiga pausa fixa de 1 segundo
+        self.limiter = limiter or RateLimiter()
         self.profiles = [
             'cidadao-post',
             'produtor-rural-post', 
@@ -22,87 +64,321 @@ class SefazSiteScraper:
             'poder-publico-post': 'Poder Público',
             'contabilista-post': 'Contabilista'
         }
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+        # Cliente HTTP com pool de conexões por host (comum.http_client)
+        self.session = client or HttpClient()
+        # Tempos por etapa, bytes e contagens (comum.metrics)
+        self.metrics = metrics or Metrics('site')
+        # Requisições com novas tentativas e circuit breaker (comum.fetch)
+        self.fetcher = Fetcher(self.session, timeout=timeout, retries=retries,
+                               cache=cache, limiter=self.limiter, metrics=self.metrics)
         self.scraped_data = []
         self.statistics = {
             'total_services': 0,
             'services_by_profile': {},
             'categories_found': set(),
-            'errors': []
+            'errors': [],
+            # Primeiros serviços, para a amostra de print_statistics
+            'samples': []
         }
 
-    def get_page_content(self, url):
-        """Obtém o conteúdo HTML de uma página"""
+    def get_page_content(self, url, errors=None):
+        """Obtém o conteúdo HTML de uma página
+
+        Erros de acesso vão para `errors` (padrão: statistics['errors']);
+        threads de trabalho passam a própria lista, somada depois na thread
+        principal.
+        """
         try:
-            response = self.session.get(url, timeout=30)
-            response.raise_for_status()
-            return response.text
-        except requests.RequestException as e:
-            error_msg = f"Erro ao acessar {url}: {str(e)}"
-            print(error_msg)
-            self.statistics['errors'].append(error_msg)
+            return self.fetcher.fetch(url)
+        except FetchError as e:
+            error_msg = f"Erro ao acessar {str(e)}"
+            logger.error(error_msg)
+            (self.statistics['errors'] if errors is None else errors).append(error_msg)
             return None
 
     def extract_services_from_page(self, url, profile_name):
         """Extrai serviços de uma página específica do perfil"""
-        print(f"Extraindo serviços de: {url}")
+        services, categories = self.fetch_services(url, profile_name)
+        self.register_services(services, categories, profile_name)
+        return services
+    
+    def fetch_services(self, url, profile_name, errors=None):
+        """Obtém e extrai os serviços de uma página de perfil, sem registrá-los"""
+        event(logger, 'page_fetch', f"Extraindo serviços de: {url}", url=url, profile=profile_name)
+        
+        html_content = self.get_page_content(url, errors)
+        if self.block_monitor is not None:
+            return self.monitor_services(url, html_content, profile_name)
+        if not html_content:
+            return [], []
+        
+        saved = self.saved_services(url, html_content)
+        if saved is not None:
+            return saved
+        
+        services, categories = self.parse_services(html_content, profile_name)
+        self.record_services(url, html_content, services, categories)
+        return services, categories
+    
+    def monitor_services(self, url, html_content, profile_name):
+        """fetch_services do modo monitor: só listas daems-list novas ou alteradas são extraídas"""
+        def split(content):
+            return profile_name, {}, find_blocks(content, 'ul', 'daems-list')
+        
+        def extract(block, info):
+            # A lista isolada é envolvida na coluna para seguir o mesmo parsing
+            services, categories = self.parse_services(
+                f'<div class="daems-list-column">{block}</div>', profile_name)
+            return (categories[0] if categories else None), to_rows(services)
         
-        html_content = self.get_page_content(url)
         if not html_content:
+            # Página que não pôde ser obtida conta como inalterada, para que
+            # suas listas não apareçam como removidas nem sumam da saída
+            kept = self.block_monitor.keep(url)
+            if kept is None:
+                return [], []
+            rows, _, categories = kept
+        else:
+            rows, _, categories = self.block_monitor.check(url, html_content, split, extract)
+        return from_rows(rows), categories
+    
+    def saved_services(self, url, html_content):
+        """(serviços, categorias) salvos no manifesto se a página não mudou, senão None"""
+        saved = self.manifest.lookup(url, html_content) if self.manifest else None
+        # Manifestos anteriores aos registros compactos não têm 'rows'
+        if saved is None or 'rows' not in saved:
+            return None
+        event(logger, 'page_unchanged', f"Página inalterada, extração reaproveitada: {url}", url=url)
+        return from_rows(saved['rows']), saved['categories']
+    
+    def record_services(self, url, html_content, services, categories):
+        if self.manifest:
+            self.manifest.record(url, html_content,
+                                 {'rows': to_rows(services), 'categories': categories})
+    
+    def register_services(self, services, categories, profile_name, keep_data=True):
+        """Atualiza as estatísticas (e, se keep_data, scraped_data) com os serviços extraídos"""
+        self.statistics['categories_found'].update(categories)
+        for service_data in services:
+            if keep_data:
+                self.scraped_data.append(service_data)
+            if len(self.statistics['samples']) < 5:
+                self.statistics['samples'].append(service_data)
+            self.statistics['total_services'] += 1
+            
+            # Atualizar estatísticas por perfil
+            if profile_name not in self.statistics['services_by_profile']:
+                self.statistics['services_by_profile'][profile_name] = 0
+            self.statistics['services_by_profile'][profile_name] += 1
+    
+    def iter_profile_services(self, profiles=None, concurrent=False):
+        """Gera (perfil, serviços, categorias) de cada página de perfil, em ordem
+
+        Com parse_workers > 0 o download da página seguinte não espera o
+        parsing da anterior: o HTML vai para um pool de processos, com no
+        máximo 2 * parse_workers páginas aguardando na fila. Com
+        `concurrent`, as páginas são baixadas em paralelo (ver
+        _iter_profiles_concurrent).
+        """
+        profile_urls = self.generate_profile_urls(profiles)
+        if concurrent:
+            yield from self._iter_profiles_concurrent(profile_urls)
+            return
+        if not self.parse_in_pool():
+            for url, profile_name in profile_urls:
+                services, categories = self.fetch_services(url, profile_name)
+                yield profile_name, services, categories
             return
         
-        soup = BeautifulSoup(html_content, 'html.parser')
+        with ProcessPoolExecutor(max_workers=self.parse_workers, initializer=_init_parse_worker,
+                                 initargs=(self.base_url, self.parser, self.verify_parser)) as pool:
+            in_flight = deque()
+            for url, profile_name in profile_urls:
+                event(logger, 'page_fetch', f"Extraindo serviços de: {url}", url=url, profile=profile_name)
+                html_content = self.get_page_content(url)
+                in_flight.append(self._submit_parse(pool, url, profile_name, html_content))
+                while len(in_flight) > 2 * self.parse_workers or in_flight[0][-1].done():
+                    yield self._collect_parse(*in_flight.popleft())
+                    if not in_flight:
+                        break
+            while in_flight:
+                yield self._collect_parse(*in_flight.popleft())
+    
+    def _iter_profiles_concurrent(self, profile_urls):
+        """Baixa e extrai até max_per_host páginas de perfil ao mesmo tempo
+
+        Os resultados saem na ordem dos perfis, não na de conclusão, então a
+        saída é idêntica à do modo sequencial; as estatísticas são somadas
+        por quem consome o gerador (register_services). Cada thread devolve
+        os erros de acesso junto com o resultado, e eles entram em
+        statistics['errors'] na ordem dos perfis, na thread principal. Com
+        parse_workers > 0 as threads só baixam as páginas e o parsing vai
+        para o pool de processos.
+        """
+        def fetch_services(url, profile_name):
+            errors = []
+            return (*self.fetch_services(url, profile_name, errors), errors)
         
-        # Encontrar todas as colunas de listas
-        list_columns = soup.find_all('div', class_='daems-list-column')
+        def get_page_content(url):
+            errors = []
+            return self.get_page_content(url, errors), errors
         
-        for column in list_columns:
-            # Encontrar todas as listas dentro da coluna
-            service_lists = column.find_all('ul', class_='daems-list')
+        workers = max(1, min(self.max_per_host, len(profile_urls)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            if not self.parse_in_pool():
+                futures = [executor.submit(fetch_services, url, profile_name)
+                           for url, profile_name in profile_urls]
+                for (_, profile_name), future in zip(profile_urls, futures):
+                    services, categories, errors = future.result()
+                    self.statistics['errors'].extend(errors)
+                    yield profile_name, services, categories
+                return
             
-            for service_list in service_lists:
-                # Extrair o título da categoria
-                category_element = service_list.find('li', class_='daems-titulos')
-                if not category_element:
-                    continue
-                    
-                category_name = category_element.get_text(strip=True)
-                self.statistics['categories_found'].add(category_name)
-                
-                # Extrair todos os serviços desta categoria
-                service_items = service_list.find_all('li', class_='daems-list-itens')
+            pages = []
+            for url, profile_name in profile_urls:
+                event(logger, 'page_fetch', f"Extraindo serviços de: {url}", url=url, profile=profile_name)
+                pages.append(executor.submit(get_page_content, url))
+            with ProcessPoolExecutor(max_workers=self.parse_workers, initializer=_init_parse_worker,
+                                     initargs=(self.base_url, self.parser, self.verify_parser)) as pool:
+                in_flight = []
+                for (url, profile_name), page in zip(profile_urls, pages):
+                    html_content, errors = page.result()
+                    self.statistics['errors'].extend(errors)
+                    in_flight.append(self._submit_parse(pool, url, profile_name, html_content))
+                for item in in_flight:
+                    yield self._collect_parse(*item)
+    
+    def parse_in_pool(self):
+        # No modo monitor só blocos novos são extraídos, no próprio processo
+        return self.parse_workers > 0 and self.block_monitor is None
+    
+    def _submit_parse(self, pool, url, profile_name, html_content):
+        """Envia a página ao pool; páginas vazias ou inalteradas não são parseadas"""
+        done = Future()
+        if not html_content:
+            done.set_result(([], [], []))
+            return url, profile_name, html_content, False, done
+        saved = self.saved_services(url, html_content)
+        if saved is not None:
+            done.set_result((*saved, []))
+            return url, profile_name, html_content, False, done
+        return url, profile_name, html_content, True, pool.submit(_parse_in_worker, html_content, profile_name)
+    
+    def _collect_parse(self, url, profile_name, html_content, parsed, future):
+        services, categories, timings = future.result()
+        for stage, seconds in timings:
+            self.metrics.observe(stage, seconds)
+        if parsed:
+            self.record_services(url, html_content, services, categories)
+        return profile_name, services, categories
+    
+    def iter_services(self, profiles=None, concurrent=False):
+        """Gera cada serviço (esquema do CSV) assim que é extraído
+
+        Apenas as estatísticas são atualizadas; scraped_data não cresce.
+        """
+        for profile_name, services, categories in self.iter_profile_services(profiles, concurrent):
+            self.register_services(services, categories, profile_name, keep_data=False)
+            for service_data in services:
+                yield self.to_csv_row(service_data)
+    
+    def parse_services(self, html_content, profile_name):
+        """Extrai do HTML a lista de serviços e as categorias encontradas"""
+        if self.backend is None:
+            services, categories = self._parse_services_bs4(html_content, profile_name)
+        elif self.verify_parser:
+            equivalent, reference, _ = self.check_parser_equivalence(html_content, profile_name)
+            if not equivalent:
+                logger.warning(f"Backend '{self.parser}' divergiu do BeautifulSoup no perfil "
+                               f"{profile_name}; usando o resultado de referência")
+            services, categories = reference
+        else:
+            services, categories = self._parse_services_targeted(html_content, profile_name)
+        
+        # Um evento por serviço só com -v ou arquivo de eventos
+        if logger.isEnabledFor(logging.DEBUG):
+            for service_data in services:
+                event(logger, 'service', f"Categoria: {service_data['Categorias']} | "
+                      f"Serviço: {service_data.title[:50]}...",
+                      profile=profile_name, category=service_data['Categorias'],
+                      service=service_data.title, url=service_data.url)
+        
+        return services, categories
+    
+    def _parse_services_bs4(self, html_content, profile_name):
+        """Extração de referência sobre a árvore completa do BeautifulSoup"""
+        with self.metrics.timer('parse'):
+            soup = BeautifulSoup(html_content, 'html.parser')
+        
+        with self.metrics.timer('extract'):
+            services = []
+            categories = []
+            
+            # Encontrar todas as colunas de listas
+            list_columns = soup.find_all('div', class_='daems-list-column')
+            
+            for column in list_columns:
+                # Encontrar todas as listas dentro da coluna
+                service_lists = column.find_all('ul', class_='daems-list')
                 
-                for item in service_items:
-                    link_element = item.find('a')
-                    if link_element and link_element.get('href'):
-                        service_name = link_element.get_text(strip=True)
-                        service_url = link_element.get('href').strip()
-                        
-                        # Limpar URL se necessário
-                        if service_url.startswith(' '):
-                            service_url = service_url.strip()
+                for service_list in service_lists:
+                    # Extrair o título da categoria
+                    category_element = service_list.find('li', class_='daems-titulos')
+                    if not category_element:
+                        continue
                         
-                        # Validar se é uma URL válida
-                        if service_name and service_url and self.is_valid_url(service_url):
-                            service_data = {
-                                'categoria': category_name,
-                                'perfil': profile_name,
-                                'servico': service_name,
-                                'url': service_url
-                            }
-                            
-                            self.scraped_data.append(service_data)
-                            self.statistics['total_services'] += 1
-                            
-                            # Atualizar estatísticas por perfil
-                            if profile_name not in self.statistics['services_by_profile']:
-                                self.statistics['services_by_profile'][profile_name] = 0
-                            self.statistics['services_by_profile'][profile_name] += 1
-                            
-                            print(f"  Categoria: {category_name} | Serviço: {service_name[:50]}...")
+                    category_name = category_element.get_text(strip=True)
+                    categories.append(category_name)
+                    
+                    # Extrair todos os serviços desta categoria
+                    service_items = service_list.find_all('li', class_='daems-list-itens')
+                    
+                    for item in service_items:
+                        link_element = item.find('a')
+                        if link_element:
+                            service_data = self.build_service(category_name, profile_name,
+                                                              link_element.get_text(strip=True),
+                                                              link_element.get('href'))
+                            if service_data:
+                                services.append(service_data)
+        
+        return services, categories
+    
+    def _parse_services_targeted(self, html_content, profile_name):
+        """Extração direcionada com o backend configurado (mesmo formato do bs4)"""
+        with self.metrics.timer('parse'):
+            blocks = self.backend.parse_site(html_content)
+        
+        services = []
+        categories = []
+        with self.metrics.timer('extract'):
+            for block in blocks:
+                categories.append(block['category'])
+                for service_name, href in block['items']:
+                    service_data = self.build_service(block['category'], profile_name, service_name, href)
+                    if service_data:
+                        services.append(service_data)
+        return services, categories
+    
+    def build_service(self, category_name, profile_name, service_name, href):
+        """Monta o registro de um serviço, ou None se o link não for válido"""
+        if not href:
+            return None
+        service_url = href.strip()
+        
+        # Validar se é uma URL válida
+        if service_name and service_url and self.is_valid_url(service_url):
+            return ServiceRecord((category_name,), profile_name, service_name, service_url)
+        return None
+    
+    def check_parser_equivalence(self, html_content, profile_name):
+        """Compara o backend configurado com a extração de referência do bs4
+
+        Retorna (equivalente, referencia, candidato).
+        """
+        reference = self._parse_services_bs4(html_content, profile_name)
+        candidate = self._parse_services_targeted(html_content, profile_name)
+        return reference == candidate, reference, candidate
 
     def is_valid_url(self, url):
         """Valida se uma string é uma URL válida"""
@@ -124,6 +400,14 @@ class SefazSiteScraper:
         
         return urls
 
+    def to_csv_row(self, data):
+        """Converte um serviço extraído para o esquema do CSV"""
+        return data.to_row()
+
+    def csv_rows(self):
+        """Converte os dados coletados para o esquema do CSV"""
+        return [self.to_csv_row(data) for data in self.scraped_data]
+
     def save_to_csv(self, filename="sefaz_site_servicos.csv"):
         """Salva os dados extraídos em um arquivo CSV"""
         if not self.scraped_data:
@@ -131,17 +415,10 @@ class SefazSiteScraper:
             return
         
         with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-            fieldnames = ['Categorias', 'Perfis', 'Serviços', 'URL']
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+            writer = csv.DictWriter(csvfile, fieldnames=FIELDNAMES)
             
             writer.writeheader()
-            for data in self.scraped_data:
-                writer.writerow({
-                    'Categorias': data['categoria'],
-                    'Perfis': data['perfil'],
-                    'Serviços': data['servico'],
-                    'URL': data['url']
-                })
+            writer.writerows(self.csv_rows())
         
         print(f"Dados salvos em: {filename}")
         print(f"Total de registros: {len(self.scraped_data)}")
@@ -163,46 +440,205 @@ class SefazSiteScraper:
         for category in sorted(self.statistics['categories_found']):
             print(f"  - {category}")
         
+        if self.cache:
+            print(f"\n{self.cache.summary()}")
+        
         if self.statistics['errors']:
             print("\nErros encontrados:")
             for error in self.statistics['errors']:
                 print(f"  - {error}")
         
         print("\nAmostra dos dados coletados:")
-        for i, data in enumerate(self.scraped_data[:5]):
-            print(f"  {i+1}. {data['categoria']} | {data['perfil']} | {data['servico'][:50]}...")
+        for i, data in enumerate(self.statistics['samples']):
+            print(f"  {i+1}. {data['Categorias']} | {data.profile} | {data.title[:50]}...")
         
         print("="*60)
 
-    def run_scraper(self, profiles=None, delay=1):
-        """Executa o scraper para os perfis especificados"""
-        print("Iniciando scraping do site SEFAZ-MS...")
+    def run_scraper(self, profiles=None, incremental=False,
+                    filename="sefaz_site_servicos.csv", stream=False, concurrent=False):
+        """Executa o scraper para os perfis especificados
+
+        Com `stream`, cada serviço é gravado em `filename` (CSV, JSONL ou
+        Parquet, conforme a extensão) assim que extraído, e scraped_data só
+        cresce se o delta precisar dele; sem `stream`, os dados ficam em
+        scraped_data para save_to_csv. No modo incremental, páginas com HTML
+        idêntico ao da execução anterior não são reprocessadas e o delta em
+        relação a `filename` é salvo ao lado dele.
         
-        profile_urls = self.generate_profile_urls(profiles)
+        Com `concurrent`, as páginas de perfil são baixadas e extraídas em
+        paralelo (até max_per_host por vez), com a mesma saída do modo
+        sequencial; o tempo total tende ao da página mais lenta, desde que o
+        limitador de taxa permita as requisições simultâneas.
+        """
+        logger.info("Iniciando scraping do site SEFAZ-MS...")
         
-        for url, profile_name in profile_urls:
-            print(f"\nProcessando perfil: {profile_name}")
-            self.extract_services_from_page(url, profile_name)
-            
-            # Delay entre requisições
-            if delay > 0:
-                time.sleep(delay)
+        if incremental:
+            previous_data = load_snapshot(filename)
+            self.manifest = PageManifest(PageManifest.manifest_filename(filename))
+        
+        sink = open_sink(filename) if stream else None
+        
+        if concurrent:
+            logger.info(f"Modo concorrente: até {self.max_per_host} páginas simultâneas")
+        
+        progress = Progress(logger, 'Perfis', total=len(self.generate_profile_urls(profiles)), unit='perfis')
+        for profile_name, services, categories in self.iter_profile_services(profiles, concurrent):
+            event(logger, 'profile_done', f"Perfil processado: {profile_name} ({len(services)} serviços)",
+                  level=logging.INFO, profile=profile_name, services=len(services))
+            # Com stream, os serviços só ficam em memória para o delta
+            self.register_services(services, categories, profile_name,
+                                   keep_data=incremental or not stream)
+            if sink:
+                with self.metrics.timer('write'):
+                    sink.write_rows(self.to_csv_row(service_data) for service_data in services)
+            self.metrics.increment('rows_total', len(services))
+            progress.advance()
+        progress.finish()
         
         print("\nScraping concluído!")
+        if sink:
+            sink.close()
+            print(f"Dados salvos em: {filename}")
+            print(f"Total de registros: {sink.count}")
+        if self.cache:
+            self.cache.save()
+        print(self.limiter.summary())
+        print(self.fetcher.summary())
+        print(self.session.summary())
+        print(self.metrics.summary())
+        json_path, prometheus_path = metrics_filenames(filename)
+        self.metrics.export(json_path, prometheus_path)
+        print(f"Métricas salvas em {json_path} e {prometheus_path}")
+        
+        if incremental:
+            self.manifest.save()
+            print(self.manifest.summary())
+            delta = compute_delta(previous_data, self.csv_rows())
+            save_delta(delta, delta_filename(filename))
+            print(f"Delta salvo em {delta_filename(filename)}: {len(delta)} mudanças")
+        
         self.print_statistics()
 
+    def run_monitor(self, profiles=None, filename="sefaz_site_servicos.csv", concurrent=False,
+                    interval=0, polls=None):
+        """Verifica as páginas de perfil e registra apenas as listas que mudaram
+
+        Páginas idênticas às da verificação anterior não são parseadas e,
+        nas alteradas, só as listas daems-list novas são extraídas. Mudanças
+        viram eventos 'block_changed' e linhas em <filename>_mudancas.jsonl;
+        o estado fica em <filename>_monitor.json. `filename` é regravado na
+        primeira verificação e sempre que algo muda. Com `interval` > 0,
+        repete a cada `interval` segundos (até `polls` verificações).
+        """
+        self.block_monitor = BlockMonitor(monitor_filename(filename))
+        
+        def poll():
+            baseline = self.block_monitor.baseline
+            rows = []
+            for _, services, _ in self.iter_profile_services(profiles, concurrent):
+                rows.extend(services)
+            changes = self.block_monitor.finish(changes_filename(filename))
+            if changes or baseline:
+                with open_sink(filename) as sink:
+                    sink.write_rows(self.to_csv_row(service_data) for service_data in rows)
+                logger.info(f"Dados salvos em {filename}: {sink.count} registros")
+        
+        logger.info("Monitorando as páginas de perfil do site SEFAZ-MS"
+                    + (f" a cada {interval:g}s" if interval > 0 else ""))
+        count = run_polls(poll, interval, polls)
+        if self.cache:
+            self.cache.save()
+        logger.info(self.fetcher.summary())
+        logger.info(self.session.summary())
+        return count
+
+# Workers de parsing (um scraper por processo)
+_worker_scraper = None
+
+
+def _init_parse_worker(base_url, parser, verify_parser):
+    global _worker_scraper
+    worker_logging()
+    _worker_scraper = SefazSiteScraper(base_url=base_url, parser=parser, verify_parser=verify_parser)
+
+
+def _parse_in_worker(html_content, profile_name):
+    """parse_services em um processo de parsing; retorna também os tempos das etapas"""
+    _worker_scraper.metrics = Metrics('site')
+    services, categories = _worker_scraper.parse_services(html_content, profile_name)
+    timings = [(stage, histogram.sum) for stage, histogram in _worker_scraper.metrics.stages.items()]
+    return services, categories, timings
+
+
 def main():
     """Função principal"""
-    scraper = SefazSiteScraper()
+    parser = argparse.ArgumentParser(description="Scraper do site SEFAZ-MS")
+    parser.add_argument('--cache-dir', default=None,
+                        help="diretório do cache HTTP em disco (desativado se omitido)")
+    parser.add_argument('--cache-ttl', type=int, default=3600,
+                        help="segundos antes de revalidar uma página em cache")
+    parser.add_argument('--incremental', action='store_true',
+                        help="reaproveita páginas inalteradas e gera o delta em relação ao CSV anterior")
+    parser.add_argument('--parser', choices=BACKENDS, default='bs4',
+                        help="backend de parsing HTML (bs4 = árvore completa, referência)")
+    parser.add_argument('--verify-parser', action='store_true',
+                        help="confere cada página do backend escolhido contra o bs4")
+    parser.add_argument('--output', default='sefaz_site_servicos.csv',
+                        help="arquivo de saída (.csv, .jsonl ou .parquet), gravado à medida que extrai")
+    parser.add_argument('--rate', type=float, default=1.0,
+                        help="taxa inicial (requisições/s por host), ajustada conforme a resposta do servidor")
+    parser.add_argument('--max-rate', type=float, default=10.0,
+                        help="taxa máxima (requisições/s por host)")
+    parser.add_argument('--timeout', type=float, default=30,
+                        help="timeout (s) de cada requisição")
+    parser.add_argument('--retries', type=int, default=3,
+                        help="novas tentativas em timeouts, conexões derrubadas, 5xx e 429")
+    parser.add_argument('--parse-workers', type=int, default=0,
+                        help="processos de parsing, em paralelo aos downloads (0 = desativado)")
+    parser.add_argument('--host-rate', action='append', default=[], metavar='HOST=TAXA',
+                        help="taxa inicial de um host específico (pode repetir)")
+    parser.add_argument('--concurrent', action='store_true',
+                        help="baixa e extrai as páginas de perfil em paralelo")
+    parser.add_argument('--max-per-host', type=int, default=5,
+                        help="páginas de perfil simultâneas no modo concorrente")
+    parser.add_argument('--monitor', action='store_true',
+                        help="registra só as listas que mudaram desde a verificação anterior")
+    parser.add_argument('--interval', type=float, default=0,
+                        help="segundos entre verificações no modo monitor (0 = uma verificação)")
+    parser.add_argument('--polls', type=int, default=None,
+                        help="número máximo de verificações no modo monitor")
+    parser.add_argument('--pool-size', type=int, default=10,
+                        help="conexões mantidas abertas por host (keep-alive)")
+    add_logging_arguments(parser)
+    args = parser.parse_args()
     
-    # Processar todos os perfis
-    print("Executando scraper para todos os perfis do site SEFAZ-MS")
-    scraper.run_scraper()
+    with structured_logging(verbosity_from_args(args), events_path_from_args(args, args.output)):
+        run(args)
+
+
+def run(args):
+    """Executa a coleta com as opções da linha de comando"""
+    cache = HttpCache(args.cache_dir, ttl=args.cache_ttl) if args.cache_dir else None
+    limiter = RateLimiter(rate=args.rate, max_rate=args.max_rate,
+                          host_rates=parse_host_rates(args.host_rate))
+    scraper = SefazSiteScraper(cache=cache, parser=args.parser,
+                               verify_parser=args.verify_parser, limiter=limiter,
+                               timeout=args.timeout, retries=args.retries,
+                               parse_workers=args.parse_workers,
+                               client=HttpClient(pool_maxsize=max(args.pool_size, args.max_per_host)),
+                               max_per_host=args.max_per_host)
     
-    # Salvar dados
-    scraper.save_to_csv()
+    if args.monitor:
+        scraper.run_monitor(filename=args.output, concurrent=args.concurrent,
+                            interval=args.interval, polls=args.polls)
+        return
+    
+    # Processar todos os perfis, salvando os dados à medida que são extraídos
+    print("Executando scraper para todos os perfis do site SEFAZ-MS")
+    scraper.run_scraper(incremental=args.incremental, filename=args.output, stream=True,
+                        concurrent=args.concurrent)
     
-    print("\nScraping completo! Dados salvos em 'sefaz_site_servicos.csv'")
+    print(f"\nScraping completo! Dados salvos em '{args.output}'")
     print("Para processar apenas um perfil específico, use:")
     print("scraper.run_scraper(profiles=['cidadao-post'])  # exemplo")
 
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""Testes do SefazSiteScraper contra o servidor local de fixtures (benchmark/fixture_server.py)"""
+
+import contextlib
+import json
+import os
+import sys
+
+import pytest
+
+BASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+sys.path.insert(0, BASE_DIR)
+sys.path.insert(0, os.path.join(BASE_DIR, 'site-sefaz'))
+sys.path.insert(0, os.path.join(BASE_DIR, 'benchmark'))
+
+from comum.monitor import changes_filename
+from comum.rate_limiter import RateLimiter
+from comum.sinks import read_records
+from fixture_server import FixtureServer, FixtureSite
+from sefaz_site_scraper import SefazSiteScraper
+
+
+@contextlib.contextmanager
+def serve(site, **kwargs):
+    server = FixtureServer(site, **kwargs)
+    server.start()
+    try:
+        yield server
+    finally:
+        server.stop()
+
+
+def scraper(server, **kwargs):
+    kwargs.setdefault('limiter', RateLimiter(rate=1e6, max_rate=1e6))
+    return SefazSiteScraper(base_url=server.base_url + '/', **kwargs)
+
+
+def fail_path(site, failing):
+    """Faz o servidor responder 404 para os caminhos em `failing`"""
+    render = site.render
+    site.render = lambda path: None if path in failing else render(path)
+
+
+def test_concurrent_profiles_match_sequential_order():
+    site = FixtureSite()
+    fail_path(site, {'/produtor-rural-post/', '/contabilista-post/'})
+    # Latência aleatória faz as páginas terminarem fora de ordem
+    with serve(site, latency=0.001, jitter=0.02, seed=1) as server:
+        sequential = scraper(server)
+        rows = list(sequential.iter_services())
+        concurrent = scraper(server)
+        concurrent_rows = list(concurrent.iter_services(concurrent=True))
+    assert rows and concurrent_rows == rows
+    assert len(sequential.statistics['errors']) == 2
+    assert concurrent.statistics['errors'] == sequential.statistics['errors']
+
+
+@pytest.mark.parametrize('concurrent', [False, True])
+def test_monitor_keeps_profile_page_that_failed(tmp_path, concurrent):
+    site = FixtureSite()
+    output = str(tmp_path / 'site.csv')
+    with serve(site) as server:
+        scraper(server).run_monitor(filename=output, concurrent=concurrent)
+        baseline = list(read_records(output))
+
+        items = site.site['empresa-post']['Cadastros']
+        items[0] = ('Serviço renomeado', items[0][1])
+        fail_path(site, {'/cidadao-post/'})
+        scraper(server).run_monitor(filename=output, concurrent=concurrent)
+
+    with open(changes_filename(output), encoding='utf-8') as f:
+        changes = [json.loads(line) for line in f]
+    assert [(change['Tipo'], change['Bloco']) for change in changes] == [('alterado', 'Cadastros')]
+    rows = list(read_records(output))
+    assert [row['URL'] for row in rows] == [row['URL'] for row in baseline]
+    assert sum(row['Serviços'] == 'Serviço renomeado' for row in rows) == 1